@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Overlap map building time for each broadphase and objects count.
+    Run from the repo root:  python -m benchmarks.collisions
+"""
+from __future__ import print_function
+
+import argparse
+import random
+import timeit
+
+from robogame_engine.collisions import BROADPHASES, numpy
+from robogame_engine.constants import BROADPHASE_NUMPY
+from robogame_engine.geometry import Point
+from robogame_engine.objects import GameObject
+from robogame_engine.scene import Scene
+
+FIELD = (1200, 800)
+SIZES = (10, 25, 50, 100, 200, 400, 800, 1600)
+
+
+def make_scene(count, seed=0):
+    scene = Scene(field=FIELD, theme_mod_path='tests.default_theme', headless=True)
+    rnd = random.Random(seed)
+    for _ in range(count):
+        GameObject(coord=Point(rnd.uniform(0, FIELD[0]), rnd.uniform(0, FIELD[1])), radius=rnd.randint(5, 25))
+    return scene
+
+
+def measure(broadphase_name, count, repeat=3):
+    scene = make_scene(count)
+    broadphase = BROADPHASES[broadphase_name](scene=scene)
+    for obj in scene.objects:
+        broadphase.add_object(obj)
+    number = max(1, 2000 // count)
+    best = min(timeit.repeat(lambda: broadphase.get_overlap_map(scene.objects), number=number, repeat=repeat))
+    return best / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    args = parser.parse_args()
+
+    names = [name for name in BROADPHASES if name != BROADPHASE_NUMPY or numpy is not None]
+    timings = {}
+    print('{:>8}'.format('objects') + ''.join('{:>18}'.format(name) for name in names))
+    for count in args.sizes:
+        timings[count] = dict((name, measure(name, count)) for name in names)
+        print('{:>8}'.format(count) + ''.join('{:>16.3f}ms'.format(timings[count][name] * 1000) for name in names))
+
+    if BROADPHASE_NUMPY not in names:
+        print('numpy is not installed - no crossover')
+        return
+    for name in names:
+        if name == BROADPHASE_NUMPY:
+            continue
+        crossover = None
+        for count in args.sizes:
+            if timings[count][BROADPHASE_NUMPY] < timings[count][name]:
+                crossover = count
+                break
+        if crossover is None:
+            print('{} is faster than {} at all sizes'.format(name, BROADPHASE_NUMPY))
+        else:
+            print('{} is faster than {} from {} objects'.format(BROADPHASE_NUMPY, name, crossover))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,416 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Engine hot paths benchmark: headless scenes, geometry, objects status, state protocol, sprites.
+    Run from the repo root:
+
+        python -m benchmarks.engine --sizes 100 1000 10000 --output results.json
+        python -m benchmarks.engine --output new.json --baseline results.json
+
+    Speeds are the best of --repeat runs. Memory is measured by a separate tracemalloc run:
+    peak_bytes is the peak of traced memory, blocks is the count of memory blocks
+    allocated and not freed during the run.
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import pickle
+import platform
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from robogame_engine.collisions import BROADPHASES
+from robogame_engine.constants import BROADPHASE_SPATIAL_HASH, KINEMATICS_OBJECTS, KINEMATICS_NUMPY
+from robogame_engine.context import set_current_scene
+from robogame_engine.geometry import Point, Vector, get_trig_tables
+from robogame_engine.objects import GameObject, ObjectStatus
+from robogame_engine.protocol import StateEncoder, StateDecoder
+from robogame_engine.scene import Scene
+
+SIZES = (100, 1000, 10000)
+SCENARIOS = ('moving', 'turning', 'colliding', 'mixed')
+# плотность объектов на поле - примерно одинаковая для всех размеров
+AREA_PER_OBJECT = 60 * 60
+
+
+class Mover(GameObject):
+
+    def on_born(self):
+        self.move_at(self.scene.random_field_point())
+
+    def on_stop_at_target(self, target):
+        self.move_at(self.scene.random_field_point())
+
+
+class Turner(GameObject):
+
+    def on_heartbeat(self):
+        self.turn_to(self.direction + 90)
+
+
+class Collider(GameObject):
+    """
+        Moves to the center of the field - objects are pressed to each other
+    """
+
+    def on_born(self):
+        self.move_at(self.scene.center)
+
+    def on_stop(self):
+        self.move_at(self.scene.center)
+
+
+SCENARIO_CLASSES = {
+    'moving': (Mover, ),
+    'turning': (Turner, ),
+    'colliding': (Collider, ),
+    'mixed': (Mover, Turner, Collider),
+}
+
+
+class BenchmarkScene(Scene):
+    check_collisions = True
+
+    def __init__(self, count, scenario, seed, broadphase, kinematics=KINEMATICS_OBJECTS, **kwargs):
+        self.broadphase = broadphase
+        self.kinematics = kinematics
+        side = int((count * AREA_PER_OBJECT) ** 0.5)
+        super(BenchmarkScene, self).__init__(
+            field=(side, side), theme_mod_path='tests.default_theme', headless=True, random_seed=seed, **kwargs)
+        self.center = Point(side // 2, side // 2)
+        classes = SCENARIO_CLASSES[scenario]
+        for i in range(count):
+            cls = classes[i % len(classes)]
+            cls(coord=self.random_field_point(), direction=self.random.randint(0, 359))
+
+    def random_field_point(self):
+        return Point(self.random.uniform(0, self.theme.FIELD_WIDTH), self.random.uniform(0, self.theme.FIELD_HEIGHT))
+
+
+def run_scene(count, scenario, steps, broadphase, kinematics=KINEMATICS_OBJECTS, seed=0):
+    random.seed(seed)
+    scene = BenchmarkScene(count=count, scenario=scenario, seed=seed, broadphase=broadphase, kinematics=kinematics)
+    started = time.perf_counter()
+    for _ in range(steps):
+        scene.game_step()
+    return time.perf_counter() - started
+
+
+def geometry_ops(count):
+    point = Point(10, 10)
+    vector = Vector(1.5, -0.5)
+    for i in range(count):
+        other = point + vector
+        point = other - vector
+        point += vector
+        delta = Vector.from_points(point, other, module=2)
+        vector = Vector.from_direction(delta.direction + i % 7, module=vector.module)
+        point.distance_to(other)
+    return point
+
+
+def trig_ops(count, tables):
+    """
+        Turning step math: rotation and direction of rotated vector
+    """
+    vector = Vector.from_direction(0, module=5, tables=tables)
+    for _ in range(count):
+        vector.rotate(7, tables=tables)
+        vector.direction
+    return vector
+
+
+def from_direction_ops(count, tables):
+    """
+        Vectors from directions: integer degrees (headings of new objects) and fractional ones
+    """
+    vector = None
+    for i in range(count):
+        vector = Vector.from_direction(i % 360, module=5, tables=tables)
+        Vector.from_direction(i % 360 + 0.25, module=5, tables=tables)
+    return vector
+
+
+def status_ops(objects, count):
+    for _ in range(count):
+        statuses = dict((obj.id, ObjectStatus(obj)) for obj in objects)
+        pickle.loads(pickle.dumps(statuses, pickle.HIGHEST_PROTOCOL))
+
+
+def protocol_ops(count, frames, binary, sizes):
+    """
+        Objects state of every game step through the pipe pickling: statuses dict or binary frames.
+        Returns the time without game steps
+    """
+    scene = BenchmarkScene(count=count, scenario='mixed', seed=0, broadphase=BROADPHASE_SPATIAL_HASH)
+    encoder, decoder = StateEncoder(keyframe_interval=scene.theme.STATE_KEYFRAME_INTERVAL), StateDecoder()
+    del sizes[:]
+    elapsed = 0.0
+    for _ in range(frames):
+        scene.game_step()
+        started = time.perf_counter()
+        if binary:
+            data = pickle.dumps(encoder.encode(scene.objects), pickle.HIGHEST_PROTOCOL)
+            decoder.decode(pickle.loads(data))
+        else:
+            data = pickle.dumps(scene.get_objects_status(), pickle.HIGHEST_PROTOCOL)
+            pickle.loads(data)
+        elapsed += time.perf_counter() - started
+        sizes.append(len(data))
+    return elapsed
+
+
+def measure(func, repeat, units):
+    """
+        Best speed in units per second and memory of the function
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        elapsed = func()
+        # функция может сама мерять время - без подготовки
+        if not isinstance(elapsed, float):
+            elapsed = time.perf_counter() - started
+        timings.append(elapsed)
+    tracemalloc.start()
+    blocks = _traced_blocks()
+    func()
+    blocks = _traced_blocks() - blocks
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    best = min(timings)
+    return dict(seconds=best, per_second=units / best if best else None, peak_bytes=peak, blocks=blocks)
+
+
+def _traced_blocks():
+    return sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+
+
+def bench_scenes(sizes, scenarios, steps, broadphase, kinematics, repeat):
+    results = []
+    for scenario in scenarios:
+        for count in sizes:
+            result = measure(lambda: run_scene(count, scenario, steps, broadphase, kinematics),
+                             repeat=repeat, units=steps)
+            result.update(name='scene', scenario=scenario, objects=count, steps=steps, broadphase=broadphase,
+                          kinematics=kinematics)
+            result['steps_per_second'] = result.pop('per_second')
+            results.append(result)
+            _print_result(result)
+    return results
+
+
+def bench_geometry(repeat):
+    count = 100000
+    result = measure(lambda: geometry_ops(count), repeat=repeat, units=count)
+    result.update(name='geometry', operations=count)
+    _print_result(result)
+    return [result]
+
+
+def bench_trig(repeat):
+    """
+        Exact angle math against TrigTables
+    """
+    count = 100000
+    results = []
+    for name, tables in (('exact', None), ('fast', get_trig_tables(10))):
+        for bench_name, ops in (('trig', trig_ops), ('from_direction', from_direction_ops)):
+            result = measure(lambda: ops(count, tables), repeat=repeat, units=count)
+            result.update(name=bench_name, scenario=name, operations=count)
+            _print_result(result)
+            results.append(result)
+    return results
+
+
+def bench_memory(sizes, steps):
+    """
+        Memory per moving object and memory blocks left allocated per game step
+    """
+    results = []
+    for count in sizes:
+        random.seed(0)
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        scene = BenchmarkScene(count=count, scenario='moving', seed=0, broadphase=BROADPHASE_SPATIAL_HASH)
+        # первые шаги - born и приказы на движение
+        scene.game_step()
+        scene.game_step()
+        object_bytes = (tracemalloc.get_traced_memory()[0] - before) / float(count)
+        blocks = _traced_blocks()
+        for _ in range(steps):
+            scene.game_step()
+        blocks = _traced_blocks() - blocks
+        tracemalloc.stop()
+        result = dict(name='memory', scenario='moving', objects=count, steps=steps,
+                      bytes_per_object=object_bytes, blocks_per_step=blocks / float(steps))
+        results.append(result)
+        print('{:<32} {:10.0f} bytes per object {:10.1f} blocks per step'.format(
+            'memory moving {}'.format(count), object_bytes, result['blocks_per_step']))
+    return results
+
+
+def bench_status(sizes, repeat):
+    results = []
+    for count in sizes:
+        scene = BenchmarkScene(count=count, scenario='mixed', seed=0, broadphase=BROADPHASE_SPATIAL_HASH)
+        objects = list(scene.objects)
+        frames = max(1, 10000 // count)
+        result = measure(lambda: status_ops(objects, frames), repeat=repeat, units=frames)
+        result.update(name='objects_status', objects=count)
+        result['frames_per_second'] = result.pop('per_second')
+        results.append(result)
+        _print_result(result)
+    return results
+
+
+def bench_protocol(sizes, repeat):
+    """
+        Pickled ObjectStatus dicts against binary frames with deltas
+    """
+    results = []
+    for count in sizes:
+        frames = max(10, 10000 // count)
+        for scenario, binary in (('pickle', False), ('binary', True)):
+            frame_sizes = []
+            result = measure(lambda: protocol_ops(count, frames, binary, frame_sizes), repeat=repeat, units=frames)
+            result.update(name='protocol', scenario=scenario, objects=count,
+                          bytes_per_frame=sum(frame_sizes) / float(len(frame_sizes)))
+            result['frames_per_second'] = result.pop('per_second')
+            results.append(result)
+            _print_result(result)
+            print('{:<32} {:10.0f} bytes per frame'.format('', result['bytes_per_frame']))
+    return results
+
+
+def bench_sprites(sizes, repeat):
+    """
+        Sprites update and draw under SDL dummy video driver
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    try:
+        import pygame
+        from robogame_engine.user_interface import UserInterface
+    except ImportError as exc:
+        print('sprites are skipped: {}'.format(exc))
+        return []
+
+    pictures_path = tempfile.mkdtemp()
+    results = []
+    try:
+        for count in sizes:
+            scene = BenchmarkScene(count=count, scenario='mixed', seed=0, broadphase=BROADPHASE_SPATIAL_HASH)
+            statuses = [scene.get_objects_status()]
+            for _ in range(4):
+                scene.game_step()
+                statuses.append(scene.get_objects_status())
+            # UI живет в своем процессе без сцены - тут тоже
+            set_current_scene(None)
+            ui = UserInterface('benchmark', 'tests.default_theme', field=scene.field, theme_overrides=dict(
+                PICTURES_PATH=pictures_path, METER_1_COLOR=(255, 0, 0), METER_2_COLOR=(255, 0, 0)))
+            ui._max_fps = 0
+            for cls in SCENARIO_CLASSES['mixed']:
+                image = pygame.Surface((20, 20))
+                image.fill((0, 255, 0))
+                pygame.image.save(image, os.path.join(pictures_path, '{}.png'.format(cls.__name__.lower())))
+
+            def frames():
+                for objects_status in statuses:
+                    ui.update_state(objects_status)
+                    ui.draw()
+
+            result = measure(frames, repeat=repeat, units=len(statuses))
+            result.update(name='sprites', objects=count)
+            result['frames_per_second'] = result.pop('per_second')
+            results.append(result)
+            _print_result(result)
+            for group in ui.sprites_by_layer:
+                for sprite in group:
+                    sprite.kill()
+            pygame.quit()
+    finally:
+        shutil.rmtree(pictures_path, ignore_errors=True)
+    return results
+
+
+def _result_key(result):
+    return tuple(str(result.get(key)) for key in ('name', 'scenario', 'objects', 'broadphase', 'kinematics'))
+
+
+def _print_result(result):
+    name = ' '.join(str(result[key]) for key in ('name', 'scenario', 'objects') if key in result)
+    print('{:<32} {:10.4f}s {:>12} blocks {:>12} peak bytes'.format(
+        name, result['seconds'], result['blocks'], result['peak_bytes']))
+
+
+def compare(results, baseline):
+    baseline = dict((_result_key(result), result) for result in baseline['results'])
+    for result in results:
+        old = baseline.get(_result_key(result))
+        if old is None:
+            continue
+        if 'seconds' not in result:
+            print('{:<40} {:+7.1f}% bytes per object {:+7.1f} blocks per step'.format(
+                ' '.join(key for key in _result_key(result) if key != 'None'),
+                (result['bytes_per_object'] / old['bytes_per_object'] - 1) * 100,
+                result['blocks_per_step'] - old['blocks_per_step']))
+            continue
+        print('{:<40} {:+7.1f}% time {:+7.1f}% blocks'.format(
+            ' '.join(key for key in _result_key(result) if key != 'None'),
+            (result['seconds'] / old['seconds'] - 1) * 100,
+            (result['blocks'] - old['blocks']) * 100.0 / (old['blocks'] or 1)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=['mixed'])
+    parser.add_argument('--steps', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--broadphase', choices=sorted(BROADPHASES), default=BROADPHASE_SPATIAL_HASH)
+    parser.add_argument('--kinematics', choices=(KINEMATICS_OBJECTS, KINEMATICS_NUMPY), default=KINEMATICS_OBJECTS)
+    parser.add_argument('--skip', nargs='+', default=[],
+                        choices=('scenes', 'geometry', 'trig', 'memory', 'status', 'protocol', 'sprites'))
+    parser.add_argument('--output', help='write results to the JSON file')
+    parser.add_argument('--baseline', help='JSON file of previous run to compare with')
+    args = parser.parse_args()
+
+    results = []
+    if 'scenes' not in args.skip:
+        results.extend(bench_scenes(args.sizes, args.scenarios, args.steps, args.broadphase, args.kinematics,
+                                    args.repeat))
+    if 'geometry' not in args.skip:
+        results.extend(bench_geometry(args.repeat))
+    if 'trig' not in args.skip:
+        results.extend(bench_trig(args.repeat))
+    if 'memory' not in args.skip:
+        results.extend(bench_memory(args.sizes, args.steps))
+    if 'status' not in args.skip:
+        results.extend(bench_status(args.sizes, args.repeat))
+    if 'protocol' not in args.skip:
+        results.extend(bench_protocol(args.sizes, args.repeat))
+    if 'sprites' not in args.skip:
+        results.extend(bench_sprites(args.sizes, args.repeat))
+
+    report = dict(
+        python=platform.python_version(),
+        platform=platform.platform(),
+        time=time.strftime('%Y-%m-%dT%H:%M:%S'),
+        results=results,
+    )
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            compare(results, json.load(baseline))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,437 @@
+# -*- coding: utf-8 -*-
+from collections import defaultdict
+from heapq import merge
+import math
+from operator import attrgetter
+
+from .constants import (BROADPHASE_BRUTE_FORCE, BROADPHASE_SPATIAL_HASH, BROADPHASE_SWEEP_AND_PRUNE,
+                        BROADPHASE_NUMPY)
+from .exceptions import RobogameException
+from .spatial import SpatialHash
+from .utils import CanLogging
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def is_owner_pair(left, right):
+    """
+        Is one of objects owned by another - they never collide
+    """
+    try:
+        return right.owner == left or left.owner == right
+    except AttributeError:
+        return False
+
+
+def get_overlap_distance(left, right):
+    """
+        Overlap distance of two objects or None if they are not overlapped
+    """
+    if is_owner_pair(left, right):
+        return None
+    summ_radius = left.radius + right.radius
+    if abs(left.x - right.x) > summ_radius or abs(left.y - right.y) > summ_radius:
+        return None
+    distance = left.distance_to(right)
+    overlap_distance = int(summ_radius - distance)
+    if overlap_distance > 1:
+        return overlap_distance
+    return None
+
+
+def get_time_of_impact(start, dx, dy, center, radius):
+    """
+        Part of step [0..1] when circle moving from start by (dx, dy)
+        touches circle at center with summary radius, None if not touches
+    """
+    fx, fy = start.x - center.x, start.y - center.y
+    a = dx * dx + dy * dy
+    b = 2 * (fx * dx + fy * dy)
+    c = fx * fx + fy * fy - radius * radius
+    if c <= 0:
+        return 0.0
+    if not a or b >= 0:
+        # стоит на месте или удаляется
+        return None
+    discriminant = b * b - 4 * a * c
+    if discriminant < 0:
+        return None
+    time_of_impact = (-b - math.sqrt(discriminant)) / (2 * a)
+    if time_of_impact > 1:
+        return None
+    return time_of_impact
+
+
+class Broadphase(CanLogging):
+    """
+        Build overlap map of scene objects: obj -> [(overlap_distance, other_obj), ...]
+    """
+
+    # сетка, построенная на последнем шаге - ее переиспользуют пространственные запросы сцены
+    spatial_index = None
+
+    def __init__(self, scene):
+        self.scene = scene
+
+    def add_object(self, obj):
+        pass
+
+    def remove_object(self, obj):
+        pass
+
+    def get_overlap_map(self, objects):
+        raise NotImplementedError()
+
+    @staticmethod
+    def _fill_overlap_map(objects, pairs):
+        overlap_map = defaultdict(list)
+        for i, j in pairs:
+            left, right = objects[i], objects[j]
+            overlap_distance = get_overlap_distance(left, right)
+            if overlap_distance is not None:
+                overlap_map[left].append((overlap_distance, right))
+                overlap_map[right].append((overlap_distance, left))
+        return overlap_map
+
+
+class BruteForceBroadphase(Broadphase):
+    """
+        Check every pair of objects - O(n^2)
+    """
+
+    def get_overlap_map(self, objects):
+        overlap_map = defaultdict(list)
+        objects = list(objects)
+        for i, left in enumerate(objects):
+            for right in objects[i + 1:]:
+                overlap_distance = get_overlap_distance(left, right)
+                if overlap_distance is not None:
+                    overlap_map[left].append((overlap_distance, right))
+                    overlap_map[right].append((overlap_distance, left))
+        return overlap_map
+
+
+class SpatialHashBroadphase(Broadphase):
+    """
+        Check only pairs from neighbour cells of uniform grid
+    """
+
+    def get_overlap_map(self, objects):
+        theme = self.scene.theme
+        grid = SpatialHash.from_objects(objects, width=theme.FIELD_WIDTH, height=theme.FIELD_HEIGHT)
+        self.spatial_index = grid
+        return self._fill_overlap_map(grid.objects, grid.candidate_pairs())
+
+
+class _Endpoint(object):
+    __slots__ = ('obj', 'is_min', 'value', 'dead')
+
+    def __init__(self, obj, is_min):
+        self.obj = obj
+        self.is_min = is_min
+        self.value = 0
+        self.dead = False
+
+
+class SweepAndPruneBroadphase(Broadphase):
+    """
+        Persistent sorted intervals of objects along both axes.
+        Objects move a little between steps, so lists are almost sorted
+        and insertion sort with pairs tracking on each swap is nearly O(n).
+        Endpoints of removed objects are only marked, the sort drops them on its pass
+    """
+
+    def __init__(self, scene):
+        super(SweepAndPruneBroadphase, self).__init__(scene=scene)
+        self._axes = ([], [])
+        self._endpoints = {}
+        # (obj, obj) -> на скольких осях пересекаются интервалы
+        self._overlaps = {}
+        self._partners = defaultdict(set)
+        self._pairs = set()
+        # новые объекты в порядке добавления
+        self._added = {}
+
+    def add_object(self, obj):
+        endpoints = (_Endpoint(obj, True), _Endpoint(obj, False), _Endpoint(obj, True), _Endpoint(obj, False))
+        self._endpoints[obj] = endpoints
+        # вставка отложена до следующего шага - новые объекты вливаются в оси одним проходом
+        self._added[obj] = None
+
+    def remove_object(self, obj):
+        endpoints = self._endpoints.pop(obj, None)
+        if endpoints is None:
+            return
+        if obj in self._added:
+            del self._added[obj]
+            return
+        for endpoint in endpoints:
+            endpoint.dead = True
+        for other in self._partners.pop(obj, ()):
+            key = self._pair_key(obj, other)
+            del self._overlaps[key]
+            self._pairs.discard(key)
+            self._partners[other].discard(obj)
+
+    def get_overlap_map(self, objects):
+        objects = list(objects)
+        for obj, endpoints in self._endpoints.items():
+            self._update_endpoints(obj, endpoints)
+        for axis in self._axes:
+            self._insertion_sort(axis)
+        if self._added:
+            self._merge_added()
+        indexes = dict((obj, i) for i, obj in enumerate(objects))
+        pairs = []
+        for left, right in self._pairs:
+            i, j = indexes[left], indexes[right]
+            pairs.append((i, j) if i < j else (j, i))
+        pairs.sort()
+        return self._fill_overlap_map(objects, pairs)
+
+    def _merge_added(self):
+        added = set(self._added)
+        for number, axis in enumerate(self._axes):
+            new_endpoints = []
+            for obj in self._added:
+                new_endpoints.extend(self._endpoints[obj][number * 2:number * 2 + 2])
+            new_endpoints.sort(key=attrgetter('value'))
+            axis[:] = merge(axis, new_endpoints, key=attrgetter('value'))
+            # проход по оси: открытые интервалы пересекаются с открывающимся
+            opened = set()
+            for endpoint in axis:
+                obj = endpoint.obj
+                if endpoint.is_min:
+                    is_added = obj in added
+                    for other in opened:
+                        if is_added or other in added:
+                            self._swap_pair(obj, other, 1)
+                    opened.add(obj)
+                else:
+                    opened.discard(obj)
+        self._added = {}
+
+    @staticmethod
+    def _update_endpoints(obj, endpoints):
+        x, y, radius = obj.x, obj.y, obj.radius
+        endpoints[0].value = x - radius
+        endpoints[1].value = x + radius
+        endpoints[2].value = y - radius
+        endpoints[3].value = y + radius
+
+    @staticmethod
+    def _pair_key(left, right):
+        return (left, right) if id(left) < id(right) else (right, left)
+
+    def _insertion_sort(self, axis):
+        # живые концы сдвигаются на место мертвых - отсортированная часть всегда не правее читаемого
+        size = 0
+        for i in range(len(axis)):
+            endpoint = axis[i]
+            if endpoint.dead:
+                continue
+            value = endpoint.value
+            j = size - 1
+            while j >= 0 and axis[j].value > value:
+                other = axis[j]
+                if endpoint.is_min != other.is_min:
+                    # начало интервала ушло левее чужого конца - пересеклись,
+                    # конец интервала ушел левее чужого начала - разошлись
+                    self._swap_pair(endpoint.obj, other.obj, 1 if endpoint.is_min else -1)
+                axis[j + 1] = other
+                j -= 1
+            axis[j + 1] = endpoint
+            size += 1
+        del axis[size:]
+
+    def _swap_pair(self, left, right, delta):
+        key = self._pair_key(left, right)
+        count = self._overlaps.get(key, 0) + delta
+        if count:
+            self._overlaps[key] = count
+            self._partners[left].add(right)
+            self._partners[right].add(left)
+        else:
+            self._overlaps.pop(key, None)
+            self._partners[left].discard(right)
+            self._partners[right].discard(left)
+        if count == 2:
+            self._pairs.add(key)
+        else:
+            self._pairs.discard(key)
+
+
+class NumpyBroadphase(Broadphase):
+    """
+        Vectorized overlaps computation over packed arrays of objects.
+        Objects are sorted by x, so each block of rows is compared
+        only with objects not further than the biggest diameter
+    """
+    block_size = 256
+
+    def __init__(self, scene):
+        if numpy is None:
+            raise RobogameException("Broadphase {} needs numpy installed!".format(BROADPHASE_NUMPY))
+        super(NumpyBroadphase, self).__init__(scene=scene)
+
+    def get_overlap_map(self, objects):
+        objects = list(objects)
+        pairs, overlaps = self.get_overlaps(objects)
+        overlap_map = defaultdict(list)
+        for (i, j), overlap_distance in zip(pairs.tolist(), overlaps.tolist()):
+            left, right = objects[i], objects[j]
+            overlap_map[left].append((overlap_distance, right))
+            overlap_map[right].append((overlap_distance, left))
+        return overlap_map
+
+    def get_overlaps(self, objects):
+        """
+            Overlapped pairs of objects indexes (i < j) in nested loop order and its overlap distances
+        """
+        count = len(objects)
+        if count < 2:
+            return numpy.empty((0, 2), dtype=numpy.int64), numpy.empty(0, dtype=numpy.int64)
+        xs, ys, radiuses, owners = self.pack(objects)
+        order = numpy.argsort(xs, kind='stable')
+        xs, ys, radiuses, owners = xs[order], ys[order], radiuses[order], owners[order]
+        max_diameter = 2 * radiuses.max()
+        found_pairs, found_overlaps = [], []
+        for begin in range(0, count, self.block_size):
+            end = min(begin + self.block_size, count)
+            till = int(numpy.searchsorted(xs, xs[end - 1] + max_diameter, side='right'))
+            dx = xs[begin:end, None] - xs[None, begin:till]
+            dy = ys[begin:end, None] - ys[None, begin:till]
+            summ_radius = radiuses[begin:end, None] + radiuses[None, begin:till]
+            overlap = numpy.trunc(summ_radius - numpy.sqrt(dx * dx + dy * dy))
+            rows, cols = numpy.nonzero(overlap > 1)
+            upper = cols > rows
+            rows, cols = rows[upper], cols[upper]
+            left, right = order[begin + rows], order[begin + cols]
+            found_pairs.append(numpy.stack([numpy.minimum(left, right), numpy.maximum(left, right)], axis=1))
+            found_overlaps.append(overlap[rows, cols].astype(numpy.int64))
+        pairs = numpy.concatenate(found_pairs)
+        overlaps = numpy.concatenate(found_overlaps)
+        if len(pairs):
+            # пропускаем пары владелец-снаряд
+            owned = owners[numpy.argsort(order)]
+            left, right = pairs[:, 0], pairs[:, 1]
+            right_owner, left_owner = owned[right], owned[left]
+            skip = (right_owner == left) | ((right_owner != NO_OWNER_ATTR) & (left_owner == right))
+            pairs, overlaps = pairs[~skip], overlaps[~skip]
+            sorted_by = numpy.lexsort((pairs[:, 1], pairs[:, 0]))
+            pairs, overlaps = pairs[sorted_by], overlaps[sorted_by]
+        return pairs, overlaps
+
+    @staticmethod
+    def pack(objects):
+        """
+            Structure of arrays: x, y, radius and owner index of objects
+        """
+        count = len(objects)
+        indexes = dict((id(obj), i) for i, obj in enumerate(objects))
+        xs = numpy.fromiter((obj.x for obj in objects), dtype=numpy.float64, count=count)
+        ys = numpy.fromiter((obj.y for obj in objects), dtype=numpy.float64, count=count)
+        radiuses = numpy.fromiter((obj.radius for obj in objects), dtype=numpy.float64, count=count)
+        owners = numpy.fromiter((_owner_index(obj, indexes) for obj in objects), dtype=numpy.int64, count=count)
+        return xs, ys, radiuses, owners
+
+
+NO_OWNER = -1
+NO_OWNER_ATTR = -2
+
+
+def _owner_index(obj, indexes):
+    try:
+        owner = obj.owner
+    except AttributeError:
+        return NO_OWNER_ATTR
+    return indexes.get(id(owner), NO_OWNER)
+
+
+class IterativeResolver(object):
+    """
+        Push apart all collided objects of the step at once:
+        contacts are relaxed a fixed number of iterations over packed coordinates,
+        objects coordinates are updated once at the end
+    """
+
+    def __init__(self, scene, iterations):
+        self.scene = scene
+        self.iterations = iterations
+
+    def get_contacts(self, objects, overlap_map):
+        """
+            Overlapped pairs of objects, each pair once, in objects order
+        """
+        contacts = []
+        visited = set()
+        for left in objects:
+            overlapped = overlap_map.get(left)
+            if not overlapped:
+                continue
+            visited.add(left)
+            for _, right in overlapped:
+                if right not in visited:
+                    contacts.append((left, right))
+        return contacts
+
+    def resolve(self, contacts):
+        indexes = {}
+        packed = []
+        xs, ys, radiuses = [], [], []
+        for left, right in contacts:
+            for obj in (left, right):
+                if obj not in indexes:
+                    indexes[obj] = len(packed)
+                    packed.append(obj)
+                    xs.append(obj.x)
+                    ys.append(obj.y)
+                    radiuses.append(obj.radius)
+        # соседи тоже могут налезть друг на друга при расталкивании
+        theme = self.scene.theme
+        grid = SpatialHash.from_objects(packed, width=theme.FIELD_WIDTH, height=theme.FIELD_HEIGHT)
+        # владелец и его снаряд не расталкиваются - как и в попарной проверке
+        pairs = [(i, j) for i, j in grid.candidate_pairs() if not is_owner_pair(packed[i], packed[j])]
+        for _ in range(self.iterations):
+            moved = False
+            for i, j in pairs:
+                dx, dy = xs[i] - xs[j], ys[i] - ys[j]
+                distance = math.sqrt(dx * dx + dy * dy)
+                penetration = radiuses[i] + radiuses[j] - distance
+                if penetration <= 0:
+                    continue
+                if distance:
+                    ratio = penetration / 2 / distance
+                    dx, dy = dx * ratio, dy * ratio
+                else:
+                    # центры совпали - расталкиваем по горизонтали
+                    dx, dy = penetration / 2, 0
+                xs[i] += dx
+                ys[i] += dy
+                xs[j] -= dx
+                ys[j] -= dy
+                moved = True
+            if not moved:
+                break
+        for obj, x, y in zip(packed, xs, ys):
+            obj.coord.x = x
+            obj.coord.y = y
+
+
+BROADPHASES = {
+    BROADPHASE_BRUTE_FORCE: BruteForceBroadphase,
+    BROADPHASE_SPATIAL_HASH: SpatialHashBroadphase,
+    BROADPHASE_SWEEP_AND_PRUNE: SweepAndPruneBroadphase,
+    BROADPHASE_NUMPY: NumpyBroadphase,
+}
+
+
+def get_broadphase(name, scene):
+    try:
+        broadphase_class = BROADPHASES[name]
+    except KeyError:
+        raise RobogameException("Unknown broadphase {}! Use one of {}".format(name, ', '.join(BROADPHASES)))
+    return broadphase_class(scene=scene)
@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from robogame_engine.exceptions import RobogameException
-from .theme import theme
 from .geometry import Point, Vector
 from .utils import CanLogging
 
@@ -62,7 +61,7 @@ class TurnCommand(Command):
             self.vector = Vector.from_points(point1=self.obj.coord, point2=target)
         elif isinstance(target, (int, float)):
             direction = target
-            self.vector = Vector.from_direction(direction=direction, module=theme.MAX_SPEED)
+            self.vector = Vector.from_direction(direction=direction, module=obj.theme.MAX_SPEED)
             self.target = obj.coord + self.vector * 500
         else:
             raise RobogameException("use GameObject.turn_to(GameObject/Point "
@@ -10,6 +10,15 @@ HEARTBEAT_INTERVAL = 5
 MAX_LAYERS = 5
 
 GAME_STEP_MIN_TIME = 0.015
+MAX_CATCH_UP_STEPS = 5
+
+# быстрая математика углов: таблицы sin/cos и кэш матриц поворота, см. geometry.TrigTables
+FAST_MATH = False
+FAST_MATH_STEPS_PER_DEGREE = 10
+
+# профилирование фаз игрового шага, отчет в конце игры
+PROFILE = False
+PROFILE_WINDOW = 1000
 
 DEBUG = False
 
@@ -19,6 +28,22 @@ ROTATE_FLIP_HORIZONTAL = 'FLIP_HORIZONTAL'
 ROTATE_FLIP_BOTH = 'FLIP_BOTH'
 ROTATE_NO_TURN = 'NO_TURN'
 
+BROADPHASE_BRUTE_FORCE = 'BRUTE_FORCE'
+BROADPHASE_SPATIAL_HASH = 'SPATIAL_HASH'
+BROADPHASE_SWEEP_AND_PRUNE = 'SWEEP_AND_PRUNE'
+BROADPHASE_NUMPY = 'NUMPY'
+
+KINEMATICS_OBJECTS = 'OBJECTS'
+KINEMATICS_NUMPY = 'NUMPY'
+
+RESOLVER_PAIRWISE = 'PAIRWISE'
+RESOLVER_ITERATIVE = 'ITERATIVE'
+
+# состояние объектов для UI: словарь ObjectStatus или бинарные кадры robogame_engine.protocol
+STATE_PROTOCOL_PICKLE = 'PICKLE'
+STATE_PROTOCOL_BINARY = 'BINARY'
+STATE_KEYFRAME_INTERVAL = 50
+
 BACKGROUND_COLOR = (128, 128, 128)
 
 TEAMS_COUNT = 1
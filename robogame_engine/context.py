@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+"""
+    Current scene of the thread: new game objects go to it and
+    the module level theme resolves to its theme
+"""
+import threading
+
+_local = threading.local()
+
+
+def get_current_scene():
+    return getattr(_local, 'scene', None)
+
+
+def set_current_scene(scene):
+    _local.scene = scene
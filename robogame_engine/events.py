@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
+from types import FunctionType
 import warnings
 
 from .utils import CanLogging
@@ -7,8 +8,13 @@ from .utils import CanLogging
 
 class GameEvent(CanLogging):
     """
-        Base class for objects events
+        Base class for objects events.
+        Event with handler_name is dispatched to the object method with that name
+        (with event objects as argument if handler_with_objects), otherwise handle() is called.
+        Subclass which overrides handle() is handled by it
     """
+    handler_name = None
+    handler_with_objects = False
 
     def __init__(self, event_objs=None):  # TODO переделать на кварги
         self._event_objs = event_objs or []
@@ -27,29 +33,38 @@ class GameEvent(CanLogging):
 
 
 class EventBorned(GameEvent):
+    handler_name = 'on_born'
 
     def handle(self, obj):
         obj.on_born()
 
 
 class EventStopped(GameEvent):
+    handler_name = 'on_stop'
 
     def handle(self, obj):
         obj.on_stop()
 
 
 class EventStoppedAtTargetPoint(GameEvent):
+    handler_name = 'on_stop_at_target'
+    handler_with_objects = True
 
     def handle(self, obj):
         obj.on_stop_at_target(self._event_objs)
 
 
 class EventCollide(GameEvent):
+    handler_name = 'on_collide_with'
+    handler_with_objects = True
 
     def handle(self, obj):
         obj.on_collide_with(self._event_objs)
 
+
 class EventOverlap(GameEvent):
+    handler_name = 'on_overlap_with'
+    handler_with_objects = True
 
     def handle(self, obj):
         obj.on_overlap_with(self._event_objs)
@@ -60,3 +75,53 @@ class EventHeartbeat(GameEvent):
     def handle(self, obj):
         warnings.warn('on_hearbeat was renamed to on_heartbeat and will be removed in next release')
         obj.on_hearbeat()  # TODO перевести на on_heartbeat
+
+
+class EventTimer(GameEvent):
+
+    def __init__(self, callback):
+        super(EventTimer, self).__init__()
+        self.callback = callback
+
+    def handle(self, obj):
+        self.callback()
+
+
+# (класс объекта, имя обработчика) -> функция класса или None, если это не простая функция
+_handlers = {}
+
+
+def get_class_handler(cls, handler_name):
+    """
+        Handler function of the class, cached. None if it can't be called as function(obj, ...)
+    """
+    key = (cls, handler_name)
+    try:
+        return _handlers[key]
+    except KeyError:
+        handler = getattr(cls, handler_name, None)
+        if not isinstance(handler, FunctionType):
+            handler = None
+        _handlers[key] = handler
+        return handler
+
+
+# класс события -> handler_name для прямого вызова или None
+_handler_names = {}
+
+
+def get_handler_name(event_class):
+    """
+        handler_name of the event class, cached. None if a subclass overrides handle() of the class
+        which declared handler_name - then handle() must be called
+    """
+    try:
+        return _handler_names[event_class]
+    except KeyError:
+        handler_name = event_class.handler_name
+        if handler_name is not None:
+            declaring = next(base for base in event_class.__mro__ if 'handler_name' in vars(base))
+            if event_class.handle is not declaring.handle:
+                handler_name = None
+        _handler_names[event_class] = handler_name
+        return handler_name
@@ -13,6 +13,7 @@ def normalise_angle(a):
 
 
 class Point(object):
+    __slots__ = ('x', 'y')
 
     @classmethod
     def from_point(cls, point):
@@ -27,8 +28,8 @@ class Point(object):
         """
             The distance to other points
         """
-        from robogame_engine import GameObject
-        if isinstance(other, GameObject):
+        if not isinstance(other, Point):
+            # GameObject - без импорта на каждый вызов
             other = other.coord
         assert isinstance(other, Point)
         return math.sqrt((self.x - other.x) ** 2 + (self.y - other.y) ** 2)
@@ -73,10 +74,14 @@ class Point(object):
 
 
 class Vector(object):
+    __slots__ = ('x', 'y', '_direction', '_module')
 
     def __init__(self, x, y):
         self.x = x
         self.y = y
+        # кэши, None - не вычислено
+        self._direction = None
+        self._module = None
 
     @classmethod
     def from_points(cls, point1, point2, module=None):
@@ -92,7 +97,18 @@ class Vector(object):
         return cls(x, y)
 
     @classmethod
-    def from_direction(cls, direction, module):
+    def from_direction(cls, direction, module, tables=None):
+        """
+            Vector of the direction in degrees. With TrigTables integer directions 0..359 take
+            prepared cos and sin and the vector gets cached direction and module.
+            Other directions are computed exactly - rounding to the table is slower than math.cos
+        """
+        if tables is not None and direction.__class__ is int and 0 <= direction < 360:
+            vector = cls(tables.degree_cos[direction] * module, tables.degree_sin[direction] * module)
+            if module > 0:
+                vector._direction = direction
+                vector._module = module
+            return vector
         rads = cls.to_radian(direction)
         x = math.cos(rads) * module
         y = math.sin(rads) * module
@@ -104,19 +120,17 @@ class Vector(object):
 
     @property
     def direction(self):
-        try:
-            return self._direction
-        except AttributeError:
-            self._direction = self._get_direction()
-            return self._direction
+        direction = self._direction
+        if direction is None:
+            direction = self._direction = self._get_direction()
+        return direction
 
     @property
     def module(self):
-        try:
-            return self._module
-        except AttributeError:
-            self._module = self._get_module()
-            return self._module
+        module = self._module
+        if module is None:
+            module = self._module = self._get_module()
+        return module
 
     def _get_direction(self):
         if self.x == 0:
@@ -137,11 +151,44 @@ class Vector(object):
     def calc_module(x, y):
         return math.sqrt(x ** 2 + y ** 2)
 
-    def rotate(self, delta):
+    def rotate(self, delta, tables=None):
+        """
+            Rotate by delta degrees. With TrigTables - by the cached rotation matrix,
+            the cached direction is shifted by delta instead of computing it again
+        """
+        if tables is not None:
+            cos, sin = tables.rotation(delta)
+            x, y = self.x, self.y
+            self.x = x * cos - y * sin
+            self.y = x * sin + y * cos
+            direction = self._direction
+            if direction is not None:
+                self._direction = normalise_angle(direction + delta)
+            return
         rad = self.to_radian(self.direction + delta)
         self.x = math.cos(rad) * self.module
         self.y = math.sin(rad) * self.module
-        delattr(self, '_direction')
+        self._direction = None
+
+    def __iadd__(self, other):
+        assert isinstance(other, Vector)
+        self.x += other.x
+        self.y += other.y
+        self._direction = self._module = None
+        return self
+
+    def __isub__(self, other):
+        assert isinstance(other, Vector)
+        self.x -= other.x
+        self.y -= other.y
+        self._direction = self._module = None
+        return self
+
+    def __imul__(self, other):
+        self.x *= other
+        self.y *= other
+        self._direction = self._module = None
+        return self
 
     def __str__(self):
         return 'v({:.1f},{:.1f})'.format(self.direction, self.module)
@@ -162,6 +209,66 @@ class Vector(object):
         return self.__class__(self.x, self.y)
 
 
+class TrigTables(object):
+    """
+        Fast angle math: sin/cos tables with steps_per_degree resolution and cached rotation matrices.
+
+        Accuracy bounds:
+            - lookup rounds the angle to the nearest table step: the direction error is not more than
+              0.5 / steps_per_degree degrees, the error of vector components is not more than
+              module * pi / 360 / steps_per_degree. Angles on the table grid (integer degrees
+              for any integer resolution) give exactly math.cos/math.sin values;
+            - rotation by the matrix is exact up to float rounding: after n rotations the module
+              differs from the original one less than n * 4e-16 relative, the direction - less than
+              n * 1e-13 degrees from the sum of deltas kept in the direction cache.
+    """
+    max_rotations = 1024  # разных поворотов немного - скорости поворота, но кэш не растет бесконечно
+
+    def __init__(self, steps_per_degree=10):
+        self.steps_per_degree = steps_per_degree
+        self.size = 360 * steps_per_degree
+        angles = [Vector.to_radian(index / float(steps_per_degree)) for index in range(self.size)]
+        self.cos = [math.cos(angle) for angle in angles]
+        self.sin = [math.sin(angle) for angle in angles]
+        # для целых градусов - те же значения, что и math.cos/math.sin
+        radians = [Vector.to_radian(degree) for degree in range(360)]
+        self.degree_cos = [math.cos(angle) for angle in radians]
+        self.degree_sin = [math.sin(angle) for angle in radians]
+        self._rotations = {}
+
+    def lookup(self, direction):
+        """
+            Direction rounded to the table step (0 <= direction < 360), its cos and sin
+        """
+        index = int(round(direction * self.steps_per_degree)) % self.size
+        return index / float(self.steps_per_degree), self.cos[index], self.sin[index]
+
+    def rotation(self, delta):
+        """
+            cos and sin of the rotation matrix for delta degrees
+        """
+        matrix = self._rotations.get(delta)
+        if matrix is None:
+            if len(self._rotations) >= self.max_rotations:
+                self._rotations.clear()
+            rad = Vector.to_radian(delta)
+            matrix = self._rotations[delta] = (math.cos(rad), math.sin(rad))
+        return matrix
+
+
+_trig_tables = {}
+
+
+def get_trig_tables(steps_per_degree):
+    """
+        Shared tables of the resolution
+    """
+    tables = _trig_tables.get(steps_per_degree)
+    if tables is None:
+        tables = _trig_tables[steps_per_degree] = TrigTables(steps_per_degree=steps_per_degree)
+    return tables
+
+
 def get_arctan(dy, dx):
     """
         Determine the angle in degrees for the twins
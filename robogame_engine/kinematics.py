@@ -0,0 +1,376 @@
+# -*- coding: utf-8 -*-
+import math
+
+from .constants import KINEMATICS_NUMPY
+from .exceptions import RobogameException
+from .geometry import Point, Vector
+from .states import StateMoving, StateTurning, StateStopped, StateDead
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+KIND_IDLE = 0  # стоит - только проверка выхода за границы поля
+KIND_MOVING = 1
+KIND_TURNING = 2
+KIND_SCALAR = 3  # свой класс состояния - его step() вызывается как обычно
+
+NO_TARGET = -1
+NOT_CACHED = float('nan')
+
+_IDLE_STATES = (StateStopped, StateDead)
+
+
+class KinematicsArrays(object):
+    """
+        Structure of arrays: coordinates, vectors, states parameters and radiuses of all scene objects.
+        GameObject.coord and GameObject.vector are views into the arrays.
+        Steady movement and turning of all objects and the boundary check are made by one vectorized pass,
+        objects which reach the target, finish the turn or run out of the field are stepped
+        by the usual code of states - they fire the same events.
+    """
+    fields = (
+        'x', 'y', 'vx', 'vy', 'vdir', 'vmod', 'radius',
+        # параметры состояния: цель, вектор движения, скорость поворота
+        'tx', 'ty', 'svx', 'svy', 'sdir', 'smod', 'speed', 'turn_speed',
+    )
+
+    def __init__(self, scene, capacity=64):
+        if numpy is None:
+            raise RobogameException("Kinematics {} needs numpy installed!".format(KINEMATICS_NUMPY))
+        self.scene = scene
+        self.objects = []
+        self.free = []
+        self.capacity = 0
+        for name in self.fields:
+            setattr(self, name, numpy.zeros(0, dtype=numpy.float64))
+        self.kind = numpy.zeros(0, dtype=numpy.int8)
+        self.target = numpy.zeros(0, dtype=numpy.int64)
+        self._grow(capacity)
+
+    def _grow(self, capacity):
+        count = self.capacity
+        for name in self.fields:
+            array = numpy.full(capacity, NOT_CACHED)
+            array[:count] = getattr(self, name)
+            setattr(self, name, array)
+        kind = numpy.zeros(capacity, dtype=numpy.int8)
+        kind[:count] = self.kind
+        self.kind = kind
+        target = numpy.full(capacity, NO_TARGET, dtype=numpy.int64)
+        target[:count] = self.target
+        self.target = target
+        self.capacity = capacity
+
+    def add_object(self, obj):
+        """
+            Put the object values into arrays, its coord and vector become views
+        """
+        if self.free:
+            index = self.free.pop()
+            self.objects[index] = obj
+        else:
+            index = len(self.objects)
+            if index == self.capacity:
+                self._grow(capacity=self.capacity * 2)
+            self.objects.append(obj)
+        self.kind[index] = KIND_IDLE
+        self.target[index] = NO_TARGET
+        self.radius[index] = obj.radius
+        attributes = obj.__dict__
+        coord = attributes['_coord']
+        if isinstance(coord, PointView):
+            # объект возвращен снимком сцены - ссылки на его точку остаются верными
+            coord._attach(self, index)
+        else:
+            view = PointView(self, index)
+            view.x, view.y = coord.x, coord.y
+            obj._coord = view
+        vector = attributes.get('_vector')
+        if isinstance(vector, VectorView):
+            vector._attach(self, index)
+        else:
+            view = VectorView(self, index)
+            if vector is not None:
+                view.set(vector)
+            obj._vector = view
+        obj._kinematics = self
+        state = attributes.get('_state')
+        if state is not None:
+            self.state_changed(obj, state)
+
+    def remove_object(self, obj):
+        """
+            Views of the removed object keep its last values
+        """
+        index = obj._coord._index
+        targeted = self.target[:len(self.objects)] == index
+        if targeted.any():
+            # цель исчезла - едем в ее последнюю точку
+            self.tx[:len(self.objects)][targeted] = self.x[index]
+            self.ty[:len(self.objects)][targeted] = self.y[index]
+            self.target[:len(self.objects)][targeted] = NO_TARGET
+        obj._coord._detach()
+        obj._vector._detach()
+        obj._kinematics = None
+        self.objects[index] = None
+        self.kind[index] = KIND_IDLE
+        self.free.append(index)
+
+    def clear(self):
+        for obj in self.objects:
+            if obj is not None:
+                obj._coord._detach()
+                obj._vector._detach()
+                obj._kinematics = None
+        self.objects = []
+        self.free = []
+
+    def state_changed(self, obj, state):
+        """
+            Remember parameters of the new state of the object
+        """
+        index = obj._coord._index
+        state_class = state.__class__
+        vector = state.vector
+        if state_class is StateMoving and vector is not None:
+            self.kind[index] = KIND_MOVING
+            target_point = state.target_point
+            if isinstance(target_point, PointView) and target_point._arrays is self:
+                # едем за другим объектом - берем его текущие координаты
+                self.target[index] = target_point._index
+            else:
+                self.target[index] = NO_TARGET
+                self.tx[index], self.ty[index] = target_point.x, target_point.y
+            self.svx[index], self.svy[index] = vector.x, vector.y
+            self.sdir[index] = NOT_CACHED if vector._direction is None else vector._direction
+            self.smod[index] = vector.module
+            self.speed[index] = state.speed
+        elif state_class is StateTurning and vector is not None:
+            self.kind[index] = KIND_TURNING
+            self.target[index] = NO_TARGET
+            self.sdir[index] = vector.direction
+            self.turn_speed[index] = state.turn_speed
+            self.speed[index] = state.speed
+        elif state_class in _IDLE_STATES:
+            self.kind[index] = KIND_IDLE
+            self.target[index] = NO_TARGET
+        else:
+            self.kind[index] = KIND_SCALAR
+            self.target[index] = NO_TARGET
+
+    def step(self, objects):
+        """
+            Game step of the objects: states step and the boundary check.
+            Radiuses are taken from objects - they can be changed at any time
+        """
+        if not objects:
+            return
+        indexes = numpy.fromiter((obj._coord._index for obj in objects), dtype=numpy.int64, count=len(objects))
+        self.radius[indexes] = [obj.radius for obj in objects]
+        kind = self.kind[indexes]
+        scalar = [self._move(indexes[kind == KIND_MOVING]),
+                  self._turn(indexes[kind == KIND_TURNING]),
+                  indexes[kind == KIND_SCALAR]]
+        objects = self.objects
+        for index in numpy.sort(numpy.concatenate(scalar)).tolist():
+            objects[index].state.step()
+        self._check_runout(indexes)
+
+    def _move(self, indexes):
+        """
+            Steady movement, returns indexes of objects reaching its targets
+        """
+        if not len(indexes):
+            return indexes
+        x, y = self.x, self.y
+        targets = self.target[indexes]
+        followed = targets != NO_TARGET
+        tx, ty = self.tx[indexes], self.ty[indexes]
+        tx[followed], ty[followed] = x[targets[followed]], y[targets[followed]]
+        distance = numpy.sqrt((x[indexes] - tx) ** 2 + (y[indexes] - ty) ** 2)
+        reached = distance < self.smod[indexes]
+        steady = indexes[~reached]
+        x[steady] += self.svx[steady]
+        y[steady] += self.svy[steady]
+        for name, state_name in (('vx', 'svx'), ('vy', 'svy'), ('vdir', 'sdir'), ('vmod', 'smod')):
+            getattr(self, name)[steady] = getattr(self, state_name)[steady]
+        return indexes[reached]
+
+    def _turn(self, indexes):
+        """
+            Steady turning, returns indexes of objects finishing the turn
+        """
+        if not len(indexes):
+            return indexes
+        direction = self._get_directions(indexes)
+        delta = self.sdir[indexes] - direction
+        turn_speed = self.turn_speed[indexes]
+        finished = numpy.abs(delta) < turn_speed
+        steady, delta, direction, turn_speed = (
+            indexes[~finished], delta[~finished], direction[~finished], turn_speed[~finished])
+        clockwise = ((-180 < delta) & (delta < 0)) | (delta > 180)
+        turn = numpy.where(clockwise, -turn_speed, turn_speed)
+        if self.scene.trig_tables is not None:
+            # как Vector.rotate с TrigTables - матрицей поворота, направление сдвигается на угол поворота
+            radians = (turn * math.pi) / 180
+            cos, sin = numpy.cos(radians), numpy.sin(radians)
+            vx, vy = self.vx[steady], self.vy[steady]
+            self.vx[steady] = vx * cos - vy * sin
+            self.vy[steady] = vx * sin + vy * cos
+            self.vdir[steady] = (direction + turn) % 360
+            return indexes[finished]
+        radians = ((direction + turn) * math.pi) / 180
+        module = self._get_modules(steady)
+        self.vx[steady] = numpy.cos(radians) * module
+        self.vy[steady] = numpy.sin(radians) * module
+        self.vdir[steady] = NOT_CACHED
+        return indexes[finished]
+
+    def _get_directions(self, indexes):
+        """
+            Directions of objects vectors, as Vector.direction
+        """
+        direction = self.vdir[indexes]
+        missing = numpy.isnan(direction)
+        if missing.any():
+            vx, vy = self.vx[indexes[missing]], self.vy[indexes[missing]]
+            with numpy.errstate(divide='ignore', invalid='ignore'):
+                computed = numpy.arctan(vy / vx) * (180 / math.pi)
+            computed = numpy.where(vx < 0, computed + 180, computed)
+            computed = numpy.where(vx == 0, numpy.where(vy >= 0, 90.0, 270.0), computed) % 360
+            direction[missing] = computed
+            self.vdir[indexes[missing]] = computed
+        return direction
+
+    def _get_modules(self, indexes):
+        module = self.vmod[indexes]
+        missing = numpy.isnan(module)
+        if missing.any():
+            vx, vy = self.vx[indexes[missing]], self.vy[indexes[missing]]
+            module[missing] = numpy.sqrt(vx ** 2 + vy ** 2)
+        self.vmod[indexes] = module
+        return module
+
+    def _check_runout(self, indexes):
+        theme = self.scene.theme
+        x, y, radius = self.x[indexes], self.y[indexes], self.radius[indexes]
+        runout = ((radius - x > 0) | (radius - y > 0) |
+                  (x - (theme.FIELD_WIDTH - radius) > 0) | (y - (theme.FIELD_HEIGHT - radius) > 0))
+        objects = self.objects
+        for index in indexes[runout].tolist():
+            objects[index]._check_runout()
+
+
+class _DetachedValues(object):
+    """
+        Values of the view of removed object
+    """
+
+    def __init__(self, arrays, index, names):
+        for name in names:
+            setattr(self, name, getattr(arrays, name)[index:index + 1].copy())
+
+
+class PointView(Point):
+    """
+        Coordinates of the object in KinematicsArrays
+    """
+    __slots__ = ('_arrays', '_index')
+    snapshot_slots = ('x', 'y')
+
+    def __init__(self, arrays, index):
+        self._arrays = arrays
+        self._index = index
+
+    @property
+    def x(self):
+        return self._arrays.x.item(self._index)
+
+    @x.setter
+    def x(self, value):
+        self._arrays.x[self._index] = value
+
+    @property
+    def y(self):
+        return self._arrays.y.item(self._index)
+
+    @y.setter
+    def y(self, value):
+        self._arrays.y[self._index] = value
+
+    def copy(self):
+        return Point(self.x, self.y)
+
+    def _attach(self, arrays, index):
+        x, y = self.x, self.y
+        self._arrays, self._index = arrays, index
+        self.x, self.y = x, y
+
+    def _detach(self):
+        self._arrays, self._index = _DetachedValues(self._arrays, self._index, names=('x', 'y')), 0
+
+
+class VectorView(Vector):
+    """
+        Vector of the object in KinematicsArrays, with cached direction and module
+    """
+    __slots__ = ('_arrays', '_index')
+    snapshot_slots = ('x', 'y', '_direction', '_module')
+
+    def __init__(self, arrays, index):
+        self._arrays = arrays
+        self._index = index
+
+    @property
+    def x(self):
+        return self._arrays.vx.item(self._index)
+
+    @x.setter
+    def x(self, value):
+        self._arrays.vx[self._index] = value
+
+    @property
+    def y(self):
+        return self._arrays.vy.item(self._index)
+
+    @y.setter
+    def y(self, value):
+        self._arrays.vy[self._index] = value
+
+    @property
+    def _direction(self):
+        direction = self._arrays.vdir.item(self._index)
+        return None if direction != direction else direction
+
+    @_direction.setter
+    def _direction(self, value):
+        self._arrays.vdir[self._index] = NOT_CACHED if value is None else value
+
+    @property
+    def _module(self):
+        module = self._arrays.vmod.item(self._index)
+        return None if module != module else module
+
+    @_module.setter
+    def _module(self, value):
+        self._arrays.vmod[self._index] = NOT_CACHED if value is None else value
+
+    def copy(self):
+        return Vector(self.x, self.y)
+
+    def set(self, vector):
+        """
+            Copy values and caches of the vector
+        """
+        if vector is not self:
+            self.x, self.y, self._direction, self._module = vector.x, vector.y, vector._direction, vector._module
+
+    def _attach(self, arrays, index):
+        values = self.x, self.y, self._direction, self._module
+        self._arrays, self._index = arrays, index
+        self.x, self.y, self._direction, self._module = values
+
+    def _detach(self):
+        self._arrays, self._index = _DetachedValues(self._arrays, self._index, names=('vx', 'vy', 'vdir', 'vmod')), 0
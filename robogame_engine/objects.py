@@ -1,17 +1,21 @@
 # -*- coding: utf-8 -*-
-from collections import defaultdict
-from queue import Queue
-from random import randint
+from collections import defaultdict, deque
 
 from robogame_engine.exceptions import RobogameException
 from robogame_engine.geometry import Vector, Point
 from .commands import TurnCommand, MoveCommand, StopCommand
 from .constants import ROTATE_NO_TURN
-from .events import (EventHeartbeat, EventStopped, EventBorned)
+from .context import get_current_scene, set_current_scene
+from .events import (EventHeartbeat, EventStopped, EventBorned, EventTimer, get_class_handler, get_handler_name)
 from .states import StateStopped, StateMoving
-from .theme import theme
 from .utils import CanLogging
 
+# события сердцебиения без состояния - одно на всех
+HEARTBEAT_EVENT = EventHeartbeat()
+
+_own_game_step = {}
+_handles_heartbeat = {}
+
 
 class GameObject(CanLogging):
     """
@@ -22,43 +26,84 @@ class GameObject(CanLogging):
     rotate_mode = ROTATE_NO_TURN
     selectable = True
     layer = 0
+    continuous_collisions = False  # проверять столкновения вдоль пути за шаг - для быстрых снарядов
+    _sleeping = False  # не в активном наборе сцены, см. Scene.track_activity
+    snapshot_fields = ()  # свои атрибуты, которые сохраняет Scene.snapshot (копируются по ссылке)
+    _states = None  # экземпляры состояний по классам, см. ObjectState.reuse
+    _kinematics = None  # массивы сцены, если coord и vector - их представления, см. Scene.kinematics
 
     _sprite_filename = None
     auto_team = False
-    __objects_count = 0
-    __container = None
-    __scene = None
     __team_name = None
 
     @classmethod
-    def link_to_scene(cls, scene, container):
-        cls.__scene = scene
-        cls.__container = container
+    def link_to_scene(cls, scene):
+        """
+            Make the scene current - new objects will be created in it
+        """
+        set_current_scene(scene)
 
-    def __init__(self, coord=None, radius=None, direction=None):
-        if self.__scene is None:
+    def __init__(self, coord=None, radius=None, direction=None, scene=None):
+        if scene is None:
+            scene = get_current_scene()
+        if scene is None:
             raise RobogameException("You must create Scene instance at first!")
+        self.__scene = scene
         if self.auto_team:
-            self.scene.register_to_team(obj=self)
+            scene.register_to_team(obj=self)
         if radius is None:
             radius = self.__class__.radius
         self.coord = coord if coord else Point(0, 0)
         self.radius = radius
-        self.__container.append(self)
-        GameObject.__objects_count += 1
-        self.id = GameObject.__objects_count
+        self.id = scene.get_next_object_id()
+        scene.add_object(self)
         if direction is None:
-            direction = randint(0, 360)
-        self.vector = Vector.from_direction(direction, module=1)
+            direction = scene.random.randint(0, 360)
+        self.vector = Vector.from_direction(direction, module=1, tables=scene.trig_tables)
         self.target = None
-        self.state = StateStopped(obj=self)
-        self._heartbeat_tics = theme.HEARTBEAT_INTERVAL
-        self._events = Queue()
-        self._commands = Queue()
+        self.state = StateStopped.reuse(self)
+        self._timers = set()
+        heartbeat_interval = scene.theme.HEARTBEAT_INTERVAL
+        self._timers.add(scene.timers.schedule(heartbeat_interval, self._heartbeat, interval=heartbeat_interval))
+        # обработка однопоточная - блокировки queue.Queue не нужны
+        self._events = deque()
+        self._commands = deque()
         self._selected = False
         self.add_event(EventBorned(self))
         self.debug('born {coord} {vector}')
 
+    @property
+    def coord(self):
+        return self._coord
+
+    @coord.setter
+    def coord(self, value):
+        if self._kinematics is None:
+            self._coord = value
+        elif value is not self._coord:
+            self._coord.x, self._coord.y = value.x, value.y
+
+    @property
+    def vector(self):
+        return self._vector
+
+    @vector.setter
+    def vector(self, value):
+        if self._kinematics is None:
+            self._vector = value
+        else:
+            self._vector.set(value)
+
+    @property
+    def state(self):
+        return self._state
+
+    @state.setter
+    def state(self, value):
+        self._state = value
+        if self._kinematics is not None:
+            self._kinematics.state_changed(self, value)
+
     @property
     def zoom(self):
         return 1
@@ -67,6 +112,14 @@ class GameObject(CanLogging):
     def scene(self):
         return self.__scene
 
+    @property
+    def trace_sink(self):
+        return self.__scene.trace_sink
+
+    @property
+    def theme(self):
+        return self.__scene.theme
+
     @property
     def direction(self):
         return self.vector.direction
@@ -128,22 +181,73 @@ class GameObject(CanLogging):
         self.__team_name = team_name
 
     def add_event(self, event):
-        self._events.put(event)
+        self._events.append(event)
+        if self._sleeping:
+            self.__scene.wake(self)
 
     def add_command(self, command):
-        self._commands.put(command)
+        self._commands.append(command)
+        if self._sleeping:
+            self.__scene.wake(self)
+
+    @classmethod
+    def has_own_game_step(cls):
+        """
+            Class overrides game_step - it can do something every step, so never sleeps
+        """
+        try:
+            return _own_game_step[cls]
+        except KeyError:
+            _own_game_step[cls] = own = cls.game_step is not GameObject.game_step
+            return own
+
+    @classmethod
+    def handles_heartbeat(cls):
+        try:
+            return _handles_heartbeat[cls]
+        except KeyError:
+            _handles_heartbeat[cls] = handles = (cls.on_heartbeat is not GameObject.on_heartbeat or
+                                                 cls.on_hearbeat is not GameObject.on_hearbeat)
+            return handles
 
     def proceed_events(self):
-        while not self._events.empty():
-            event = self._events.get()
+        recorder = self.__scene.recorder
+        if recorder is not None:
+            recorder.object_step(self)
+        events = self._events
+        cls = self.__class__
+        instance_attrs = self.__dict__
+        while events:
+            event = events.popleft()
             try:
-                event.handle(obj=self)
+                handler_name = get_handler_name(event.__class__)
+                if handler_name is None:
+                    event.handle(obj=self)
+                    continue
+                # обработчик может быть подменен у экземпляра
+                handler = instance_attrs.get(handler_name)
+                if handler is None:
+                    handler = get_class_handler(cls, handler_name)
+                    if handler is None:
+                        event.handle(obj=self)
+                    elif event.handler_with_objects:
+                        handler(self, event._event_objs)
+                    else:
+                        handler(self)
+                elif event.handler_with_objects:
+                    handler(event._event_objs)
+                else:
+                    handler()
             except Exception as exc:
-                self.error("Exception at {} event {} handle: {}".format(self, event, exc))
+                self.error("Exception at {} event {} handle: {}", self, event, exc)
 
     def proceed_commands(self):
-        while not self._commands.empty():
-            command = self._commands.get()
+        commands = self._commands
+        while commands:
+            command = commands.popleft()
+            recorder = self.__scene.recorder
+            if recorder is not None:
+                recorder.command(self, command)
             command.execute()
 
     def game_step(self):
@@ -153,7 +257,6 @@ class GameObject(CanLogging):
         self.debug('step {coord} {vector} {state}')
         self.state.step()
         self._check_runout()
-        self._heartbeat()
 
     def distance_to(self, obj):
         """
@@ -173,11 +276,31 @@ class GameObject(CanLogging):
         return self.distance_to(obj) <= self.radius
 
     def _heartbeat(self):
-        self._heartbeat_tics -= 1
-        if not self._heartbeat_tics:
-            event = EventHeartbeat()
+        if self._sleeping and not self.handles_heartbeat() and 'on_heartbeat' not in self.__dict__:
+            # спящего не будим ради обработчика, который ничего не делает
+            return
+        self.add_event(HEARTBEAT_EVENT)
+
+    def schedule(self, steps, callback, repeat=False):
+        """
+            Call callback() after steps game steps (every steps steps if repeat).
+            Callback is called as event of the object, returns timer - timer.cancel() to stop it
+        """
+        event = EventTimer(callback)
+
+        def fire():
+            if timer.interval is None:
+                self._timers.discard(timer)
             self.add_event(event)
-            self._heartbeat_tics = theme.HEARTBEAT_INTERVAL
+
+        timer = self.__scene.timers.schedule(steps, fire, interval=steps if repeat else None)
+        self._timers.add(timer)
+        return timer
+
+    def _cancel_timers(self):
+        for timer in self._timers:
+            timer.cancel()
+        self._timers.clear()
 
     def _check_runout(self):
         left_ro = self._runout(self.coord.x)
@@ -188,6 +311,7 @@ class GameObject(CanLogging):
         if botm_ro:
             self.coord.y += botm_ro + 1
             self.stop()
+        theme = self.theme
         righ_ro = self._runout(self.coord.x, theme.FIELD_WIDTH)
         if righ_ro:
             self.coord.x -= righ_ro + 1
@@ -210,7 +334,7 @@ class GameObject(CanLogging):
         return out
 
     def __str__(self):
-        return 'obj({id}, {coord} {vector})'.format(**self.__dict__)
+        return 'obj({}, {} {})'.format(self.id, self.coord, self.vector)
 
     def __repr__(self):
         return str(self)
@@ -224,8 +348,8 @@ class GameObject(CanLogging):
         """
             Turn to the subject / in that direction
         """
-        if speed is None or speed > theme.MAX_TURN_SPEED:
-            speed = theme.MAX_TURN_SPEED
+        if speed is None or speed > self.theme.MAX_TURN_SPEED:
+            speed = self.theme.MAX_TURN_SPEED
         command = TurnCommand(obj=self, target=target, speed=speed)
         self.add_command(command)
 
@@ -234,8 +358,8 @@ class GameObject(CanLogging):
             Set movement to the specified obj/point
             <object/point/coordinats>, <speed>
         """
-        if speed is None or speed > theme.MAX_SPEED:
-            speed = theme.MAX_SPEED
+        if speed is None or speed > self.theme.MAX_SPEED:
+            speed = self.theme.MAX_SPEED
         command = MoveCommand(obj=self, target=target, speed=speed)
         self.add_command(command)
 
@@ -264,19 +388,19 @@ class GameObject(CanLogging):
         """
             Event: stopped at target
         """
-        self.debug('stopped at target {}'.format(target))
+        self.debug('stopped at target {}', target)
 
     def on_collide_with(self, obj_status):
         """
             Event: Collide
         """
-        self.debug('collided with {}'.format(obj_status))
+        self.debug('collided with {}', obj_status)
 
     def on_overlap_with(self, obj_status):
         """
             Event: Overlap
         """
-        self.debug('overlapped with {}'.format(obj_status))
+        self.debug('overlapped with {}', obj_status)
 
     def on_heartbeat(self):
         """
@@ -302,16 +426,31 @@ class ObjectStatus:
             setattr(self, attr_name, attr)
 
     def fields(self, obj):
-        if self.class_name not in self.__fields:
+        return self.get_fields(obj)
+
+    @classmethod
+    def get_fields(cls, obj):
+        class_name = obj.__class__.__name__
+        if class_name not in cls.__fields:
             for attr_name in dir(obj):
                 if attr_name.startswith('_'):
                     continue
                 attr = getattr(obj, attr_name)
                 if callable(attr):
                     continue
-                for ttype in self.SEND_TYPES:
+                for ttype in cls.SEND_TYPES:
                     if isinstance(attr, ttype):
-                        self.__fields[self.class_name].append(attr_name)
+                        cls.__fields[class_name].append(attr_name)
                         break
-        return self.__fields[self.class_name]
+        return cls.__fields[class_name]
+
+    @classmethod
+    def from_values(cls, class_name, values):
+        """
+            Status restored from its fields, see robogame_engine.protocol. The values dict is taken, not copied
+        """
+        status = cls.__new__(cls)
+        values['class_name'] = class_name
+        status.__dict__ = values
+        return status
 
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+from collections import OrderedDict, deque
+from time import perf_counter
+
+PHASE_OVERLAP_MAP = 'overlap_map'
+PHASE_EVENTS = 'proceed_events'
+PHASE_COMMANDS = 'proceed_commands'
+PHASE_OBJECTS = 'game_step'
+PHASE_COLLISIONS = 'collisions'
+PHASE_STATUS = 'objects_status'
+PHASE_SEND = 'send'
+
+STEP_PHASES = (PHASE_OVERLAP_MAP, PHASE_EVENTS, PHASE_COMMANDS, PHASE_OBJECTS, PHASE_COLLISIONS)
+FRAME_PHASES = (PHASE_STATUS, PHASE_SEND)
+# фазы, которые тратятся в коде объектов - их делим по классам
+CLASS_PHASES = (PHASE_EVENTS, PHASE_COMMANDS, PHASE_OBJECTS, PHASE_COLLISIONS)
+
+PERCENTILES = (50, 90, 99)
+
+
+class StepProfiler(object):
+    """
+        Timings of game step phases in the rolling window of last steps.
+        Object phases are also summed by object class - to find out whose handlers are slow.
+        Step phases are accumulated during the step and committed by step_done,
+        frame phases (objects status, sending to UI) are sampled once per frame.
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.steps = 0
+        self.timings = OrderedDict((phase, deque(maxlen=window)) for phase in STEP_PHASES + FRAME_PHASES)
+        self.class_timings = OrderedDict()
+        self._step = dict((phase, 0.0) for phase in STEP_PHASES)
+        self._class_step = {}
+
+    def add(self, phase, elapsed):
+        """
+            Add time of the scene phase to current step
+        """
+        self._step[phase] += elapsed
+
+    def add_object(self, cls_name, events, commands, game_step, collisions):
+        """
+            Add times of object phases to current step
+        """
+        step = self._step
+        step[PHASE_EVENTS] += events
+        step[PHASE_COMMANDS] += commands
+        step[PHASE_OBJECTS] += game_step
+        step[PHASE_COLLISIONS] += collisions
+        timings = self._class_step.get(cls_name)
+        if timings is None:
+            self._class_step[cls_name] = [events, commands, game_step, collisions]
+        else:
+            timings[0] += events
+            timings[1] += commands
+            timings[2] += game_step
+            timings[3] += collisions
+
+    def step_done(self):
+        self.steps += 1
+        for phase, elapsed in self._step.items():
+            self.timings[phase].append(elapsed)
+            self._step[phase] = 0.0
+        for cls_name, elapsed in self._class_step.items():
+            class_timings = self._class_timings(cls_name)
+            for phase, phase_elapsed in zip(CLASS_PHASES, elapsed):
+                class_timings[phase].append(phase_elapsed)
+        self._class_step = {}
+
+    def add_frame(self, phase, elapsed):
+        self.timings[phase].append(elapsed)
+
+    def measure(self, phase):
+        """
+            Context manager for frame phases
+        """
+        return _Measure(self, phase)
+
+    def _class_timings(self, cls_name):
+        timings = self.class_timings.get(cls_name)
+        if timings is None:
+            timings = OrderedDict((phase, deque(maxlen=self.window)) for phase in CLASS_PHASES)
+            self.class_timings[cls_name] = timings
+        return timings
+
+    def percentiles(self, phase, cls_name=None):
+        """
+            Percentiles of phase time in seconds: dict(p50=..., p90=..., p99=..., max=...)
+        """
+        if cls_name is None:
+            samples = self.timings[phase]
+        else:
+            samples = self.class_timings[cls_name][phase]
+        return get_percentiles(samples)
+
+    def report(self):
+        lines = ['Profile of last {} steps (ms): {}'.format(
+            min(self.steps, self.window), ' '.join('p{}'.format(p) for p in PERCENTILES) + ' max')]
+        for phase, samples in self.timings.items():
+            if samples:
+                lines.append(_format_line(phase, samples))
+        for cls_name, timings in self.class_timings.items():
+            for phase, samples in timings.items():
+                if samples:
+                    lines.append(_format_line('{}.{}'.format(cls_name, phase), samples))
+        return '\n'.join(lines)
+
+
+class _Measure(object):
+
+    def __init__(self, profiler, phase):
+        self.profiler = profiler
+        self.phase = phase
+        self.started = None
+
+    def __enter__(self):
+        self.started = perf_counter()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.profiler.add_frame(self.phase, perf_counter() - self.started)
+
+
+def get_percentiles(samples):
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+    result = OrderedDict(
+        ('p{}'.format(p), ordered[min(last, int(round(p / 100.0 * last)))]) for p in PERCENTILES)
+    result['max'] = ordered[last]
+    return result
+
+
+def _format_line(name, samples):
+    values = get_percentiles(samples).values()
+    return '  {:<40} {}'.format(name, ' '.join('{:8.3f}'.format(value * 1000) for value in values))
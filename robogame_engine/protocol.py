@@ -0,0 +1,363 @@
+# -*- coding: utf-8 -*-
+"""
+    Binary state protocol between the scene and the UI.
+
+    Frames are bytes with typed records instead of pickled ObjectStatus dicts. A keyframe holds
+    schemas of classes (names of ObjectStatus fields) and all objects. A delta frame holds
+    only schemas of new classes, removed ids, created objects and changed fields of changed objects.
+    Keyframes are sent every STATE_KEYFRAME_INTERVAL frames, the decoder skips deltas until
+    a keyframe if a frame was lost.
+
+        class MyScene(Scene):
+            state_protocol = STATE_PROTOCOL_BINARY
+
+    Frame:
+        header     kind, frame number, counts of schemas, removed, created and changed records
+        schema     class index, class name, field names
+        removed    object id
+        created    object id, class index, all values
+        changed    object id, bitmask of changed fields, values of changed fields
+    Every value is a type tag and a payload, values of unknown types are pickled.
+"""
+from operator import attrgetter
+import pickle
+import struct
+
+from .exceptions import RobogameException
+from .objects import ObjectStatus
+from .utils import CanLogging
+
+FRAME_KEY = 1
+FRAME_DELTA = 2
+
+TAG_NONE = 0
+TAG_FALSE = 1
+TAG_TRUE = 2
+TAG_INT = 3
+TAG_LONG = 4
+TAG_FLOAT = 5
+TAG_STR = 6
+TAG_PICKLE = 7
+
+INT_MIN, INT_MAX = -(1 << 31), (1 << 31) - 1
+
+HEADER = struct.Struct('<BIIIII')
+ID = struct.Struct('<I')
+CREATED = struct.Struct('<IH')
+LENGTH = struct.Struct('<H')
+FLOAT = struct.Struct('<d')
+TAG_PAYLOADS = {
+    TAG_INT: struct.Struct('<i'),
+    TAG_LONG: struct.Struct('<q'),
+    TAG_FLOAT: FLOAT,
+}
+STR_LENGTH = struct.Struct('<H')
+PICKLE_LENGTH = struct.Struct('<I')
+TAG_CONSTANTS = {TAG_NONE: None, TAG_FALSE: False, TAG_TRUE: True}
+SCALAR_TYPES = frozenset((float, int, bool, str, type(None)))
+
+
+def _pack_value(value, fmt, args):
+    """
+        Append format and arguments of the tagged value for one struct.pack of the frame
+    """
+    value_type = type(value)
+    if value_type is float:
+        fmt.append('Bd')
+        args.append(TAG_FLOAT)
+        args.append(value)
+    elif value_type is bool:
+        fmt.append('B')
+        args.append(TAG_TRUE if value else TAG_FALSE)
+    elif value_type is int:
+        if INT_MIN <= value <= INT_MAX:
+            fmt.append('Bi')
+            args.append(TAG_INT)
+        else:
+            fmt.append('Bq')
+            args.append(TAG_LONG)
+        args.append(value)
+    elif value is None:
+        fmt.append('B')
+        args.append(TAG_NONE)
+    elif value_type is str and len(value) <= 0x3FFF:
+        # utf-8 - не больше 4 байт на символ, длина влезает в H
+        data = value.encode('utf-8')
+        fmt.append('BH{}s'.format(len(data)))
+        args.extend((TAG_STR, len(data), data))
+    elif value_type is bytes:
+        # уже сериализовано в _freeze
+        fmt.append('BI{}s'.format(len(value)))
+        args.extend((TAG_PICKLE, len(value), value))
+    elif isinstance(value, float):
+        _pack_value(float(value), fmt, args)
+    else:
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        fmt.append('BI{}s'.format(len(data)))
+        args.extend((TAG_PICKLE, len(data), data))
+
+
+def _freeze(values):
+    """
+        Values to keep till the next frame: not scalar values (dicts, lists) are pickled -
+        changes in place must be seen by the comparison
+    """
+    for value in values:
+        if type(value) not in SCALAR_TYPES:
+            return tuple(value if type(value) in SCALAR_TYPES else pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+                         for value in values)
+    return values
+
+
+def _pack_name(name, fmt, args):
+    data = name.encode('utf-8')
+    fmt.append('H{}s'.format(len(data)))
+    args.extend((len(data), data))
+
+
+class ProtocolMetrics(object):
+    """
+        Sizes of frames
+    """
+
+    def __init__(self):
+        self.frames = 0
+        self.keyframes = 0
+        self.bytes = 0
+        self.last_bytes = 0
+        self.max_bytes = 0
+
+    def add(self, size, keyframe):
+        self.frames += 1
+        if keyframe:
+            self.keyframes += 1
+        self.bytes += size
+        self.last_bytes = size
+        if size > self.max_bytes:
+            self.max_bytes = size
+
+    def stats(self):
+        return dict(
+            frames=self.frames,
+            keyframes=self.keyframes,
+            bytes=self.bytes,
+            bytes_per_frame=self.bytes / self.frames if self.frames else 0.0,
+            last_bytes=self.last_bytes,
+            max_bytes=self.max_bytes,
+        )
+
+
+class ClassSchema(object):
+    """
+        Fields of ObjectStatus of the class and the getter of their values
+    """
+    __slots__ = ('index', 'class_name', 'fields', 'getter', 'mask_size', 'mask_format')
+
+    def __init__(self, index, obj):
+        self.index = index
+        self.class_name = obj.__class__.__name__
+        self.fields = tuple(ObjectStatus.get_fields(obj))
+        if not self.fields:
+            raise RobogameException("No status fields at {}".format(self.class_name))
+        getter = attrgetter(*self.fields)
+        if len(self.fields) == 1:
+            self.getter = lambda obj: (getter(obj), )
+        else:
+            self.getter = getter
+        self.mask_size = (len(self.fields) + 7) // 8
+        self.mask_format = 'I{}s'.format(self.mask_size)
+
+
+class StateEncoder(CanLogging):
+    """
+        Scene side: objects to frames. Deltas are made against the values of the previous frame
+    """
+
+    def __init__(self, keyframe_interval):
+        self.keyframe_interval = keyframe_interval
+        self.frame = 0
+        self.metrics = ProtocolMetrics()
+        self._schemas = {}
+        self._schemas_sent = set()
+        self._sent = {}  # id -> (схема, значения) отправленные в последнем кадре
+        self._force_keyframe = True
+
+    def reset(self):
+        """
+            Next frame is a keyframe
+        """
+        self._force_keyframe = True
+
+    def encode(self, objects):
+        self.frame += 1
+        keyframe = self._force_keyframe or (
+            self.keyframe_interval > 0 and self.frame % self.keyframe_interval == 0)
+        self._force_keyframe = False
+        if keyframe:
+            self._schemas_sent.clear()
+            previous = {}
+        else:
+            previous = self._sent
+        schemas_fmt, schemas_args = [], []
+        records_fmt, records_args = [], []
+        changed_fmt, changed_args = [], []
+        schemas_count = created_count = changed_count = 0
+        sent = {}
+        schemas, schemas_sent = self._schemas, self._schemas_sent
+        for obj in objects:
+            obj_class = obj.__class__
+            schema = schemas.get(obj_class)
+            if schema is None:
+                schema = schemas[obj_class] = ClassSchema(index=len(schemas), obj=obj)
+            if schema.index not in schemas_sent:
+                schemas_sent.add(schema.index)
+                schemas_count += 1
+                schemas_fmt.append('H')
+                schemas_args.append(schema.index)
+                _pack_name(schema.class_name, schemas_fmt, schemas_args)
+                schemas_fmt.append('H')
+                schemas_args.append(len(schema.fields))
+                for field in schema.fields:
+                    _pack_name(field, schemas_fmt, schemas_args)
+            obj_id = obj.id
+            values = _freeze(schema.getter(obj))
+            sent[obj_id] = (schema, values)
+            old = previous.get(obj_id)
+            if old is None or old[0] is not schema:
+                created_count += 1
+                records_fmt.append('IH')
+                records_args.append(obj_id)
+                records_args.append(schema.index)
+                for value in values:
+                    _pack_value(value, records_fmt, records_args)
+            elif old[1] != values:
+                changed_count += 1
+                old_values, mask = old[1], 0
+                changed_fmt.append(schema.mask_format)
+                changed_args.append(obj_id)
+                # маска идет перед значениями - место под нее, заполним после сравнения
+                mask_position = len(changed_args)
+                changed_args.append(None)
+                for i, value in enumerate(values):
+                    if value != old_values[i]:
+                        mask |= 1 << i
+                        if type(value) is float:
+                            changed_fmt.append('Bd')
+                            changed_args.append(TAG_FLOAT)
+                            changed_args.append(value)
+                        else:
+                            _pack_value(value, changed_fmt, changed_args)
+                changed_args[mask_position] = mask.to_bytes(schema.mask_size, 'little')
+        removed = [obj_id for obj_id in previous if obj_id not in sent]
+        self._sent = sent
+        header = HEADER.pack(
+            FRAME_KEY if keyframe else FRAME_DELTA, self.frame, schemas_count, len(removed), created_count,
+            changed_count)
+        data = b''.join((
+            header,
+            struct.pack('<' + ''.join(schemas_fmt), *schemas_args),
+            struct.pack('<{}I'.format(len(removed)), *removed),
+            struct.pack('<' + ''.join(records_fmt), *records_args),
+            struct.pack('<' + ''.join(changed_fmt), *changed_args),
+        ))
+        self.metrics.add(len(data), keyframe)
+        return data
+
+
+class StateDecoder(CanLogging):
+    """
+        UI side: frames to the dict id -> ObjectStatus.
+        Statuses of changed objects are new objects, unchanged ones are kept
+    """
+
+    def __init__(self):
+        self.frame = None
+        self.metrics = ProtocolMetrics()
+        self.statuses = {}
+        self._schemas = {}
+        self._indexes = {}  # id -> индекс схемы
+
+    def decode(self, data):
+        """
+            Statuses of all objects after the frame, None if the frame can't be applied
+        """
+        kind, frame, schemas_count, removed_count, created_count, changed_count = HEADER.unpack_from(data, 0)
+        keyframe = kind == FRAME_KEY
+        if not keyframe and (self.frame is None or frame != self.frame + 1):
+            self.warning('state frame {} after {}, waiting for a keyframe', frame, self.frame)
+            return None
+        self.frame = frame
+        self.metrics.add(len(data), keyframe)
+        offset = HEADER.size
+        if keyframe:
+            schemas = self._schemas = {}
+            indexes = self._indexes = {}
+            statuses = {}
+        else:
+            schemas, indexes = self._schemas, self._indexes
+            statuses = dict(self.statuses)
+        for _ in range(schemas_count):
+            (index, ), offset = LENGTH.unpack_from(data, offset), offset + LENGTH.size
+            class_name, offset = self._read_name(data, offset)
+            (fields_count, ), offset = LENGTH.unpack_from(data, offset), offset + LENGTH.size
+            fields = []
+            for _ in range(fields_count):
+                field, offset = self._read_name(data, offset)
+                fields.append(field)
+            schemas[index] = (class_name, fields)
+        for obj_id in struct.unpack_from('<{}I'.format(removed_count), data, offset):
+            statuses.pop(obj_id, None)
+            indexes.pop(obj_id, None)
+        offset += ID.size * removed_count
+        for _ in range(created_count):
+            obj_id, index = CREATED.unpack_from(data, offset)
+            offset += CREATED.size
+            indexes[obj_id] = index
+            class_name, fields = schemas[index]
+            values = {}
+            for field in fields:
+                values[field], offset = self._read_value(data, offset)
+            statuses[obj_id] = ObjectStatus.from_values(class_name, values)
+        for _ in range(changed_count):
+            (obj_id, ), offset = ID.unpack_from(data, offset), offset + ID.size
+            class_name, fields = schemas[indexes[obj_id]]
+            mask_size = (len(fields) + 7) // 8
+            mask = int.from_bytes(data[offset:offset + mask_size], 'little')
+            offset += mask_size
+            values = dict(vars(statuses[obj_id]))
+            i = 0
+            while mask:
+                if mask & 1:
+                    if data[offset] == TAG_FLOAT:
+                        values[fields[i]] = FLOAT.unpack_from(data, offset + 1)[0]
+                        offset += 1 + FLOAT.size
+                    else:
+                        values[fields[i]], offset = self._read_value(data, offset)
+                mask >>= 1
+                i += 1
+            statuses[obj_id] = ObjectStatus.from_values(class_name, values)
+        self.statuses = statuses
+        return statuses
+
+    def _read_name(self, data, offset):
+        (length, ) = LENGTH.unpack_from(data, offset)
+        offset += LENGTH.size
+        return data[offset:offset + length].decode('utf-8'), offset + length
+
+    def _read_value(self, data, offset):
+        tag = data[offset]
+        offset += 1
+        if tag in TAG_CONSTANTS:
+            return TAG_CONSTANTS[tag], offset
+        payload = TAG_PAYLOADS.get(tag)
+        if payload is not None:
+            return payload.unpack_from(data, offset)[0], offset + payload.size
+        if tag == TAG_STR:
+            (length, ) = STR_LENGTH.unpack_from(data, offset)
+            offset += STR_LENGTH.size
+            return data[offset:offset + length].decode('utf-8'), offset + length
+        if tag == TAG_PICKLE:
+            (length, ) = PICKLE_LENGTH.unpack_from(data, offset)
+            offset += PICKLE_LENGTH.size
+            return pickle.loads(data[offset:offset + length]), offset + length
+        raise RobogameException("Unknown value tag {} at {}".format(tag, offset))
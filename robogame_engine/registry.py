@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+
+class ObjectRegistry(object):
+    """
+        Scene objects keyed by id.
+        Iteration goes in creation order, objects added during iteration are visited too.
+        Removal is O(1) - the place of object is left empty and compacted later.
+        While removals are held (game step in progress) they are postponed till release.
+        Objects are indexed by classes of its MRO and by its class name.
+    """
+
+    def __init__(self):
+        self._objects = []
+        self._positions = {}
+        self._holes = 0
+        # объекты без пустых мест для доступа по номеру, пока есть дыры
+        self._dense = None
+        self._held = 0
+        self._pending = {}
+        self._by_class = {}
+        self._by_class_name = {}
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __bool__(self):
+        return bool(self._positions)
+
+    def __iter__(self):
+        objects = self._objects
+        position = 0
+        while position < len(objects):
+            obj = objects[position]
+            if obj is not None:
+                yield obj
+            position += 1
+
+    def __contains__(self, obj):
+        return self.get(getattr(obj, 'id', None)) is obj
+
+    def __getitem__(self, index):
+        if not self._holes:
+            return self._objects[index]
+        if self._dense is None:
+            self._dense = [obj for obj in self._objects if obj is not None]
+        return self._dense[index]
+
+    def get(self, obj_id, default=None):
+        position = self._positions.get(obj_id)
+        if position is None:
+            return default
+        return self._objects[position]
+
+    def append(self, obj):
+        self._positions[obj.id] = len(self._objects)
+        self._objects.append(obj)
+        if self._dense is not None:
+            self._dense.append(obj)
+        for cls in obj.__class__.__mro__:
+            self._by_class.setdefault(cls, {})[obj.id] = obj
+        self._by_class_name.setdefault(obj.__class__.__name__, {})[obj.id] = obj
+
+    def by_class(self, cls):
+        """
+            Live read-only view of objects which are instances of cls
+        """
+        return self._by_class.setdefault(cls, {}).values()
+
+    def by_class_name(self, cls_name):
+        """
+            Live read-only view of objects which class is named cls_name
+        """
+        return self._by_class_name.setdefault(cls_name, {}).values()
+
+    def remove(self, obj):
+        """
+            Remove object, return True if it was removed right now, False if postponed
+        """
+        if obj not in self:
+            raise ValueError("{} not in registry".format(obj))
+        if self._held:
+            self._pending[obj.id] = obj
+            return False
+        self._discard(obj)
+        return True
+
+    def hold_removals(self):
+        self._held += 1
+
+    @property
+    def removals_held(self):
+        return bool(self._held)
+
+    def release_removals(self):
+        """
+            Apply postponed removals, return removed objects
+        """
+        self._held -= 1
+        if self._held:
+            return []
+        removed, self._pending = list(self._pending.values()), {}
+        for obj in removed:
+            self._discard(obj)
+        if self._holes * 2 > len(self._objects):
+            self._compact()
+        return removed
+
+    def _discard(self, obj):
+        position = self._positions.pop(obj.id)
+        self._objects[position] = None
+        self._holes += 1
+        self._dense = None
+        for cls in obj.__class__.__mro__:
+            del self._by_class[cls][obj.id]
+        del self._by_class_name[obj.__class__.__name__][obj.id]
+
+    def _compact(self):
+        self._objects = [obj for obj in self._objects if obj is not None]
+        self._positions = dict((obj.id, position) for position, obj in enumerate(self._objects))
+        self._holes = 0
+        self._dense = None
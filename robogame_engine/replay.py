@@ -0,0 +1,434 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Command log: record of a game, which can be replayed by the engine alone.
+
+    The log holds spawns of objects (with the state at the first game step of the object),
+    removals and every executed MoveCommand/TurnCommand/StopCommand with its step number,
+    and the final states of objects. Replay re-executes only the engine - user handlers are not called -
+    and checks that the final states are the same bit for bit.
+
+        class MyScene(Scene):
+            record_path = 'game.rglog'
+
+        python -m robogame_engine.replay game.rglog
+
+    Replay is exact while objects are changed only by engine commands: user code
+    which moves objects directly or overrides engine methods makes a mismatch.
+"""
+from __future__ import print_function
+
+import argparse
+from collections import defaultdict
+import struct
+import sys
+import time
+
+from .commands import MoveCommand, TurnCommand, StopCommand
+from .exceptions import RobogameException
+from .geometry import Point, Vector
+from .objects import GameObject
+from .scene import Scene
+from .utils import CanLogging
+
+MAGIC = b'RGLOG'
+VERSION = 2
+
+RECORD_SPAWN = 1
+RECORD_COMMAND = 2
+RECORD_REMOVE = 3
+RECORD_END = 4
+
+COMMAND_MOVE = 1
+COMMAND_TURN = 2
+COMMAND_STOP = 3
+
+TARGET_NONE = 0
+TARGET_POINT = 1
+TARGET_OBJECT = 2
+
+NO_OBJECT = 0  # id объектов начинаются с 1
+NO_CACHE = float('nan')
+
+_HEADER = struct.Struct('<HddBBH')
+_STRING = struct.Struct('<H')
+_TYPE = struct.Struct('<B')
+# step, id, parent, x, y, radius, vector x, y, direction, module, has owner, owner, continuous collisions,
+# own game_step
+_SPAWN = struct.Struct('<IIIddddddd?I??')
+# step, id, kind, target kind, target x, y, target id, has speed, speed, vector x, y
+_COMMAND = struct.Struct('<IIBBddI?ddd')
+# step, id, during step
+_REMOVE = struct.Struct('<II?')
+# steps, objects count
+_END = struct.Struct('<II')
+# id, x, y, vector x, y
+_STATE = struct.Struct('<Idddd')
+
+
+class ReplayMismatch(RobogameException):
+    pass
+
+
+class CommandRecorder(CanLogging):
+    """
+        Writes the command log of the scene.
+        Spawn is written at the first step of object - after its creation code is done.
+        Objects spawned by handlers during the step are bound to the object being processed.
+    """
+
+    def __init__(self, scene):
+        self.scene = scene
+        self.step = 0
+        self.in_step = False
+        self.current = None
+        self._data = bytearray()
+        self._starting = {}
+        self._spawned = {}
+        self._spawned_removed = set()
+        self._unknown_commands = set()
+        self._write_header()
+        for obj in scene.objects:
+            self._starting[obj.id] = obj
+
+    def _write_header(self):
+        scene = self.scene
+        self._data += MAGIC
+        self._data += _HEADER.pack(
+            VERSION, scene.theme.FIELD_WIDTH, scene.theme.FIELD_HEIGHT,
+            scene.check_collisions, scene.detect_overlaps, scene.collision_iterations)
+        for value in (scene.random_seed, scene.theme.mod_path, scene.broadphase, scene.collision_resolver,
+                      scene.kinematics):
+            self._write_string(value)
+
+    def _write_string(self, value):
+        value = str(value).encode('utf-8')
+        self._data += _STRING.pack(len(value))
+        self._data += value
+
+    def object_added(self, obj):
+        if self.in_step:
+            self._spawned[obj.id] = (obj, NO_OBJECT if self.current is None else self.current.id)
+        else:
+            self._starting[obj.id] = obj
+
+    def object_removed(self, obj, during_step):
+        if self._starting.pop(obj.id, None) is not None:
+            # так и не появился в игре
+            return
+        if during_step and obj.id in self._spawned:
+            # удаление запишем, если объект успеет появиться в игре на этом шаге
+            self._spawned_removed.add(obj.id)
+            return
+        self._write_removal(obj.id, during_step)
+
+    def _write_removal(self, obj_id, during_step):
+        self._data += _TYPE.pack(RECORD_REMOVE)
+        self._data += _REMOVE.pack(self.step if during_step else self.step + 1, obj_id, during_step)
+
+    def step_started(self):
+        self.step += 1
+        self.in_step = True
+        starting, self._starting = self._starting, {}
+        for obj in starting.values():
+            self._write_spawn(obj, NO_OBJECT, self.step)
+
+    def object_step(self, obj):
+        self.current = obj
+        if obj.id in self._spawned:
+            _, parent = self._spawned.pop(obj.id)
+            self._write_spawn(obj, parent, self.step)
+
+    def step_finished(self):
+        self.in_step = False
+        self.current = None
+        for obj_id in self._spawned_removed:
+            if obj_id not in self._spawned:
+                self._write_removal(obj_id, during_step=True)
+        # появились после обхода объектов - пусть стартуют на следующем шаге
+        for obj, _ in self._spawned.values():
+            if obj.id not in self._spawned_removed:
+                self._starting[obj.id] = obj
+        self._spawned = {}
+        self._spawned_removed = set()
+
+    def _write_spawn(self, obj, parent, step):
+        vector = obj.vector
+        owner = getattr(obj, 'owner', self)
+        self._data += _TYPE.pack(RECORD_SPAWN)
+        self._data += _SPAWN.pack(
+            step, obj.id, parent, obj.coord.x, obj.coord.y, obj.radius, vector.x, vector.y,
+            NO_CACHE if vector._direction is None else vector._direction,
+            NO_CACHE if vector._module is None else vector._module,
+            owner is not self, getattr(owner, 'id', NO_OBJECT) if isinstance(owner, GameObject) else NO_OBJECT,
+            bool(obj.continuous_collisions), obj.has_own_game_step())
+        self._write_string(obj.rotate_mode)
+        self._write_string(obj.__class__.__name__)
+
+    def command(self, obj, command):
+        command_class = command.__class__
+        vector = Vector(0, 0)
+        target = None
+        if command_class is MoveCommand:
+            kind, target = COMMAND_MOVE, command.target
+        elif command_class is TurnCommand:
+            kind, target, vector = COMMAND_TURN, command.target, command.vector
+        elif command_class is StopCommand:
+            kind = COMMAND_STOP
+        else:
+            if command_class not in self._unknown_commands:
+                self._unknown_commands.add(command_class)
+                self.warning('command {} can not be recorded, replay will not match', command_class.__name__)
+            return
+        if isinstance(target, GameObject):
+            target_kind, target_id, target = TARGET_OBJECT, target.id, target.coord
+        elif target is None:
+            target_kind, target_id, target = TARGET_NONE, NO_OBJECT, Point(0, 0)
+        else:
+            target_kind, target_id = TARGET_POINT, NO_OBJECT
+        speed = getattr(command, 'speed', None)
+        self._data += _TYPE.pack(RECORD_COMMAND)
+        self._data += _COMMAND.pack(
+            self.step, obj.id, kind, target_kind, target.x, target.y, target_id,
+            speed is not None, 0 if speed is None else speed, vector.x, vector.y)
+
+    def finish(self):
+        # созданы после последнего шага
+        for obj in self._starting.values():
+            self._write_spawn(obj, NO_OBJECT, self.step + 1)
+        self._starting = {}
+        self._data += _TYPE.pack(RECORD_END)
+        self._data += get_final_states(self.scene, self.step)
+
+    def getvalue(self):
+        return bytes(self._data)
+
+    def save(self, path):
+        with open(path, 'wb') as log_file:
+            log_file.write(self._data)
+
+
+def get_final_states(scene, steps):
+    objects = sorted(scene.objects, key=lambda obj: obj.id)
+    data = bytearray(_END.pack(steps, len(objects)))
+    for obj in objects:
+        data += _STATE.pack(obj.id, obj.coord.x, obj.coord.y, obj.vector.x, obj.vector.y)
+        state_name = obj.state.__class__.__name__.encode('utf-8')
+        data += _STRING.pack(len(state_name))
+        data += state_name
+    return bytes(data)
+
+
+class CommandLog(object):
+    """
+        Parsed command log, records are indexed for replay
+    """
+
+    def __init__(self, data):
+        if data[:len(MAGIC)] != MAGIC:
+            raise RobogameException("It is not a command log")
+        offset = len(MAGIC)
+        (version, self.field_width, self.field_height, self.check_collisions, self.detect_overlaps,
+         self.collision_iterations) = _HEADER.unpack_from(data, offset)
+        if version != VERSION:
+            raise RobogameException("Unsupported command log version {}".format(version))
+        offset += _HEADER.size
+        self.random_seed, offset = _read_string(data, offset)
+        self.theme_mod_path, offset = _read_string(data, offset)
+        self.broadphase, offset = _read_string(data, offset)
+        self.collision_resolver, offset = _read_string(data, offset)
+        self.kinematics, offset = _read_string(data, offset)
+        # шаг, родитель -> спавны
+        self.spawns = defaultdict(list)
+        # шаг, объект -> команды
+        self.commands = defaultdict(list)
+        # шаг, во время шага -> id
+        self.removals = defaultdict(list)
+        self.steps = 0
+        self.final_states = None
+        while offset < len(data):
+            record_type, = _TYPE.unpack_from(data, offset)
+            offset += _TYPE.size
+            if record_type == RECORD_SPAWN:
+                spawn = _SPAWN.unpack_from(data, offset)
+                offset += _SPAWN.size
+                rotate_mode, offset = _read_string(data, offset)
+                class_name, offset = _read_string(data, offset)
+                self.spawns[spawn[0], spawn[2]].append(spawn + (rotate_mode, class_name))
+            elif record_type == RECORD_COMMAND:
+                command = _COMMAND.unpack_from(data, offset)
+                offset += _COMMAND.size
+                self.commands[command[0], command[1]].append(command)
+            elif record_type == RECORD_REMOVE:
+                step, obj_id, during_step = _REMOVE.unpack_from(data, offset)
+                offset += _REMOVE.size
+                self.removals[step, during_step].append(obj_id)
+            elif record_type == RECORD_END:
+                self.steps, _ = _END.unpack_from(data, offset)
+                self.final_states = bytes(data[offset:])
+                break
+            else:
+                raise RobogameException("Broken command log: unknown record {} at {}".format(record_type, offset))
+        if self.final_states is None:
+            raise RobogameException("Command log is not finished")
+
+
+def _read_string(data, offset):
+    length, = _STRING.unpack_from(data, offset)
+    offset += _STRING.size
+    return bytes(data[offset:offset + length]).decode('utf-8'), offset + length
+
+
+class ReplayObject(GameObject):
+    """
+        Engine part of a recorded object: executes recorded commands, ignores events
+    """
+
+    def __init__(self, spawn, scene):
+        (_, obj_id, _, x, y, radius, vector_x, vector_y, direction, module,
+         has_owner, owner_id, continuous_collisions, own_game_step, rotate_mode, class_name) = spawn
+        self.class_name = class_name
+        # шаг по одному или в общем проходе кинематики - как у записанного объекта
+        self._own_game_step = own_game_step
+        self.rotate_mode = rotate_mode
+        self.continuous_collisions = continuous_collisions
+        scene.next_id = obj_id
+        super(ReplayObject, self).__init__(coord=Point(x, y), radius=radius, direction=0, scene=scene)
+        vector = Vector(vector_x, vector_y)
+        # кэш направления и модуля тоже важен для совпадения бит в бит
+        if direction == direction:
+            vector._direction = direction
+        if module == module:
+            vector._module = module
+        self.vector = vector
+        if has_owner:
+            self.owner = scene.objects.get(owner_id)
+
+    def has_own_game_step(self):
+        return self._own_game_step
+
+    def add_event(self, event):
+        pass
+
+    def add_command(self, command):
+        pass
+
+    def proceed_events(self):
+        scene = self.scene
+        for spawn in scene.log.spawns.get((scene.replay_step, self.id), ()):
+            ReplayObject(spawn=spawn, scene=scene)
+
+    def proceed_commands(self):
+        scene = self.scene
+        for command in scene.log.commands.get((scene.replay_step, self.id), ()):
+            _, _, kind, target_kind, target_x, target_y, target_id, has_speed, speed, vector_x, vector_y = command
+            target = None
+            if target_kind == TARGET_OBJECT:
+                target = scene.objects.get(target_id)
+            if target is None and target_kind != TARGET_NONE:
+                target = Point(target_x, target_y)
+            speed = speed if has_speed else None
+            if kind == COMMAND_MOVE:
+                self.state.move(target=target, speed=speed)
+            elif kind == COMMAND_TURN:
+                self.state.turn(vector=Vector(vector_x, vector_y), target=target, speed=speed)
+            else:
+                self.state.stop()
+
+
+class ReplayScene(Scene):
+    """
+        Headless scene which plays the command log
+    """
+
+    def __init__(self, log):
+        self.log = log
+        self.check_collisions = log.check_collisions
+        self.detect_overlaps = log.detect_overlaps
+        self.broadphase = log.broadphase
+        self.collision_resolver = log.collision_resolver
+        self.kinematics = log.kinematics
+        self.collision_iterations = log.collision_iterations
+        self.replay_step = 0
+        self.next_id = None
+        super(ReplayScene, self).__init__(
+            name='Replay', field=(log.field_width, log.field_height), theme_mod_path=log.theme_mod_path,
+            headless=True, random_seed=0)
+
+    def get_next_object_id(self):
+        return self.next_id
+
+    def replay(self):
+        for _ in range(self.log.steps):
+            self.replay_step += 1
+            self._start_step(self.replay_step)
+            self.game_step()
+            for obj_id in self.log.removals.get((self.replay_step, True), ()):
+                self.remove_object(self.objects.get(obj_id))
+        self._start_step(self.log.steps + 1)
+
+    def _start_step(self, step):
+        for obj_id in self.log.removals.get((step, False), ()):
+            self.remove_object(self.objects.get(obj_id))
+        for spawn in self.log.spawns.get((step, NO_OBJECT), ()):
+            ReplayObject(spawn=spawn, scene=self)
+
+    def check(self):
+        """
+            Compare final states with recorded, raise ReplayMismatch with the first differences
+        """
+        final_states = get_final_states(self, self.log.steps)
+        if final_states == self.log.final_states:
+            return
+        recorded, replayed = _parse_states(self.log.final_states), _parse_states(final_states)
+        differences = []
+        for obj_id in sorted(set(recorded) | set(replayed)):
+            if recorded.get(obj_id) != replayed.get(obj_id):
+                differences.append('{}: recorded {} replayed {}'.format(
+                    obj_id, recorded.get(obj_id), replayed.get(obj_id)))
+        raise ReplayMismatch("Final states differ in {} objects:\n{}".format(
+            len(differences), '\n'.join(differences[:10])))
+
+
+def _parse_states(data):
+    _, count = _END.unpack_from(data, 0)
+    offset = _END.size
+    states = {}
+    for _ in range(count):
+        obj_id, x, y, vector_x, vector_y = _STATE.unpack_from(data, offset)
+        offset += _STATE.size
+        state_name, offset = _read_string(data, offset)
+        states[obj_id] = (x, y, vector_x, vector_y, state_name)
+    return states
+
+
+def replay(data, check=True):
+    """
+        Replay the command log (bytes), return the scene at the end of the game
+    """
+    scene = ReplayScene(log=CommandLog(data))
+    with scene:
+        scene.replay()
+    if check:
+        scene.check()
+    return scene
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('log', help='command log file')
+    args = parser.parse_args()
+    with open(args.log, 'rb') as log_file:
+        data = log_file.read()
+    started = time.perf_counter()
+    try:
+        scene = replay(data)
+    except ReplayMismatch as exc:
+        print(exc)
+        sys.exit(1)
+    elapsed = time.perf_counter() - started
+    print('{} steps replayed in {:.3f}s, final states match'.format(scene.replay_step, elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,19 +2,38 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function
 
-from collections import defaultdict, OrderedDict
+from collections import OrderedDict
+from contextlib import contextmanager
 from multiprocessing import Pipe, Process
-from random import randint
+from heapq import heappop, heappush
+from operator import itemgetter
+import math
+import random
 import time
+from time import perf_counter
 
-from robogame_engine.constants import GAME_OVER
+from robogame_engine.constants import (GAME_OVER, BROADPHASE_BRUTE_FORCE, RESOLVER_PAIRWISE, RESOLVER_ITERATIVE,
+                                       KINEMATICS_OBJECTS, KINEMATICS_NUMPY, STATE_PROTOCOL_PICKLE,
+                                       STATE_PROTOCOL_BINARY)
 from robogame_engine.exceptions import RobogameException
+from .collisions import (get_broadphase, get_overlap_distance, get_time_of_impact, is_owner_pair,
+                         IterativeResolver)
 from .events import EventCollide, EventOverlap
-from .geometry import Vector, Point
+from .geometry import Vector, Point, get_trig_tables
+from .kinematics import KinematicsArrays
 from .objects import ObjectStatus, GameObject
-from .theme import theme
+from .protocol import StateEncoder
+from .profiler import (StepProfiler, PHASE_OVERLAP_MAP, PHASE_OBJECTS, PHASE_COLLISIONS, PHASE_STATUS,
+                       PHASE_SEND)
+from .registry import ObjectRegistry
+from .scheduler import FixedTimestep
+from .snapshot import SceneSnapshot
+from .spatial import SpatialHash
+from .timers import TimerWheel
+from .context import get_current_scene, set_current_scene
+from .theme import theme, compile_theme
 from .user_interface import UserInterface
-from .utils import CanLogging
+from .utils import CanLogging, configure_logging
 
 
 class Scene(CanLogging):
@@ -23,12 +42,34 @@ class Scene(CanLogging):
     """
     check_collisions = True
     detect_overlaps = False
-    __teams = OrderedDict()
+    broadphase = BROADPHASE_BRUTE_FORCE
+    collision_resolver = RESOLVER_PAIRWISE
+    collision_iterations = 8
+    kinematics = KINEMATICS_OBJECTS  # KINEMATICS_NUMPY - координаты в массивах, движение одним векторным проходом
+    profile = False
+    track_activity = False  # обходить только активные объекты, неподвижные без событий и команд спят
+    record_path = None  # куда записать лог команд для robogame_engine.replay
+    trace_path = None  # куда писать трассировку шагов в JSON lines, см. robogame_engine.tracing
+    state_protocol = STATE_PROTOCOL_PICKLE  # STATE_PROTOCOL_BINARY - в UI бинарные кадры с дельтами
 
-    def __init__(self, name='RoboGame', field=None, theme_mod_path=None, speed=1, headless=False, **kwargs):
-        theme.set_theme_module(mod_path=theme_mod_path)
-        self.objects = []
-        self.time_sleep = theme.GAME_STEP_MIN_TIME
+    def __init__(self, name='RoboGame', field=None, theme_mod_path=None, speed=1, headless=False, random_seed=None,
+                 **kwargs):
+        if random_seed is None:
+            # от глобального генератора - random.seed() до создания сцены делает игру повторяемой
+            random_seed = random.randrange(1 << 32)
+        self.random_seed = random_seed
+        self.random = random.Random(random_seed)
+        self.field = field
+        if field:
+            self.theme = compile_theme(theme_mod_path, FIELD_WIDTH=field[0], FIELD_HEIGHT=field[1])
+        else:
+            self.theme = compile_theme(theme_mod_path)
+        configure_logging(self.theme)
+        self.objects = ObjectRegistry()
+        self.timers = TimerWheel()
+        self.__teams = OrderedDict()
+        self.__objects_count = 0
+        self.time_sleep = self.theme.GAME_STEP_MIN_TIME
         if speed <= 0:
             raise RobogameException("Game speed can't be zero or negative!")
         elif speed > 1:
@@ -36,28 +77,76 @@ class Scene(CanLogging):
         else:
             self.game_speed = 1
             self.time_sleep /= speed
-        GameObject.link_to_scene(
-            scene=self,
-            container=self.objects,
-        )
+        self.activate()
         self.init_kwargs = kwargs
         self.hold_state = False  # режим пошаговой отладки
         self.name = name
-        self.field = field
-        if field:
-            theme.FIELD_WIDTH, theme.FIELD_HEIGHT = field
+        self.trig_tables = None
+        if self.theme.FAST_MATH:
+            self.trig_tables = get_trig_tables(self.theme.FAST_MATH_STEPS_PER_DEGREE)
         self.parent_conn = None
         self.ui = None
         self._step = 0
+        self.scheduler = None
+        self.recorder = None
+        self.trace_sink = None
+        self._prepared = False
+        self._awake = set()
+        self._active_ids = None
+        self._current_id = None
+        self._processed = []
+        self.profiler = None
+        if self.profile or self.theme.PROFILE:
+            self.profiler = StepProfiler(window=self.theme.PROFILE_WINDOW)
         self.__overlap_map = None
+        self._broadphase = get_broadphase(name=self.broadphase, scene=self)
+        self._spatial_index = None
+        # созданные во время шага, после постройки сетки
+        self._unindexed = []
+        # объекты, чьи координаты в сетке шага устарели больше, чем на MAX_SPEED (упорядоченное множество)
+        self._off_index = {}
+        self._kinematics = None
+        if self.kinematics == KINEMATICS_NUMPY:
+            self._kinematics = KinematicsArrays(scene=self)
+        elif self.kinematics != KINEMATICS_OBJECTS:
+            raise RobogameException("Unknown kinematics {}!".format(self.kinematics))
+        self._resolver = None
+        if self.collision_resolver == RESOLVER_ITERATIVE:
+            self._resolver = IterativeResolver(scene=self, iterations=self.collision_iterations)
+        elif self.collision_resolver != RESOLVER_PAIRWISE:
+            raise RobogameException("Unknown collision resolver {}!".format(self.collision_resolver))
+        self.state_encoder = None
+        if self.state_protocol == STATE_PROTOCOL_BINARY:
+            self.state_encoder = StateEncoder(keyframe_interval=self.theme.STATE_KEYFRAME_INTERVAL)
+        elif self.state_protocol != STATE_PROTOCOL_PICKLE:
+            raise RobogameException("Unknown state protocol {}!".format(self.state_protocol))
         self.headless = headless
 
+    def activate(self):
+        """
+            Make the scene current for this thread: new objects are created in it,
+            module level theme is its theme
+        """
+        set_current_scene(self)
+
+    def __enter__(self):
+        self.__previous_scene = get_current_scene()
+        self.activate()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        set_current_scene(self.__previous_scene)
+
+    def get_next_object_id(self):
+        self.__objects_count += 1
+        return self.__objects_count
+
     def register_to_team(self, obj):
         if obj.team not in self.__teams:
-            if self.teams_count >= theme.TEAMS_COUNT:
+            if self.teams_count >= self.theme.TEAMS_COUNT:
                 raise RobogameException(
                     "Only {} teams! Can't create team for {}".format(
-                        theme.TEAMS_COUNT, obj.team))
+                        self.theme.TEAMS_COUNT, obj.team))
             self.__teams[obj.team] = []
         self.__teams[obj.team].append(obj)
 
@@ -77,52 +166,271 @@ class Scene(CanLogging):
     def prepare(self, **kwargs):
         pass
 
+    def add_object(self, obj):
+        if self._kinematics is not None:
+            self._kinematics.add_object(obj)
+        self.objects.append(obj)
+        self._broadphase.add_object(obj)
+        if self._spatial_index is not None:
+            if self.objects.removals_held:
+                self._unindexed.append(obj)
+            else:
+                # вне шага сетку проще построить заново при следующем запросе
+                self._set_spatial_index(None)
+        if self.track_activity:
+            self.wake(obj)
+        if self.recorder is not None:
+            self.recorder.object_added(obj)
+
     def remove_object(self, obj):
+        """
+            Remove object from the scene. During the game step object is removed at the end of step
+        """
         try:
-            self.objects.remove(obj)
+            removed = self.objects.remove(obj)
         except ValueError:
-            self.logger.warning("Try to remove unexists obj {}".format(obj))
+            self.warning("Try to remove unexists obj {}", obj)
+            return
+        if removed:
+            self._object_removed(obj)
+        if self.recorder is not None:
+            self.recorder.object_removed(obj, during_step=not removed)
 
-    def get_objects_by_type(self, cls=None, cls_name=None):
+    def _object_removed(self, obj):
+        self._set_spatial_index(None)
+        self._broadphase.remove_object(obj)
+        if self._kinematics is not None:
+            self._kinematics.remove_object(obj)
+        obj._cancel_timers()
+
+    def get_objects_by_type(self, cls=None, cls_name=None, live=False):
+        """
+            Objects of class cls (and its subclasses) or with class name cls_name.
+            With live=True returns read-only view, which is updated when objects are created and removed
+        """
         if cls:
-            return [obj for obj in self.objects if issubclass(obj.__class__, cls)]
+            objects = self.objects.by_class(cls)
         elif cls_name is None:
             raise RobogameException('get_objects_by_type need ether cls or cls_name!')
-        return [obj for obj in self.objects if obj.__class__.__name__ == cls_name]
+        else:
+            objects = self.objects.by_class_name(cls_name)
+        return objects if live else list(objects)
+
+    def query_radius(self, point, radius, cls=None):
+        """
+            Objects with centers not further than radius from the point (or object, except itself).
+            Positions are taken when the grid is built - at the start of the game step with the spatial hash broadphase,
+            at the first query otherwise - and kept till the end of step or creation and removal of objects out of it.
+            Objects created during the step are found at their current positions
+        """
+        index, x, y, predicate = self._prepare_query(point, cls)
+        found = [index.objects[i] for i in index.query_radius(x, y, radius, predicate=predicate)]
+        square_radius = radius * radius
+        for obj in self._get_unindexed(predicate):
+            dx, dy = obj.x - x, obj.y - y
+            if dx * dx + dy * dy <= square_radius:
+                found.append(obj)
+        return found
+
+    def nearest(self, point, k=1, cls=None):
+        """
+            k objects nearest to the point (or object, except itself), sorted by distance.
+            Positions are the same as for query_radius
+        """
+        index, x, y, predicate = self._prepare_query(point, cls)
+        found = index.nearest(x, y, k, predicate=predicate)
+        unindexed = self._get_unindexed(predicate)
+        if not unindexed or k <= 0:
+            return [index.objects[i] for i in found]
+        distances = [(math.hypot(index.xs[i] - x, index.ys[i] - y), i, index.objects[i]) for i in found]
+        # созданные позже всех в сетке - при равных расстояниях идут после них
+        offset = len(index.objects)
+        distances.extend((math.hypot(obj.x - x, obj.y - y), offset + number, obj)
+                         for number, obj in enumerate(unindexed))
+        distances.sort(key=itemgetter(0, 1))
+        return [obj for _, _, obj in distances[:k]]
+
+    def _get_unindexed(self, predicate):
+        if predicate is None:
+            return self._unindexed
+        return [obj for obj in self._unindexed if predicate(obj)]
+
+    def _get_spatial_index(self):
+        if self._spatial_index is None:
+            self._set_spatial_index(SpatialHash.from_objects(
+                self.objects, width=self.theme.FIELD_WIDTH, height=self.theme.FIELD_HEIGHT))
+        return self._spatial_index
+
+    def _set_spatial_index(self, index):
+        self._spatial_index = index
+        self._unindexed = []
+        self._off_index = {}
+
+    def _prepare_query(self, point, cls):
+        self._get_spatial_index()
+        exclude = point if isinstance(point, GameObject) else None
+        if exclude is not None:
+            point = point.coord
+
+        def predicate(obj):
+            return obj is not exclude and (cls is None or isinstance(obj, cls))
+
+        if exclude is None and cls is None:
+            predicate = None
+        return self._spatial_index, point.x, point.y, predicate
 
     def game_step(self):
         """
             Proceed objects states, collision detection, hits
             and radars discovering
         """
+        self.activate()
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.step_started()
+        self.objects.hold_removals()
+        try:
+            self._game_step()
+            if self.track_activity:
+                self._update_activity()
+            # таймеры и сердцебиения - в конце шага, их события обработаются на следующем
+            self.timers.advance()
+            if self.trace_sink is not None:
+                self._trace_step()
+        finally:
+            self._set_spatial_index(None)
+            for obj in self.objects.release_removals():
+                self._object_removed(obj)
+            if recorder is not None:
+                recorder.step_finished()
+
+    def _game_step(self):
+        """
+            Events, commands, movement and collisions of objects one by one, then the collision resolver.
+            With kinematics in arrays steady movement of objects without own game_step
+            is made by one vectorized pass after all. Objects from the overlap map are stepped one by one,
+            so pairwise collisions see the same positions as without arrays.
+            Phases are timed only with the profiler, otherwise the clock is a no-op
+        """
+        profiler = self.profiler
+        clock = _no_clock if profiler is None else perf_counter
+        started = clock()
         self.__overlap_map = self.__get_overlap_map()
-        for obj in self.objects:
+        self._set_spatial_index(self._broadphase.spatial_index)
+        if profiler is not None:
+            profiler.add(PHASE_OVERLAP_MAP, clock() - started)
+        pairwise_collisions = self.check_collisions and self._resolver is None
+        overlaps_only = self.detect_overlaps and not self.check_collisions
+        kinematics = self._kinematics
+        overlap_map = self.__overlap_map
+        # столкновения двигают объекты по очереди - перекрытые шагают сами
+        collide_in_turn = pairwise_collisions or overlaps_only
+        batched = []
+        for obj in self._get_step_objects():
+            started = clock()
             obj.proceed_events()
+            events_done = clock()
             obj.proceed_commands()
-            obj.game_step()
-            if self.check_collisions:
+            commands_done = clock()
+            if obj.continuous_collisions:
+                start = obj.coord.copy()
+                obj.game_step()
+                step_done = clock()
+                self._check_swept_collisions(obj, start)
+            elif kinematics is not None and not obj.has_own_game_step() and not (
+                    collide_in_turn and obj in overlap_map):
+                # движение - в общем векторном проходе после всех
+                batched.append(obj)
+                self._check_displaced(obj)
+                if profiler is not None:
+                    profiler.add_object(obj.__class__.__name__, events=events_done - started,
+                                        commands=commands_done - events_done, game_step=0.0, collisions=0.0)
+                continue
+            else:
+                obj.game_step()
+                step_done = clock()
+            if pairwise_collisions:
                 self._check_collisions(obj)
-            elif self.detect_overlaps:
+            elif overlaps_only:
                 self._detect_overlaps(obj)
+            self._check_displaced(obj)
+            if profiler is not None:
+                profiler.add_object(
+                    obj.__class__.__name__,
+                    events=events_done - started,
+                    commands=commands_done - events_done,
+                    game_step=step_done - commands_done,
+                    collisions=clock() - step_done,
+                )
+        if batched:
+            started = clock()
+            kinematics.step(batched)
+            if profiler is not None:
+                profiler.add(PHASE_OBJECTS, clock() - started)
+        if self.check_collisions and self._resolver is not None:
+            started = clock()
+            self._resolve_collisions()
+            if profiler is not None:
+                profiler.add(PHASE_COLLISIONS, clock() - started)
+        if profiler is not None:
+            profiler.step_done()
+
+    def _get_step_objects(self):
+        if not self.track_activity:
+            return self.objects
+        active = set(obj.id for obj in self._awake if obj in self.objects)
+        for obj in self.__overlap_map:
+            # перекрытые объекты участвуют в столкновениях, даже если спали
+            obj._sleeping = False
+            active.add(obj.id)
+        self._awake = set()
+        self._active_ids = sorted(active)
+        self._processed = []
+        return self._iter_active()
+
+    def _iter_active(self):
+        """
+            Active objects in id order (as self.objects). Objects woken or created during the step
+            with bigger id are visited in this step, others - in the next
+        """
+        active_ids = self._active_ids
+        processed = self._processed
+        get_object = self.objects.get
+        while active_ids:
+            obj_id = heappop(active_ids)
+            obj = get_object(obj_id)
+            if obj is None:
+                continue
+            self._current_id = obj_id
+            processed.append(obj)
+            yield obj
+        self._active_ids = None
+
+    def wake(self, obj):
+        """
+            Return sleeping object to the active set
+        """
+        obj._sleeping = False
+        if self._active_ids is not None and obj.id > self._current_id:
+            heappush(self._active_ids, obj.id)
+        else:
+            self._awake.add(obj)
+
+    def _update_activity(self):
+        """
+            Processed objects without events, commands and movement fall asleep
+        """
+        self._active_ids = None
+        awake = self._awake
+        for obj in self._processed:
+            if obj._events or obj._commands or not obj.state.idle or obj.has_own_game_step():
+                awake.add(obj)
+            else:
+                obj._sleeping = True
+        self._processed = []
 
     def __get_overlap_map(self):
-        overlap_map = defaultdict(list)
-        for i, left in enumerate(self.objects):
-            for right in self.objects[i+1:]:
-                try:
-                    if right.owner == left or left.owner == right:
-                        continue
-                except AttributeError:
-                    pass
-                summ_radius = left.radius + right.radius
-                if abs(left.x - right.x) > summ_radius and abs(left.y - right.y) > summ_radius:
-                    continue
-                distance = left.distance_to(right)
-                overlap_distance = int(summ_radius - distance)
-                if overlap_distance > 1:
-                    overlap_map[left].append((overlap_distance, right))
-                    overlap_map[right].append((overlap_distance, left))
-        return overlap_map
+        return self._broadphase.get_overlap_map(self.objects)
 
     def __get_overlap_objects(self, left):
         return self.__overlap_map.get(left, [])
@@ -136,11 +444,189 @@ class Scene(CanLogging):
         for overlap_distance, right in self.__get_overlap_objects(left):
             module = overlap_distance // 2
             step_back_vector = Vector.from_points(right.coord, left.coord, module=module)
-            left.debug('step_back_vector {}'.format(step_back_vector))
+            left.debug('step_back_vector {}', step_back_vector)
             left.coord += step_back_vector
             right.coord -= step_back_vector
+            self._check_displaced(right)
+            left.add_event(EventCollide(right))
+            right.add_event(EventCollide(left))
+
+    def _resolve_collisions(self):
+        contacts = self._resolver.get_contacts(self.objects, self.__overlap_map)
+        if not contacts:
+            return
+        self._resolver.resolve(contacts)
+        for left, right in contacts:
             left.add_event(EventCollide(right))
             right.add_event(EventCollide(left))
+        self.debug('resolved {} contacts', len(contacts))
+
+    def _check_swept_collisions(self, left, start):
+        """
+            Collisions along the path of fast object during the step, in time of impact order.
+            Objects overlapped at the end of step are left to the overlap map
+        """
+        if not (self.check_collisions or self.detect_overlaps):
+            return
+        dx, dy = left.x - start.x, left.y - start.y
+        if not dx and not dy:
+            return
+        min_x, max_x = min(start.x, left.x), max(start.x, left.x)
+        min_y, max_y = min(start.y, left.y), max(start.y, left.y)
+        overlapped = set(right for _, right in self.__get_overlap_objects(left))
+        hits = []
+        for right in self._get_swept_candidates(left, min_x, min_y, max_x, max_y):
+            if right is left or right in overlapped:
+                continue
+            # тот же допуск в 2 единицы, что и у карты перекрытий
+            summ_radius = left.radius + right.radius - 2
+            if summ_radius <= 0:
+                continue
+            if (right.x + summ_radius < min_x or right.x - summ_radius > max_x or
+                    right.y + summ_radius < min_y or right.y - summ_radius > max_y):
+                continue
+            if is_owner_pair(left, right):
+                continue
+            time_of_impact = get_time_of_impact(start, dx, dy, right.coord, summ_radius)
+            if time_of_impact is None or get_overlap_distance(left, right) is not None:
+                continue
+            hits.append((time_of_impact, right.id, right))
+        hits.sort(key=itemgetter(0, 1))
+        event_class = EventCollide if self.check_collisions else EventOverlap
+        for _, _, right in hits:
+            left.add_event(event_class(right))
+            right.add_event(event_class(left))
+
+    def _check_displaced(self, obj):
+        """
+            Remember the object moved further than MAX_SPEED from its place in the step grid -
+            checked after its own turn and after collision pushes, so objects moved by handlers
+            of others are noticed at their own turn
+        """
+        index = self._spatial_index
+        if index is None:
+            return
+        position = index.positions.get(obj)
+        if position is None:
+            # создан во время шага - и так проверяется по текущим координатам
+            return
+        max_speed = self.theme.MAX_SPEED
+        if abs(obj.x - index.xs[position]) > max_speed or abs(obj.y - index.ys[position]) > max_speed:
+            self._off_index[obj] = None
+
+    def _get_swept_candidates(self, left, min_x, min_y, max_x, max_y):
+        """
+            Objects near the swept box: from the cells of the step grid and the ones moved far from their cells
+        """
+        index = self._get_spatial_index()
+        # в сетке координаты начала шага - кто сдвинулся дальше MAX_SPEED, тот в _off_index
+        margin = left.radius + index.cell_size / 2 + self.theme.MAX_SPEED
+        candidates = [index.objects[i] for i in index.query_box(
+            min_x - margin, min_y - margin, max_x + margin, max_y + margin)]
+        if self._unindexed or self._off_index:
+            found = set(candidates)
+            for obj in self._unindexed + list(self._off_index):
+                if obj not in found:
+                    found.add(obj)
+                    candidates.append(obj)
+        return candidates
+
+    def snapshot(self):
+        """
+            Remember the state of the scene and its objects to restore it later
+        """
+        return SceneSnapshot(scene=self, objects_count=self.__objects_count, teams=self.__teams)
+
+    def restore(self, snapshot):
+        """
+            Return the scene to the snapshot state: objects created after it are removed, removed are returned.
+            If the set of objects was changed, live views of get_objects_by_type are not updated any more
+        """
+        if snapshot.scene is not self:
+            raise RobogameException("Snapshot {} is not of this scene".format(snapshot))
+        snapshot.restore()
+
+    @contextmanager
+    def fork(self):
+        """
+            Rollout: steps made inside the context are undone at exit
+
+                with scene.fork():
+                    for _ in range(100):
+                        scene.game_step()
+                    score = evaluate(scene)
+        """
+        snapshot = self.snapshot()
+        # пробные шаги не пишем в лог команд
+        recorder, self.recorder = self.recorder, None
+        try:
+            yield self
+        finally:
+            self.recorder = recorder
+            snapshot.restore()
+
+    def _restore_snapshot(self, snapshot):
+        self.__objects_count = snapshot.objects_count
+        self.__teams = OrderedDict((team, list(members)) for team, members in snapshot.teams)
+        self.__overlap_map = None
+        self._set_spatial_index(None)
+        objects = snapshot.objects
+        if len(self.objects) == len(objects) and all(obj in self.objects for obj in objects):
+            return
+        # набор объектов изменился - строим реестр и broadphase заново
+        self.objects = ObjectRegistry()
+        self._broadphase = get_broadphase(name=self.broadphase, scene=self)
+        if self._kinematics is not None:
+            self._kinematics.clear()
+            self._kinematics = KinematicsArrays(scene=self)
+        for obj in objects:
+            if self._kinematics is not None:
+                self._kinematics.add_object(obj)
+            self.objects.append(obj)
+            self._broadphase.add_object(obj)
+
+    def start_recording(self):
+        """
+            Record spawns, removals and executed commands to the binary log, see robogame_engine.replay
+        """
+        from .replay import CommandRecorder
+        self.recorder = CommandRecorder(scene=self)
+        return self.recorder
+
+    def stop_recording(self):
+        """
+            Finish recording with final objects states, return the recorder
+        """
+        recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            recorder.finish()
+        return recorder
+
+    def start_tracing(self, path=None):
+        """
+            Write per-step traces of this scene and its objects to the JSON-lines file,
+            see robogame_engine.tracing
+        """
+        from .tracing import JsonLinesSink
+        self.trace_sink = JsonLinesSink(path or self.trace_path)
+        return self.trace_sink
+
+    def stop_tracing(self):
+        """
+            Wait for the traces to be written and close the file
+        """
+        sink, self.trace_sink = self.trace_sink, None
+        if sink is not None:
+            sink.close()
+        return sink
+
+    def _trace_step(self):
+        self.trace('step', step=self._step, objects=len(self.objects))
+        trace = self.trace
+        for obj in self.objects:
+            coord = obj.coord
+            trace('object', step=self._step, obj=obj.__class__.__name__, obj_id=obj.id,
+                  x=coord.x, y=coord.y, direction=obj.direction, state=obj.state.__class__.__name__)
 
     def get_objects_status(self):
         # TODO скорее get_statuses
@@ -157,67 +643,189 @@ class Scene(CanLogging):
         """
             Main game cycle - the game begin!
         """
-        self.prepare(**self.init_kwargs)
+        self.activate()
+        self._prepare()
+        outputs = self._start_outputs()
         if not self.headless:
             self.parent_conn, child_conn = Pipe()
-            self.ui = Process(target=start_ui, args=(self.name, child_conn, theme.mod_path, self.field))
+            self.ui = Process(target=start_ui, args=(self.name, child_conn, self.theme.mod_path, self.field))
             self.ui.start()
 
+        self.scheduler = FixedTimestep(
+            step_time=self.time_sleep / self.game_speed,
+            max_catch_up=self.theme.MAX_CATCH_UP_STEPS,
+        )
         is_game_over, game_results = False, {}
+        game_over_sent = False
+        last_frame_step = self._step
         while True:
-            cycle_begin = time.time()
-
-            ui_state = None
-            if self.parent_conn:
-                # проверяем, есть ли новое состояние UI на том конце трубы
-                while self.parent_conn.poll(0):
-                    # состояний м.б. много, оставляем только последнее
-                    ui_state = self.parent_conn.recv()
-
-                # состояние UI изменилось - отрабатываем
-                if ui_state:
-                    if ui_state.the_end:
-                        break
+            if not self.parent_conn:
+                # без UI - считаем так быстро, как можем
+                is_game_over, game_results = self.get_game_result()
+                if is_game_over:
+                    break
+                self._make_step()
+                self.scheduler.step_done()
+                continue
+
+            ui_state = self._get_ui_state()
+            if ui_state and ui_state.the_end:
+                break
+            one_step = bool(ui_state and ui_state.one_step)
+            if is_game_over or (self.hold_state and not one_step):
+                # время паузы не копим
+                self.scheduler.reset()
+                time.sleep(self.scheduler.step_time)
+                continue
 
-                    for obj in self.objects:
-                        obj._selected = obj.id in ui_state.selected_ids
-
-                    # переключение режима отладки
-                    if ui_state.switch_debug:
-                        if theme.DEBUG:  # были в режиме отладки
-                            self.hold_state = False
-                        else:
-                            self.hold_state = True
-                        theme.DEBUG = not theme.DEBUG
-            is_game_over, game_results = self.get_game_result()
+            due_steps = 1 if self.hold_state else self.scheduler.due_steps()
+            made_steps = 0
+            for _ in range(due_steps):
+                is_game_over, game_results = self.get_game_result()
+                if is_game_over:
+                    break
+                self._make_step()
+                made_steps += 1
+                if not self.hold_state:
+                    self.scheduler.step_done()
             if is_game_over:
-                if self.parent_conn:
+                if not game_over_sent:
                     self.parent_conn.send(GAME_OVER)
+                    game_over_sent = True
+                continue
+
+            if made_steps and (one_step or self._step - last_frame_step >= self.game_speed):
+                if self.scheduler.is_behind and not one_step:
+                    # не успеваем - пропускаем кадр, а не шаг игры
+                    self.scheduler.frame_skipped()
                 else:
-                    break
-            elif (not self.hold_state) or (ui_state and ui_state.one_step):
-                # шаг игры, если надо
-                self._step += 1
-                self.info('Game step {}'.format(self._step))
-                self.game_step()
-                if self.parent_conn and (self._step % self.game_speed == 0 or (ui_state and ui_state.one_step)):
-                    # отсылаем новое состояние обьектов в UI раз в self.game_speed
-                    objects_status = self.get_objects_status()
-                    self.parent_conn.send(objects_status)
-                    # вычисляем остаток времени на сон
-                    cycle_time = time.time() - cycle_begin
-                    cycle_time_rest = self.time_sleep - cycle_time
-                    if cycle_time_rest > 0:
-                        # о! есть время поспать... :)
-                        time.sleep(cycle_time_rest)
+                    # отсылаем новое состояние обьектов в UI раз в self.game_speed шагов
+                    self._send_objects_status()
+                    self.scheduler.frame_sent()
+                    last_frame_step = self._step
+            if not self.hold_state:
+                self.scheduler.wait()
 
         # ждем пока потомки помрут
         if self.ui:
             self.ui.join()
 
+        self._stop_outputs(*outputs)
+
+        stats = self.scheduler.stats()
+        if stats['dropped_steps'] or stats['skipped_frames']:
+            self.warning('game is too slow: {dropped_steps} steps dropped, {skipped_frames} frames skipped', **stats)
+        self.info('{steps} steps, {frames} frames', **stats)
+        if self.state_encoder is not None:
+            self.info('state protocol: {frames} frames, {keyframes} keyframes, {bytes_per_frame:.0f} bytes per frame, '
+                      'max {max_bytes} bytes', **self.state_encoder.metrics.stats())
+        if self.profiler is not None:
+            print(self.profiler.report())
         print('Thank for playing with robogame! See you in the future :)')
         return game_results
 
+    def get_objects_state(self):
+        """
+            State of objects for the UI: statuses dict or a frame of the binary protocol
+        """
+        if self.state_encoder is None:
+            return self.get_objects_status()
+        return self.state_encoder.encode(self.objects)
+
+    def _send_objects_status(self):
+        if self.profiler is None:
+            self.parent_conn.send(self.get_objects_state())
+            return
+        with self.profiler.measure(PHASE_STATUS):
+            objects_status = self.get_objects_state()
+        with self.profiler.measure(PHASE_SEND):
+            self.parent_conn.send(objects_status)
+
+    def run(self, steps=None, until=None, callback=None, callback_every=1, result_every=1):
+        """
+            Headless fast-forward without UI, pacing, per-step logging and objects statuses.
+            Stops after steps game steps, when until(scene) is true after a step
+            or when get_game_result (checked every result_every steps, never if 0) says the game is over.
+            callback(scene) is called every callback_every steps.
+            record_path and trace_path are honored as in go, the log is saved when the run is over.
+            Returns statistics of the last get_game_result check
+        """
+        if steps is None and until is None and not result_every:
+            raise RobogameException("Scene.run needs steps, until or result_every to stop!")
+        self.activate()
+        self._prepare()
+        outputs = self._start_outputs()
+        game_results = {}
+        made_steps = 0
+        game_step = self.game_step
+        try:
+            while steps is None or made_steps < steps:
+                if result_every and made_steps % result_every == 0:
+                    is_game_over, game_results = self.get_game_result()
+                    if is_game_over:
+                        break
+                self._step += 1
+                game_step()
+                made_steps += 1
+                if callback is not None and made_steps % callback_every == 0:
+                    callback(self)
+                if until is not None and until(self):
+                    break
+        finally:
+            self._stop_outputs(*outputs)
+        return game_results
+
+    def _start_outputs(self):
+        """
+            Start recording and tracing by record_path and trace_path, if they are not started yet.
+            Returns flags of started ones for _stop_outputs
+        """
+        recording = bool(self.record_path) and self.recorder is None
+        if recording:
+            self.start_recording()
+        tracing = bool(self.trace_path) and self.trace_sink is None
+        if tracing:
+            self.start_tracing()
+        return recording, tracing
+
+    def _stop_outputs(self, recording, tracing):
+        if recording and self.recorder is not None:
+            self.stop_recording().save(self.record_path)
+        if tracing:
+            self.stop_tracing()
+
+    def _prepare(self):
+        if not self._prepared:
+            self._prepared = True
+            self.prepare(**self.init_kwargs)
+
+    def _make_step(self):
+        self._step += 1
+        self.info('Game step {}', self._step)
+        self.game_step()
+
+    def _get_ui_state(self):
+        ui_state = None
+        # проверяем, есть ли новое состояние UI на том конце трубы
+        while self.parent_conn.poll(0):
+            # состояний м.б. много, оставляем только последнее
+            ui_state = self.parent_conn.recv()
+
+        # состояние UI изменилось - отрабатываем
+        if ui_state and not ui_state.the_end:
+            for obj in self.objects:
+                obj._selected = obj.id in ui_state.selected_ids
+
+            # переключение режима отладки
+            if ui_state.switch_debug:
+                if self.theme.DEBUG:  # были в режиме отладки
+                    self.hold_state = False
+                else:
+                    self.hold_state = True
+                self.theme = self.theme.replace(DEBUG=not self.theme.DEBUG)
+                configure_logging(self.theme)
+        return ui_state
+
 
 def start_ui(name, child_conn, theme_mod_path, field=None):
     ui = UserInterface(name, theme_mod_path, field)
@@ -225,6 +833,13 @@ def start_ui(name, child_conn, theme_mod_path, field=None):
 
 
 def random_point():
-    x = randint(0, theme.FIELD_WIDTH)
-    y = randint(0, theme.FIELD_HEIGHT)
+    scene = get_current_scene()
+    rnd = random if scene is None else scene.random
+    x = rnd.randint(0, theme.FIELD_WIDTH)
+    y = rnd.randint(0, theme.FIELD_HEIGHT)
     return Point(x, y)
+
+
+def _no_clock():
+    # часы шага без профилировщика - замеры не нужны
+    return 0.0
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+from time import perf_counter, sleep
+
+
+class FixedTimestep(object):
+    """
+        Fixed rate of game steps.
+        Elapsed time is accumulated, missed steps are caught up, but not more than
+        max_catch_up per cycle - the rest is dropped, so the game slows down instead of freezing.
+        UI frames are skipped while the simulation is behind.
+        clock and sleep are perf_counter and time.sleep, tests pass their own to control the time.
+    """
+
+    def __init__(self, step_time, max_catch_up, clock=perf_counter, sleep=sleep):
+        self.step_time = step_time
+        self.max_catch_up = max_catch_up
+        self.clock = clock
+        self.sleep = sleep
+        self.accumulator = 0.0
+        self.last_time = clock()
+        self.steps = 0
+        self.dropped_steps = 0
+        self.frames = 0
+        self.skipped_frames = 0
+
+    def reset(self):
+        """
+            Forget accumulated time - after pause for example
+        """
+        self.accumulator = 0.0
+        self.last_time = self.clock()
+
+    def due_steps(self):
+        """
+            How many steps should be done now to keep the rate
+        """
+        now = self.clock()
+        self.accumulator += now - self.last_time
+        self.last_time = now
+        due = int(self.accumulator // self.step_time)
+        if due > self.max_catch_up:
+            dropped = due - self.max_catch_up
+            self.dropped_steps += dropped
+            self.accumulator -= dropped * self.step_time
+            due = self.max_catch_up
+        return due
+
+    def step_done(self):
+        self.accumulator -= self.step_time
+        self.steps += 1
+
+    @property
+    def is_behind(self):
+        return self.accumulator + (self.clock() - self.last_time) >= self.step_time
+
+    def frame_sent(self):
+        self.frames += 1
+
+    def frame_skipped(self):
+        self.skipped_frames += 1
+
+    def wait(self):
+        """
+            Sleep till the next step is due
+        """
+        rest = self.step_time - self.accumulator - (self.clock() - self.last_time)
+        if rest > 0:
+            # о! есть время поспать... :)
+            self.sleep(rest)
+
+    def stats(self):
+        return dict(
+            steps=self.steps,
+            dropped_steps=self.dropped_steps,
+            frames=self.frames,
+            skipped_frames=self.skipped_frames,
+        )
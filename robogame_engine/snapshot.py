@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+from .exceptions import RobogameException
+from .utils import get_slots_names
+
+
+class SceneSnapshot(object):
+    """
+        State of the scene objects at some moment: coordinates, vectors, states,
+        pending events and commands, timers and GameObject.snapshot_fields.
+        Objects are not copied - restore puts the values back into the same objects,
+        so links between objects (targets, owners) stay valid.
+    """
+
+    def __init__(self, scene, objects_count, teams):
+        if scene.objects._held:
+            raise RobogameException("Can't make snapshot during the game step")
+        self.scene = scene
+        self.step = scene._step
+        self.objects_count = objects_count
+        self.teams = [(team, list(members)) for team, members in teams.items()]
+        self.random_state = scene.random.getstate()
+        self.timers_state = scene.timers.get_state()
+        self.awake = set(scene._awake)
+        self.objects = list(scene.objects)
+        self.states = [_get_object_state(obj) for obj in self.objects]
+
+    def restore(self):
+        scene = self.scene
+        if scene.objects._held:
+            raise RobogameException("Can't restore snapshot during the game step")
+        scene._restore_snapshot(self)
+        for obj, state in zip(self.objects, self.states):
+            _set_object_state(obj, state)
+        scene.random.setstate(self.random_state)
+        scene.timers.set_state(self.timers_state)
+        scene._awake = set(self.awake)
+        scene._step = self.step
+
+
+def _get_object_state(obj):
+    coord, vector, state = obj.coord, obj.vector, obj.state
+    state_vector = getattr(state, 'vector', None)
+    return (
+        coord, coord.x, coord.y,
+        vector, _get_slots(vector),
+        state, _get_slots(state),
+        state_vector, None if state_vector is None else _get_slots(state_vector),
+        list(obj._events), list(obj._commands),
+        set(obj._timers), obj._sleeping,
+        tuple(getattr(obj, name) for name in obj.snapshot_fields),
+    )
+
+
+def _set_object_state(obj, object_state):
+    (coord, x, y, vector, vector_slots, state, state_slots, state_vector, state_vector_slots,
+     events, commands, timers, sleeping, fields) = object_state
+    # возвращаем значения в те же объекты - на них могут ссылаться цели других объектов
+    coord.x, coord.y = x, y
+    obj.coord = coord
+    _set_slots(vector, vector_slots)
+    obj.vector = vector
+    _set_slots(state, state_slots)
+    if state_vector is not None:
+        _set_slots(state_vector, state_vector_slots)
+    obj.state = state
+    obj._events.clear()
+    obj._events.extend(events)
+    obj._commands.clear()
+    obj._commands.extend(commands)
+    obj._timers.clear()
+    obj._timers.update(timers)
+    obj._sleeping = sleeping
+    for name, value in zip(obj.snapshot_fields, fields):
+        setattr(obj, name, value)
+
+
+def _get_slot_names(cls):
+    # представления в массивах сцены сохраняют только значения
+    return getattr(cls, 'snapshot_slots', None) or get_slots_names(cls)
+
+
+def _get_slots(obj):
+    values = tuple(getattr(obj, name) for name in _get_slot_names(obj.__class__))
+    # у наследников без __slots__ есть и __dict__
+    attributes = getattr(obj, '__dict__', None)
+    return values, None if attributes is None else attributes.copy()
+
+
+def _set_slots(obj, state):
+    values, attributes = state
+    for name, value in zip(_get_slot_names(obj.__class__), values):
+        setattr(obj, name, value)
+    if attributes is not None:
+        obj.__dict__.clear()
+        obj.__dict__.update(attributes)
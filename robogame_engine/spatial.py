@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+from collections import defaultdict
+import math
+
+# соседние ячейки, которые надо проверить, чтобы каждая пара попала только один раз
+HALF_NEIGHBOURHOOD = ((1, -1), (1, 0), (1, 1), (0, 1))
+
+
+class SpatialHash(object):
+    """
+        Uniform grid over the battle field.
+        Objects are hashed by their centers, cell size is not less than
+        the biggest diameter, so overlapped objects are always in neighbour cells.
+        Coordinates are remembered at insertion - queries are consistent till the grid rebuild.
+    """
+
+    def __init__(self, cell_size, width, height):
+        self.cell_size = float(cell_size)
+        self.cols = max(int(math.ceil(width / self.cell_size)), 1)
+        self.rows = max(int(math.ceil(height / self.cell_size)), 1)
+        self.cells = defaultdict(list)
+        self.objects = []
+        self.positions = {}
+        self.xs = []
+        self.ys = []
+
+    @classmethod
+    def from_objects(cls, objects, width, height):
+        objects = list(objects)
+        max_radius = max([obj.radius for obj in objects] or [0])
+        grid = cls(cell_size=max(2 * max_radius, 1), width=width, height=height)
+        for obj in objects:
+            grid.insert(obj)
+        return grid
+
+    def cell_of(self, x, y):
+        """
+            Grid cell of the point, points out of the field go to the border cells
+        """
+        col = int(x // self.cell_size)
+        row = int(y // self.cell_size)
+        if col < 0:
+            col = 0
+        elif col >= self.cols:
+            col = self.cols - 1
+        if row < 0:
+            row = 0
+        elif row >= self.rows:
+            row = self.rows - 1
+        return col, row
+
+    def insert(self, obj):
+        index = len(self.objects)
+        x, y = obj.x, obj.y
+        self.objects.append(obj)
+        self.positions[obj] = index
+        self.xs.append(x)
+        self.ys.append(y)
+        self.cells[self.cell_of(x, y)].append(index)
+        return index
+
+    def query_radius(self, x, y, radius, predicate=None):
+        """
+            Indexes of objects with centers not further than radius from (x, y), in insertion order
+        """
+        col_from, row_from = self.cell_of(x - radius, y - radius)
+        col_till, row_till = self.cell_of(x + radius, y + radius)
+        if (col_till - col_from + 1) * (row_till - row_from + 1) > len(self.objects):
+            candidates = range(len(self.objects))
+        else:
+            candidates = []
+            for col in range(col_from, col_till + 1):
+                for row in range(row_from, row_till + 1):
+                    candidates.extend(self.cells.get((col, row), ()))
+            candidates.sort()
+        square_radius = radius * radius
+        found = []
+        for index in candidates:
+            dx, dy = self.xs[index] - x, self.ys[index] - y
+            if dx * dx + dy * dy <= square_radius and (predicate is None or predicate(self.objects[index])):
+                found.append(index)
+        return found
+
+    def query_box(self, min_x, min_y, max_x, max_y):
+        """
+            Indexes of objects with centers inside the box, in insertion order
+        """
+        col_from, row_from = self.cell_of(min_x, min_y)
+        col_till, row_till = self.cell_of(max_x, max_y)
+        if (col_till - col_from + 1) * (row_till - row_from + 1) > len(self.objects):
+            candidates = range(len(self.objects))
+        else:
+            candidates = []
+            for col in range(col_from, col_till + 1):
+                for row in range(row_from, row_till + 1):
+                    candidates.extend(self.cells.get((col, row), ()))
+            candidates.sort()
+        xs, ys = self.xs, self.ys
+        return [index for index in candidates if min_x <= xs[index] <= max_x and min_y <= ys[index] <= max_y]
+
+    def nearest(self, x, y, count, predicate=None):
+        """
+            Indexes of count objects nearest to (x, y), sorted by distance.
+            Cells are visited by expanding rings until the rest is surely further
+        """
+        if count <= 0:
+            return []
+        center_col, center_row = self.cell_of(x, y)
+        max_ring = max(self.cols, self.rows)
+        found = []
+        for ring in range(max_ring + 1):
+            for col, row in self._ring_cells(center_col, center_row, ring):
+                for index in self.cells.get((col, row), ()):
+                    if predicate is None or predicate(self.objects[index]):
+                        found.append((math.hypot(self.xs[index] - x, self.ys[index] - y), index))
+            if len(found) < count:
+                continue
+            found.sort()
+            if found[count - 1][0] <= self._ring_bound(x, y, center_col, center_row, ring):
+                break
+        found.sort()
+        return [index for _, index in found[:count]]
+
+    def _ring_bound(self, x, y, center_col, center_row, ring):
+        """
+            Distance from (x, y) to the nearest not visited cell
+        """
+        bounds = [float('inf')]
+        if center_col - ring > 0:
+            bounds.append(x - (center_col - ring) * self.cell_size)
+        if center_col + ring < self.cols - 1:
+            bounds.append((center_col + ring + 1) * self.cell_size - x)
+        if center_row - ring > 0:
+            bounds.append(y - (center_row - ring) * self.cell_size)
+        if center_row + ring < self.rows - 1:
+            bounds.append((center_row + ring + 1) * self.cell_size - y)
+        return min(bounds)
+
+    def _ring_cells(self, center_col, center_row, ring):
+        if ring == 0:
+            yield center_col, center_row
+            return
+        for col in range(center_col - ring, center_col + ring + 1):
+            if 0 <= col < self.cols:
+                if center_row - ring >= 0:
+                    yield col, center_row - ring
+                if center_row + ring < self.rows:
+                    yield col, center_row + ring
+        for row in range(center_row - ring + 1, center_row + ring):
+            if 0 <= row < self.rows:
+                if center_col - ring >= 0:
+                    yield center_col - ring, row
+                if center_col + ring < self.cols:
+                    yield center_col + ring, row
+
+    def candidate_pairs(self):
+        """
+            Index pairs (i < j) of objects from the same or neighbour cells,
+            sorted like the nested loop over objects does
+        """
+        pairs = []
+        cells = self.cells
+        for (col, row), indexes in cells.items():
+            count = len(indexes)
+            for k in range(count):
+                left = indexes[k]
+                for right in indexes[k + 1:]:
+                    pairs.append((left, right) if left < right else (right, left))
+            for d_col, d_row in HALF_NEIGHBOURHOOD:
+                neighbours = cells.get((col + d_col, row + d_row))
+                if not neighbours:
+                    continue
+                for left in indexes:
+                    for right in neighbours:
+                        pairs.append((left, right) if left < right else (right, left))
+        pairs.sort()
+        return pairs
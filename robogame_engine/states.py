@@ -1,49 +1,81 @@
 # -*- coding: utf-8 -*-
 
-from .theme import theme
 from .events import EventStoppedAtTargetPoint, EventStopped
 from .geometry import Vector
-from .utils import CanLogging
+from .utils import CanLogging, get_slots_values
+
+_reused_classes = []
 
 
 class ObjectState(CanLogging):
+    """
+        State of the object movement. States are reused: reuse() gives the instance of the state class
+        cached in the object, so the transitions between states don't create new objects.
+    """
+    __slots__ = ('obj', 'kwargs', 'target_point', 'speed', 'vector')
+    idle = False  # step() ничего не делает - объект может спать
+
+    @classmethod
+    def reuse(cls, obj, **kwargs):
+        """
+            Instance of the state for the object, initialized again by kwargs
+        """
+        # список по номерам классов - меньше словаря в каждом объекте
+        index = cls.__dict__.get('_reuse_index')
+        if index is None:
+            index = len(_reused_classes)
+            _reused_classes.append(cls)
+            cls._reuse_index = index
+        states = obj._states
+        if states is None:
+            states = obj._states = []
+        if index >= len(states):
+            states.extend([None] * (index + 1 - len(states)))
+        state = states[index]
+        if state is None:
+            state = states[index] = cls(obj=obj, **kwargs)
+        else:
+            state.__init__(obj=obj, **kwargs)
+        return state
 
     def __init__(self, obj, target=None, speed=None, **kwargs):
         self.obj = obj
         self.kwargs = kwargs
         self.target_point = target.coord if hasattr(target, 'coord') else target
-        self.speed = theme.MAX_SPEED if speed is None else speed
+        self.speed = obj.theme.MAX_SPEED if speed is None else speed
         if self.target_point:
             self.vector = Vector.from_points(self.obj.coord, self.target_point, module=self.speed)
         else:
             self.vector = None
 
     def move(self, target, speed):
-        if self.obj.rotate_mode == theme.ROTATE_TURNING:
-            self.obj.state = StateTurning(obj=self.obj, target=target, speed=speed)
+        if self.obj.rotate_mode == self.obj.theme.ROTATE_TURNING:
+            self.obj.state = StateTurning.reuse(self.obj, target=target, speed=speed)
             self.obj.state.move_at_target = True
         else:
-            self.obj.state = StateMoving(obj=self.obj, target=target, speed=speed)
+            self.obj.state = StateMoving.reuse(self.obj, target=target, speed=speed)
 
     def stop(self):
-        self.obj.state = StateStopped(obj=self.obj)
+        self.obj.state = StateStopped.reuse(self.obj)
 
     def turn(self, vector, target, speed=None):
-        self.obj.state = StateTurning(obj=self.obj, vector=vector, target=target, speed=speed)
+        self.obj.state = StateTurning.reuse(self.obj, vector=vector, target=target, speed=speed)
 
     def step(self):
         raise NotImplementedError
 
     def __str__(self):
-        return "{}: {}".format(self.__class__.__name__, self.__dict__)
+        return "{}: {}".format(self.__class__.__name__, get_slots_values(self))
 
 
 class StateTurning(ObjectState):
-    move_at_target = False
+    __slots__ = ('turn_speed', 'move_at_target', 'trig_tables')
 
     def __init__(self, obj, target=None, speed=None, **kwargs):
         super(StateTurning, self).__init__(obj=obj, target=target, speed=speed, **kwargs)
-        self.turn_speed = speed if speed else theme.MAX_TURN_SPEED
+        self.turn_speed = speed if speed else obj.theme.MAX_TURN_SPEED
+        self.move_at_target = False
+        self.trig_tables = obj.scene.trig_tables
 
     def step(self):
         obj = self.obj
@@ -51,25 +83,26 @@ class StateTurning(ObjectState):
         if abs(delta) < self.turn_speed:
             obj.vector = self.vector
             if self.move_at_target:
-                obj.state = StateMoving(obj=obj, target=self.target_point, speed=self.speed)
+                obj.state = StateMoving.reuse(obj, target=self.target_point, speed=self.speed)
             else:
-                obj.state = StateStopped(obj=obj)
+                obj.state = StateStopped.reuse(obj)
                 event = EventStopped()
                 self.obj.add_event(event)
         else:
             if -180 < delta < 0 or delta > 180:
-                obj.vector.rotate(-self.turn_speed)
+                obj.vector.rotate(-self.turn_speed, tables=self.trig_tables)
             else:
-                obj.vector.rotate(self.turn_speed)
+                obj.vector.rotate(self.turn_speed, tables=self.trig_tables)
 
 
 class StateMoving(ObjectState):
+    __slots__ = ()
 
     def step(self):
         distance_to_target = self.obj.coord.distance_to(self.target_point)
         if distance_to_target < self.vector.module:
             self.obj.coord += Vector.from_direction(self.vector.direction, distance_to_target)
-            self.obj.state = StateStopped(obj=self.obj)
+            self.obj.state = StateStopped.reuse(self.obj)
             event = EventStoppedAtTargetPoint(self.target_point)
             self.obj.add_event(event)
         else:
@@ -78,6 +111,8 @@ class StateMoving(ObjectState):
 
 
 class StateStopped(ObjectState):
+    __slots__ = ()
+    idle = True
 
     def stop(self):
         pass
@@ -87,6 +122,8 @@ class StateStopped(ObjectState):
 
 
 class StateDead(ObjectState):
+    __slots__ = ()
+    idle = True
 
     def move(self, target, speed):
         pass
@@ -1,44 +1,116 @@
 # -*- coding: utf-8 -*-
 
 from importlib import import_module
+from types import ModuleType
 
 from robogame_engine.exceptions import RobogameException
 from . import constants
+from .context import get_current_scene
 
 
-class Theme(object):
-    mod_path = None
-    module = constants
+class ThemeSnapshot(object):
+    """
+        Compiled theme: constants of the engine overridden by the theme module, resolved once.
+        Immutable - a changed theme is a new snapshot, see replace
+    """
+    __slots__ = ('mod_path', )
+    names = ()
 
-    def set_theme_module(self, mod_path=None):
-        self.mod_path = 'default_theme' if mod_path is None else mod_path
-        try:
-            self.module = import_module(self.mod_path)
-        except ImportError:
-            raise RobogameException("Can't load theme {}".format(self.mod_path))
+    def __init__(self, mod_path, values):
+        object.__setattr__(self, 'mod_path', mod_path)
+        for name in self.names:
+            object.__setattr__(self, name, values[name])
 
     def __getattr__(self, item):
-        if item not in self.__dict__:
-            try:
-                value = getattr(self.module, item)
-            except AttributeError:
-                try:
-                    value = getattr(constants, item)
-                except AttributeError:
-                    import inspect
-                    stack = inspect.stack()
-                    caller_frame = stack[1]
-                    raise AttributeError(
-                        "No constant {theme}.{item}\nFile \"{file}\", line {lineno}, in {func}\n\t{code} ".format(
-                            item=item,
-                            theme=self.mod_path,
-                            file=caller_frame[1],
-                            lineno=caller_frame[2],
-                            func=caller_frame[3],
-                            code=caller_frame[4][0].strip()
-                        ))
-            self.__dict__[item] = value
-        return self.__dict__[item]
-
-
-theme = Theme()
+        # сюда попадаем только если такой константы нет
+        raise AttributeError("No constant {theme}.{item}".format(theme=self.mod_path, item=item))
+
+    def __setattr__(self, item, value):
+        raise AttributeError("Theme {} is immutable, use replace({}=...)".format(self.mod_path, item))
+
+    def __delattr__(self, item):
+        raise AttributeError("Theme {} is immutable".format(self.mod_path))
+
+    def __reduce__(self):
+        return _make_snapshot, (self.mod_path, self.as_dict())
+
+    def __repr__(self):
+        return 'ThemeSnapshot({})'.format(self.mod_path)
+
+    def as_dict(self):
+        return dict((name, getattr(self, name)) for name in self.names)
+
+    def replace(self, **changes):
+        """
+            New snapshot with changed (or added) constants
+        """
+        values = self.as_dict()
+        values.update(changes)
+        return _make_snapshot(self.mod_path, values)
+
+
+_snapshot_classes = {}
+
+
+def _make_snapshot(mod_path, values):
+    names = tuple(sorted(values))
+    cls = _snapshot_classes.get(names)
+    if cls is None:
+        reserved = [name for name in names if hasattr(ThemeSnapshot, name)]
+        if reserved:
+            raise RobogameException("Theme {} can't define {}".format(mod_path, ', '.join(reserved)))
+        # класс на набор имен - значения в слотах, чтение константы - обычное чтение атрибута
+        cls = type('ThemeSnapshot', (ThemeSnapshot, ), dict(__slots__=names, names=names))
+        _snapshot_classes[names] = cls
+    return cls(mod_path, values)
+
+
+def _get_module_values(module):
+    return dict((name, value) for name, value in vars(module).items()
+                if not name.startswith('_') and not isinstance(value, ModuleType))
+
+
+def compile_theme(mod_path=None, **overrides):
+    """
+        Snapshot of the theme module mod_path ('default_theme' by default) over the engine constants
+    """
+    mod_path = 'default_theme' if mod_path is None else mod_path
+    try:
+        module = import_module(mod_path)
+    except ImportError:
+        raise RobogameException("Can't load theme {}".format(mod_path))
+    values = _get_module_values(constants)
+    values.update(_get_module_values(module))
+    values.update(overrides)
+    return _make_snapshot(mod_path, values)
+
+
+class CurrentTheme(object):
+    """
+        Theme of the current scene, default theme if there is no scene (at UI process for example)
+    """
+
+    def __getattr__(self, item):
+        return getattr(current_theme(), item)
+
+    def __setattr__(self, item, value):
+        raise AttributeError("Themes are immutable, use replace({}=...)".format(item))
+
+
+def current_theme():
+    scene = get_current_scene()
+    if scene is None:
+        return default_theme
+    return scene.theme
+
+
+def set_default_theme(snapshot):
+    """
+        Theme used out of scenes - the UI process sets its own
+    """
+    global default_theme
+    default_theme = snapshot
+
+
+default_theme = _make_snapshot(None, _get_module_values(constants))
+theme = CurrentTheme()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+from .exceptions import RobogameException
+
+
+class Timer(object):
+    """
+        Callback of the timer wheel, due at the step, repeated every interval steps if interval is set
+    """
+    __slots__ = ('due', 'callback', 'interval', 'cancelled')
+
+    def __init__(self, due, callback, interval=None):
+        self.due = due
+        self.callback = callback
+        self.interval = interval
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def __str__(self):
+        return 'timer(due={} interval={} {})'.format(self.due, self.interval, self.callback)
+
+    __repr__ = __str__
+
+
+class TimerWheel(object):
+    """
+        Hierarchical timer wheel: levels of slots, each level is slots_count times coarser.
+        Timer is put in the level by its delay, on wrap of lower level the slot of upper level
+        is spread down. So the step costs the number of due (and cascaded) timers, not of all timers.
+        Cancelled timers are dropped when they are reached.
+    """
+
+    def __init__(self, slot_bits=6, levels=4):
+        self.slot_bits = slot_bits
+        self.levels = levels
+        self.mask = (1 << slot_bits) - 1
+        self.wheels = [[[] for _ in range(1 << slot_bits)] for _ in range(levels)]
+        # не влезающие в колеса - ждут полного оборота
+        self.overflow = []
+        self.tick = 0
+
+    def schedule(self, delay, callback, interval=None):
+        """
+            Call callback() after delay steps, then every interval steps if it's set
+        """
+        if delay < 1 or (interval is not None and interval < 1):
+            raise RobogameException("Timer delay and interval must be at least one step")
+        timer = Timer(due=self.tick + delay, callback=callback, interval=interval)
+        self._insert(timer)
+        return timer
+
+    def _insert(self, timer):
+        delta = timer.due - self.tick
+        for level in range(self.levels):
+            if delta >> (self.slot_bits * (level + 1)) == 0:
+                self.wheels[level][(timer.due >> (self.slot_bits * level)) & self.mask].append(timer)
+                return
+        self.overflow.append(timer)
+
+    def advance(self):
+        """
+            Next step: call callbacks of due timers
+        """
+        self.tick += 1
+        tick = self.tick
+        if not tick & self.mask:
+            self._cascade(tick)
+        slots = self.wheels[0]
+        index = tick & self.mask
+        due, slots[index] = slots[index], []
+        for timer in due:
+            if timer.cancelled:
+                continue
+            if timer.interval is not None:
+                timer.due += timer.interval
+                self._insert(timer)
+            timer.callback()
+
+    def _cascade(self, tick):
+        top = 1
+        while top < self.levels and not tick & ((1 << (self.slot_bits * (top + 1))) - 1):
+            top += 1
+        if top == self.levels:
+            overflow, self.overflow = self.overflow, []
+            for timer in overflow:
+                if not timer.cancelled:
+                    self._insert(timer)
+            top -= 1
+        # сверху вниз - спущенные таймеры могут попасть в слот, который спускается следом
+        for level in range(top, 0, -1):
+            slots = self.wheels[level]
+            index = (tick >> (self.slot_bits * level)) & self.mask
+            timers, slots[index] = slots[index], []
+            for timer in timers:
+                if not timer.cancelled:
+                    self._insert(timer)
+
+    def get_state(self):
+        """
+            State for snapshots: slots content and mutable fields of timers
+        """
+        timers = [timer for level in self.wheels for slot in level for timer in slot] + self.overflow
+        return (
+            self.tick,
+            [[list(slot) for slot in level] for level in self.wheels],
+            list(self.overflow),
+            [(timer, timer.due, timer.cancelled) for timer in timers],
+        )
+
+    def set_state(self, state):
+        self.tick, wheels, overflow, timers = state
+        self.wheels = [[list(slot) for slot in level] for level in wheels]
+        self.overflow = list(overflow)
+        for timer, due, cancelled in timers:
+            timer.due = due
+            timer.cancelled = cancelled
@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Headless tournament: many matches in a pool of worker processes.
+
+        python -m robogame_engine.tournament my_game.tournament:make_scene \
+            --pairings Drones,Mothership Drones,Hunters --seeds 1 2 3 --workers 4 --timeout 120
+
+    Scene factory is called as factory(teams=pairing, seed=seed) and must return a Scene.
+"""
+from __future__ import print_function
+
+import argparse
+from collections import OrderedDict
+from importlib import import_module
+import json
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import wait
+import numbers
+import random
+import time
+import traceback
+
+from .exceptions import RobogameException
+from .utils import CanLogging
+
+
+class MatchResult(object):
+    """
+        Result of one match: get_game_result statistics or error description
+    """
+
+    def __init__(self, number, teams, seed, result=None, error=None, elapsed=0.0):
+        self.number = number
+        self.teams = teams
+        self.seed = seed
+        self.result = result
+        self.error = error
+        self.elapsed = elapsed
+
+    @property
+    def is_ok(self):
+        return self.error is None
+
+    def as_dict(self):
+        return dict(
+            number=self.number,
+            teams=list(self.teams),
+            seed=self.seed,
+            result=self.result,
+            error=self.error,
+            elapsed=self.elapsed,
+        )
+
+    def __str__(self):
+        return 'match({number} {teams} seed={seed}: {outcome})'.format(
+            outcome=self.result if self.is_ok else self.error, **self.__dict__)
+
+    __repr__ = __str__
+
+
+class Standings(object):
+    """
+        Statistics of teams summed over finished matches
+    """
+
+    def __init__(self):
+        self.teams = OrderedDict()
+        self.failed = 0
+
+    def add(self, match_result):
+        if not match_result.is_ok:
+            self.failed += 1
+            return
+        for team, stats in (match_result.result or {}).items():
+            team_stats = self.teams.setdefault(team, OrderedDict(matches=0))
+            team_stats['matches'] += 1
+            if isinstance(stats, dict):
+                items = stats.items()
+            else:
+                items = [('score', stats)]
+            for name, value in items:
+                if isinstance(value, numbers.Number):
+                    team_stats[name] = team_stats.get(name, 0) + value
+
+    def as_dict(self):
+        return dict(teams=self.teams, failed=self.failed)
+
+
+def play_match(scene_factory, teams, seed):
+    """
+        Play one headless match, return statistics from get_game_result
+    """
+    random.seed(seed)
+    scene = scene_factory(teams=teams, seed=seed)
+    # без окна и без печати в stdout - он занят строками JSON результатов
+    return scene.run()
+
+
+def _worker(conn, scene_factory):
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+        number, teams, seed = task
+        started = time.time()
+        try:
+            result, error = play_match(scene_factory, teams, seed), None
+        except Exception:
+            result, error = None, traceback.format_exc()
+        conn.send((number, result, error, time.time() - started))
+    conn.close()
+
+
+class _WorkerProcess(object):
+
+    def __init__(self, scene_factory):
+        self.conn, child_conn = Pipe()
+        self.process = Process(target=_worker, args=(child_conn, scene_factory))
+        self.process.daemon = True
+        self.process.start()
+        self.match = None
+        self.started = None
+        self.played = 0
+
+    def assign(self, match):
+        self.match = match
+        self.started = time.time()
+        self.conn.send(match)
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, EOFError):
+            pass
+        self.process.join(1)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+
+
+class Tournament(CanLogging):
+    """
+        Run matches of each pairing for each seed in a pool of processes.
+        Hung match is killed after timeout seconds together with its worker,
+        workers are restarted after matches_per_worker matches to free leaked resources.
+    """
+
+    def __init__(self, scene_factory, pairings, seeds=(None, ), workers=4, timeout=None, matches_per_worker=None):
+        if workers < 1:
+            raise RobogameException("Tournament needs at least one worker!")
+        self.scene_factory = scene_factory
+        self.pairings = [tuple(teams) for teams in pairings]
+        self.seeds = list(seeds)
+        self.workers = workers
+        self.timeout = timeout
+        self.matches_per_worker = matches_per_worker
+        self.standings = Standings()
+
+    def matches(self):
+        number = 0
+        for teams in self.pairings:
+            for seed in self.seeds:
+                number += 1
+                yield number, teams, seed
+
+    def run(self):
+        """
+            Generator of MatchResult in order of finishing, self.standings are updated before yield
+        """
+        pending = list(self.matches())
+        pending.reverse()
+        pool = [_WorkerProcess(self.scene_factory) for _ in range(min(self.workers, len(pending)))]
+        try:
+            for worker in pool:
+                worker.assign(pending.pop())
+            while any(worker.match for worker in pool):
+                busy = [worker for worker in pool if worker.match]
+                ready = wait([worker.conn for worker in busy], timeout=self._wait_timeout(busy))
+                for worker in busy:
+                    if worker.conn in ready:
+                        match_result = self._receive(worker)
+                    elif self.timeout and time.time() - worker.started > self.timeout:
+                        match_result = self._kill(worker, pool)
+                        worker = pool[-1]
+                    else:
+                        continue
+                    self.standings.add(match_result)
+                    yield match_result
+                    if worker.match is None and pending:
+                        if not worker.process.is_alive() or (
+                                self.matches_per_worker and worker.played >= self.matches_per_worker):
+                            worker = self._recycle(worker, pool)
+                        worker.assign(pending.pop())
+        finally:
+            for worker in pool:
+                if worker.match:
+                    worker.kill()
+                else:
+                    worker.stop()
+
+    def _wait_timeout(self, busy):
+        if not self.timeout:
+            return None
+        now = time.time()
+        return max(0, min(worker.started + self.timeout - now for worker in busy))
+
+    def _receive(self, worker):
+        number, teams, seed = worker.match
+        try:
+            _, result, error, elapsed = worker.conn.recv()
+        except EOFError:
+            result, error, elapsed = None, 'worker died', time.time() - worker.started
+        worker.match = None
+        worker.played += 1
+        return MatchResult(number=number, teams=teams, seed=seed, result=result, error=error, elapsed=elapsed)
+
+    def _kill(self, worker, pool):
+        number, teams, seed = worker.match
+        self.warning('match {} {} seed={} timed out, restart worker', number, teams, seed)
+        worker.kill()
+        pool.remove(worker)
+        pool.append(_WorkerProcess(self.scene_factory))
+        return MatchResult(number=number, teams=teams, seed=seed,
+                           error='timeout {}s'.format(self.timeout), elapsed=time.time() - worker.started)
+
+    def _recycle(self, worker, pool):
+        worker.stop()
+        pool.remove(worker)
+        pool.append(_WorkerProcess(self.scene_factory))
+        return pool[-1]
+
+
+def run_tournament(scene_factory, pairings, seeds=(None, ), workers=4, timeout=None, matches_per_worker=None):
+    """
+        Play the tournament, return (list of MatchResult, Standings)
+    """
+    tournament = Tournament(scene_factory=scene_factory, pairings=pairings, seeds=seeds, workers=workers,
+                            timeout=timeout, matches_per_worker=matches_per_worker)
+    results = list(tournament.run())
+    return results, tournament.standings
+
+
+def import_factory(path):
+    module_path, _, name = path.partition(':')
+    if not name:
+        raise RobogameException("Scene factory must be set as 'module.path:function', got {}".format(path))
+    return getattr(import_module(module_path), name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('factory', help='scene factory as module.path:function')
+    parser.add_argument('--pairings', nargs='+', required=True, help='comma separated team names of each match')
+    parser.add_argument('--seeds', type=int, nargs='+', default=[None])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--timeout', type=float, default=None, help='seconds per match')
+    parser.add_argument('--matches-per-worker', type=int, default=None)
+    args = parser.parse_args()
+
+    tournament = Tournament(
+        scene_factory=import_factory(args.factory),
+        pairings=[pairing.split(',') for pairing in args.pairings],
+        seeds=args.seeds,
+        workers=args.workers,
+        timeout=args.timeout,
+        matches_per_worker=args.matches_per_worker,
+    )
+    for match_result in tournament.run():
+        print(json.dumps(dict(match=match_result.as_dict(), standings=tournament.standings.as_dict()), default=str))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+    Structured traces: JSON-lines sink for the trace logger, written from a background thread.
+
+        class MyScene(Scene):
+            trace_path = 'game.jsonl'
+
+    Every game step writes a 'step' record and an 'object' record per object (coordinates,
+    direction and state), objects add their own records by CanLogging.trace(event, **fields).
+    The sink of Scene.start_tracing is the scene's own - other scenes of the process are not traced.
+    start_tracing of this module attaches a sink to the trace logger of the whole process:
+    it gets records of objects without own sinks and, with logs=True, engine log messages.
+    Records are converted to plain values in the game thread, the disk is touched only by the writer.
+"""
+import json
+import logging
+from queue import Queue
+from threading import Thread
+
+from .utils import CanLogging, LOGGER_NAME, TRACE_LOGGER_NAME, get_logger
+
+_STOP = object()
+
+
+class JsonLinesSink(logging.Handler):
+    """
+        Logging handler, which writes records as JSON lines from its own thread
+    """
+
+    def __init__(self, path, level=logging.DEBUG):
+        super(JsonLinesSink, self).__init__(level=level)
+        self.path = path
+        self.records = 0
+        self._queue = Queue()
+        self._file = open(path, 'w')
+        self._writer = Thread(target=self._write, name='robogame-trace', daemon=True)
+        self._writer.start()
+
+    def emit(self, record):
+        try:
+            line = {
+                'time': record.created,
+                'level': record.levelname,
+                'message': record.getMessage(),
+            }
+            fields = getattr(record, 'fields', None)
+            if fields:
+                for name, value in fields.items():
+                    if not isinstance(value, (int, float, str, bool, type(None))):
+                        value = str(value)
+                    line[name] = value
+            self._queue.put(line)
+        except Exception:
+            self.handleError(record)
+
+    def _write(self):
+        queue, out = self._queue, self._file
+        while True:
+            line = queue.get()
+            if line is _STOP:
+                break
+            out.write(json.dumps(line))
+            out.write('\n')
+            self.records += 1
+            if queue.empty():
+                out.flush()
+        out.close()
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+        super(JsonLinesSink, self).close()
+
+
+def start_tracing(path, logs=False):
+    """
+        Write traces of the whole process to the JSON-lines file path, logs=True - engine log messages too.
+        Returns the sink for stop_tracing
+    """
+    sink = JsonLinesSink(path)
+    trace_logger = logging.getLogger(TRACE_LOGGER_NAME)
+    trace_logger.setLevel(logging.DEBUG)
+    trace_logger.propagate = False
+    trace_logger.disabled = False
+    trace_logger.addHandler(sink)
+    if logs:
+        get_logger().addHandler(sink)
+    CanLogging._tracing = True
+    return sink
+
+
+def stop_tracing(sink):
+    """
+        Detach the sink and wait for its records to be written
+    """
+    trace_logger = logging.getLogger(TRACE_LOGGER_NAME)
+    trace_logger.removeHandler(sink)
+    logging.getLogger(LOGGER_NAME).removeHandler(sink)
+    if not trace_logger.handlers:
+        CanLogging._tracing = False
+    sink.close()
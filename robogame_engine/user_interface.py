@@ -19,7 +19,8 @@ from .constants import (
     ROTATE_NO_TURN, ROTATE_TURNING, ROTATE_FLIP_VERTICAL, ROTATE_FLIP_HORIZONTAL, ROTATE_FLIP_BOTH, GAME_OVER)
 from .geometry import Point
 from .utils import CanLogging
-from .theme import theme
+from .protocol import StateDecoder
+from .theme import theme, compile_theme, set_default_theme
 
 
 class RoboSprite(DirtySprite, CanLogging):
@@ -212,14 +213,16 @@ class UserInterface(CanLogging):
     sprites_by_layer = []
     sprites_all = []
 
-    def __init__(self, name, current_theme, field=None):
+    def __init__(self, name, current_theme, field=None, theme_overrides=None):
         """
             Make game window
         """
-        theme.set_theme_module(current_theme)
-
+        overrides = dict(theme_overrides or {})
         if field:
-            theme.FIELD_WIDTH, theme.FIELD_HEIGHT = field
+            overrides.update(FIELD_WIDTH=field[0], FIELD_HEIGHT=field[1])
+        self.theme = compile_theme(current_theme, **overrides)
+        # в процессе UI сцены нет - спрайты читают тему по умолчанию
+        set_default_theme(self.theme)
 
         UserInterface.sprites_all = pygame.sprite.LayeredUpdates()
         UserInterface.sprites_by_layer = [pygame.sprite.LayeredUpdates(layer=i) for i in range(theme.MAX_LAYERS + 1)]
@@ -250,6 +253,7 @@ class UserInterface(CanLogging):
         self.debug = False
 
         self.game_objects = {}
+        self.state_decoder = StateDecoder()
         self.ui_state = UserInput()
 
         self._debug = False
@@ -286,6 +290,9 @@ class UserInterface(CanLogging):
                     self.logger.error('UI draw: {}'.format(exc))
             except Exception as exc:
                 self.logger.error('UI: {}'.format(exc))
+        if self.state_decoder.metrics.frames:
+            self.info('state protocol: {frames} frames, {bytes_per_frame:.0f} bytes per frame',
+                      **self.state_decoder.metrics.stats())
         # очистка
         for group in self.sprites_by_layer:
             for sprite in group:
@@ -300,8 +307,13 @@ class UserInterface(CanLogging):
 
     def update_state(self, objects_status):
         """
-            renew game objects states, create/delete sprites if need
+            renew game objects states, create/delete sprites if need.
+            objects_status - dict id -> ObjectStatus or a frame of robogame_engine.protocol
         """
+        if isinstance(objects_status, bytes):
+            objects_status = self.state_decoder.decode(objects_status)
+            if objects_status is None:
+                return
         new_ids = set(objects_status)
         old_ids = set(self.game_objects)
         new_game_objects = {}
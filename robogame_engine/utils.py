@@ -3,6 +3,7 @@
 
 import logging
 import logging.config
+from string import Formatter
 
 
 # def _collide_circle(left, right):
@@ -19,42 +20,160 @@ import logging.config
 #     return int((left.radius + right.radius) - left.distance_to(right))
 
 
+def get_slots_names(cls):
+    """
+        Names of __slots__ of the class and its bases, in order of declaration
+    """
+    names = _slots_names.get(cls)
+    if names is None:
+        names = []
+        for klass in reversed(cls.__mro__):
+            slots = klass.__dict__.get('__slots__', ())
+            if isinstance(slots, str):
+                slots = (slots, )
+            names.extend(name for name in slots if name not in ('__dict__', '__weakref__'))
+        names = _slots_names[cls] = tuple(names)
+    return names
+
+
+_slots_names = {}
+
+
+def get_slots_values(obj):
+    return dict((name, getattr(obj, name, None)) for name in get_slots_names(obj.__class__))
+
+
+LOGGER_NAME = 'robogame'
+TRACE_LOGGER_NAME = 'robogame.trace'
+
+_logger = None
+_trace_logger = logging.getLogger(TRACE_LOGGER_NAME)
+_formatter = Formatter()
+
+
+def get_logger():
+    """
+        Engine logger, configured at the first call
+    """
+    if _logger is None:
+        configure_logging()
+    return _logger
+
+
+def configure_logging(log_theme=None):
+    """
+        Configure the engine logger by the theme (the current one by default):
+        handlers - once per process, the level - every call.
+        The level is one per process: the last configured scene (or the debug switch) sets it for all scenes
+    """
+    global _logger
+    if log_theme is None:
+        from .theme import theme as log_theme
+    if _logger is None:
+        logging.config.dictConfig(log_theme.LOGGING)
+        _logger = logging.getLogger(LOGGER_NAME)
+    set_log_level(logging.DEBUG if log_theme.DEBUG else log_theme.LOGLEVEL)
+
+
+def set_log_level(level):
+    """
+        Switch the level of engine logging at runtime, for all scenes of the process
+    """
+    if not isinstance(level, int):
+        level = logging.getLevelName(level)
+    get_logger().setLevel(level)
+    CanLogging._log_level = level
+
+
+class LogMessage(object):
+    """
+        Message of CanLogging, formatted only when a handler writes it.
+        Names of the pattern are taken from kwargs of the call, then from attributes of the object
+    """
+    __slots__ = ('obj', 'pattern', 'args', 'kwargs', '_text')
+
+    def __init__(self, obj, pattern, args, kwargs):
+        self.obj = obj
+        self.pattern = pattern
+        self.args = args
+        self.kwargs = kwargs
+        self._text = None
+
+    def __getitem__(self, name):
+        try:
+            return self.kwargs[name]
+        except KeyError:
+            pass
+        if name == 'cls':
+            return self.obj.__class__.__name__
+        try:
+            return getattr(self.obj, name)
+        except AttributeError:
+            raise KeyError(name)
+
+    def __str__(self):
+        if self._text is None:
+            # обработчиков может быть несколько - форматируем один раз
+            obj = self.obj
+            obj_id = getattr(obj, 'id', None)
+            if obj_id is None:
+                prefix = '{}: '.format(obj.__class__.__name__)
+            else:
+                prefix = '{}:{}: '.format(obj.__class__.__name__, obj_id)
+            self._text = prefix + _formatter.vformat(self.pattern, self.args, self)
+        return self._text
+
+
 class CanLogging(object):
-    __logger = None
+    """
+        Logging of engine classes. Disabled levels cost one comparison: the level is resolved once
+        and switched by set_log_level, messages are formatted only when they are written
+    """
+    __slots__ = ()
+    _log_level = logging.NOTSET  # логгер еще не настроен - первый вызов его настроит, один на процесс
+    _tracing = False  # приемник у логгера трассировки процесса, см. tracing.start_tracing
+    trace_sink = None  # свой приемник трассировки, см. Scene.start_tracing
 
     @property
     def logger(self):
-        from .theme import theme
-        if self.__logger is None:
-            logging.config.dictConfig(theme.LOGGING)
-            self.__logger = logging.getLogger('robogame')
-            if theme.DEBUG:
-                self.__logger.setLevel('DEBUG')
-            else:
-                self.__logger.setLevel(theme.LOGLEVEL)
-        return self.__logger
+        return get_logger()
 
     def debug(self, pattern, *args, **kwargs):
-        if self.logger.level <= logging.DEBUG:
-            self._log(self.logger.debug, pattern, args, kwargs)
+        if self._log_level <= logging.DEBUG:
+            self._log(logging.DEBUG, pattern, args, kwargs)
 
     def info(self, pattern, *args, **kwargs):
-        if self.logger.level <= logging.INFO:
-            self._log(self.logger.info, pattern, args, kwargs)
+        if self._log_level <= logging.INFO:
+            self._log(logging.INFO, pattern, args, kwargs)
 
     def warning(self, pattern, *args, **kwargs):
-        if self.logger.level <= logging.WARNING:
-            self._log(self.logger.warning, pattern, args, kwargs)
+        if self._log_level <= logging.WARNING:
+            self._log(logging.WARNING, pattern, args, kwargs)
 
     def error(self, pattern, *args, **kwargs):
-        if self.logger.level <= logging.ERROR:
-            self._log(self.logger.error, pattern, args, kwargs)
-
-    def _log(self, log_fun, pattern, args, kwargs):
-        kwargs['cls'] = self.__class__.__name__
-        kwargs.update(self.__dict__)
-        if 'id' in kwargs:
-            pattern = '{cls}:{id}: ' + pattern
+        if self._log_level <= logging.ERROR:
+            self._log(logging.ERROR, pattern, args, kwargs)
+
+    def _log(self, level, pattern, args, kwargs):
+        logger = get_logger()
+        # уровень мог стать известен только сейчас, при настройке
+        if self._log_level <= level:
+            logger.log(level, LogMessage(self, pattern, args, kwargs))
+
+    def trace(self, event, **fields):
+        """
+            Structured record for the own trace sink, or for the trace logger of the process.
+            On hot paths check trace_sink and _tracing before computing fields
+        """
+        sink = self.trace_sink
+        if sink is None and not self._tracing:
+            return
+        fields['cls'] = self.__class__.__name__
+        obj_id = getattr(self, 'id', None)
+        if obj_id is not None:
+            fields['id'] = obj_id
+        if sink is None:
+            _trace_logger.debug(event, extra={'fields': fields})
         else:
-            pattern = '{cls}: ' + pattern
-        log_fun(pattern.format(*args, **kwargs))
+            sink.handle(_trace_logger.makeRecord(
+                TRACE_LOGGER_NAME, logging.DEBUG, '', 0, event, (), None, extra={'fields': fields}))
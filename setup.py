@@ -31,4 +31,7 @@ setuptools.setup(
         'Programming Language :: Python :: 3.8',
     ],
     install_requires=install_requires,
+    extras_require={
+        'numpy': ['numpy'],
+    },
 )
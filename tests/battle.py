@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+    Shared battle of tanks shooting bullets for replay and snapshot tests
+"""
+from robogame_engine.constants import KINEMATICS_NUMPY
+from robogame_engine.geometry import Point
+from robogame_engine.objects import GameObject
+from robogame_engine.scene import Scene
+
+
+class Bullet(GameObject):
+    radius = 3
+    snapshot_fields = ('lifetime', )
+
+    def __init__(self, owner, **kwargs):
+        self.owner = owner
+        self.lifetime = 10
+        super(Bullet, self).__init__(coord=owner.coord.copy(), **kwargs)
+
+    def on_born(self):
+        self.move_at(self.scene.random_field_point(), speed=4)
+
+    def game_step(self):
+        super(Bullet, self).game_step()
+        self.lifetime -= 1
+        if not self.lifetime:
+            self.scene.remove_object(self)
+
+
+class Tank(GameObject):
+    radius = 15
+
+    def on_born(self):
+        self.move_at(self.scene.random_field_point())
+
+    def on_stop_at_target(self, target):
+        self.turn_to(self.scene.random.randint(0, 359))
+
+    def on_stop(self):
+        self.move_at(self.scene.random_field_point())
+
+    def on_collide_with(self, obj_status):
+        self.move_at(obj_status)
+
+    def on_heartbeat(self):
+        Bullet(owner=self)
+
+
+class BattleScene(Scene):
+
+    def random_field_point(self):
+        return Point(self.random.uniform(0, self.theme.FIELD_WIDTH), self.random.uniform(0, self.theme.FIELD_HEIGHT))
+
+
+class NumpyBattleScene(BattleScene):
+    kinematics = KINEMATICS_NUMPY
+
+
+def play(steps, random_seed=1, scene_class=BattleScene):
+    scene = scene_class(field=(300, 300), theme_mod_path='tests.default_theme', random_seed=random_seed)
+    tanks = [Tank(coord=scene.random_field_point()) for _ in range(10)]
+    scene.start_recording()
+    for _ in range(steps):
+        scene.game_step()
+    return scene, tanks
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+import random
+import unittest
+from unittest import mock
+
+from robogame_engine.collisions import BruteForceBroadphase, numpy
+from robogame_engine.commands import MoveCommand
+from robogame_engine.constants import (BROADPHASE_SPATIAL_HASH, BROADPHASE_SWEEP_AND_PRUNE, BROADPHASE_NUMPY,
+                                       RESOLVER_ITERATIVE)
+from robogame_engine.geometry import Point
+from robogame_engine.objects import GameObject
+from robogame_engine.scene import Scene
+
+
+class Bullet(GameObject):
+    radius = 2
+    owner = None
+
+
+class TestBroadphase(unittest.TestCase):
+    broadphase = BROADPHASE_SPATIAL_HASH
+
+    def setUp(self):
+        scene_class = type('BroadphaseScene', (Scene, ), dict(broadphase=self.broadphase))
+        self.scene = scene_class(field=(400, 300), theme_mod_path='tests.default_theme')
+        self.rnd = random.Random(42)
+        for _ in range(150):
+            self.make_object(x_range=(-10, 410), y_range=(-10, 310))
+        for owner in list(self.scene.objects[:20]):
+            bullet = Bullet(coord=Point(owner.x, owner.y))
+            bullet.owner = owner
+
+    def make_object(self, x_range=(0, 400), y_range=(0, 300)):
+        return GameObject(coord=Point(self.rnd.randint(*x_range), self.rnd.randint(*y_range)),
+                          radius=self.rnd.randint(3, 20))
+
+    def assertSameOverlapMap(self):
+        expected = BruteForceBroadphase(scene=self.scene).get_overlap_map(self.scene.objects)
+        overlap_map = self.scene._broadphase.get_overlap_map(self.scene.objects)
+        self.assertTrue(expected)
+        self.assertEqual(dict(overlap_map), dict(expected))
+
+    def test_same_overlap_map(self):
+        self.assertSameOverlapMap()
+
+    def test_moving_objects(self):
+        for _ in range(10):
+            for obj in self.scene.objects:
+                obj.coord.x += self.rnd.randint(-5, 5)
+                obj.coord.y += self.rnd.randint(-5, 5)
+            self.scene.remove_object(self.rnd.choice(self.scene.objects))
+            self.make_object()
+            self.assertSameOverlapMap()
+
+
+class TestSweepAndPrune(TestBroadphase):
+    broadphase = BROADPHASE_SWEEP_AND_PRUNE
+
+    def test_removed_endpoints_dropped(self):
+        self.scene._broadphase.get_overlap_map(self.scene.objects)
+        for obj in list(self.scene.objects)[::3]:
+            self.scene.remove_object(obj)
+        self.assertSameOverlapMap()
+        for axis in self.scene._broadphase._axes:
+            self.assertEqual(len(axis), 2 * len(self.scene.objects))
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class TestNumpy(TestBroadphase):
+    broadphase = BROADPHASE_NUMPY
+
+
+class FastBullet(GameObject):
+    radius = 2
+    continuous_collisions = True
+
+
+class Teleported(GameObject):
+    teleported = False
+
+    def game_step(self):
+        super(Teleported, self).game_step()
+        if not self.teleported:
+            self.teleported = True
+            self.coord = Point(500, 300)
+
+
+class TestContinuousCollisions(unittest.TestCase):
+
+    def setUp(self):
+        self.scene = Scene(field=(400, 300), theme_mod_path='tests.default_theme')
+
+    def test_bullet_does_not_tunnel(self):
+        far = GameObject(coord=Point(200, 100), radius=10)
+        near = GameObject(coord=Point(100, 100), radius=10)
+        bullet = FastBullet(coord=Point(50, 100))
+        hits = []
+        bullet.on_collide_with = hits.append
+        # move_at ограничивает скорость до MAX_SPEED
+        bullet.add_command(MoveCommand(obj=bullet, target=Point(350, 100), speed=250))
+        for _ in range(3):
+            self.scene.game_step()
+        self.assertEqual(hits, [near, far])
+
+    def test_far_objects_not_checked(self):
+        for col in range(10):
+            GameObject(coord=Point(20 + col * 40, 250), radius=10)
+        target = GameObject(coord=Point(100, 100), radius=10)
+        bullet = FastBullet(coord=Point(50, 100))
+        bullet.add_command(MoveCommand(obj=bullet, target=Point(350, 100), speed=250))
+        checked = []
+        get_swept_candidates = self.scene._get_swept_candidates
+
+        def spy(*args):
+            candidates = get_swept_candidates(*args)
+            checked.extend(candidates)
+            return candidates
+
+        with mock.patch.object(self.scene, '_get_swept_candidates', side_effect=spy):
+            for _ in range(2):
+                self.scene.game_step()
+        self.assertIn(target, checked)
+        self.assertFalse([obj for obj in checked if obj.y == 250])
+
+    def test_bullets_crossed(self):
+        scene_class = type('BroadphaseScene', (Scene, ), dict(broadphase=BROADPHASE_SPATIAL_HASH))
+        self.scene = scene_class(field=(400, 300), theme_mod_path='tests.default_theme')
+        for col in range(40):
+            GameObject(coord=Point(col * 10, 250), radius=10)
+        left = FastBullet(coord=Point(100, 100))
+        right = FastBullet(coord=Point(400, 100))
+        hits = []
+        right.on_collide_with = hits.append
+        left.add_command(MoveCommand(obj=left, target=Point(350, 100), speed=250))
+        right.add_command(MoveCommand(obj=right, target=Point(50, 100), speed=250))
+        for _ in range(2):
+            self.scene.game_step()
+        # левая пуля уже пролетела вперед, правая находит ее не по сетке начала шага
+        self.assertEqual(hits, [left])
+
+    def test_teleported_object_hit(self):
+        scene_class = type('BroadphaseScene', (Scene, ), dict(broadphase=BROADPHASE_SPATIAL_HASH))
+        self.scene = scene_class(field=(800, 600), theme_mod_path='tests.default_theme')
+        for col in range(40):
+            GameObject(coord=Point(col * 20, 550), radius=10)
+        teleported = Teleported(coord=Point(100, 100), radius=10)
+        bullet = FastBullet(coord=Point(305, 300))
+        hits = []
+        bullet.on_collide_with = hits.append
+        bullet.add_command(MoveCommand(obj=bullet, target=Point(705, 300), speed=400))
+        for _ in range(2):
+            self.scene.game_step()
+        self.assertEqual(hits, [teleported])
+
+    def test_discrete_objects_tunnel(self):
+        GameObject(coord=Point(100, 100), radius=10)
+        bullet = GameObject(coord=Point(50, 100), radius=2)
+        bullet.on_collide_with = mock.MagicMock()
+        # move_at ограничивает скорость до MAX_SPEED
+        bullet.add_command(MoveCommand(obj=bullet, target=Point(350, 100), speed=250))
+        for _ in range(3):
+            self.scene.game_step()
+        self.assertEqual(bullet.on_collide_with.call_count, 0)
+
+
+class TestIterativeResolver(unittest.TestCase):
+
+    def setUp(self):
+        scene_class = type('IterativeScene', (Scene, ), dict(collision_resolver=RESOLVER_ITERATIVE))
+        self.scene = scene_class(field=(400, 300), theme_mod_path='tests.default_theme')
+
+    def test_dense_formation_settles(self):
+        for row in range(5):
+            for col in range(6):
+                GameObject(coord=Point(150 + col * 12, 100 + row * 12), radius=10)
+        for _ in range(10):
+            self.scene.game_step()
+        broadphase = BruteForceBroadphase(scene=self.scene)
+        self.assertFalse(broadphase.get_overlap_map(self.scene.objects))
+
+    def test_collided_events(self):
+        left = GameObject(coord=Point(100, 100), radius=10)
+        right = GameObject(coord=Point(110, 100), radius=10)
+        left.on_collide_with = mock.MagicMock()
+        for _ in range(2):
+            self.scene.game_step()
+        left.on_collide_with.assert_called_once_with(right)
+        self.assertEqual(right.x - left.x, 20)
+
+    def test_owner_not_pushed(self):
+        tank = GameObject(coord=Point(100, 100), radius=10)
+        bullet = Bullet(coord=Point(100, 110), radius=8)
+        bullet.owner = tank
+        GameObject(coord=Point(100, 121), radius=5)
+        GameObject(coord=Point(87, 100), radius=5)
+        self.scene.game_step()
+        # танк расталкивается только по горизонтали - свой снаряд его не двигает
+        self.assertEqual(tank.y, 100)
+        self.assertGreater(tank.x, 100)
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import unittest
+from unittest import mock
+
+from robogame_engine.events import GameEvent, EventCollide, EventStopped
+from robogame_engine.geometry import Point
+from robogame_engine.objects import GameObject
+from robogame_engine.scene import Scene
+
+
+class EventPing(GameEvent):
+
+    def handle(self, obj):
+        obj.pings += 1
+
+
+class EventLoggedCollide(EventCollide):
+
+    def handle(self, obj):
+        obj.collided.append('logged')
+        super(EventLoggedCollide, self).handle(obj)
+
+
+class Listener(GameObject):
+    pings = 0
+
+    def __init__(self, **kwargs):
+        super(Listener, self).__init__(**kwargs)
+        self.collided = []
+
+    def on_collide_with(self, obj_status):
+        self.collided.append(obj_status)
+
+
+class TestEventsDispatch(unittest.TestCase):
+
+    def setUp(self):
+        self.scene = Scene(field=(100, 100), theme_mod_path='tests.default_theme')
+        self.obj = Listener(coord=Point(10, 10))
+        self.obj.proceed_events()
+
+    def test_handlers(self):
+        other = GameObject(coord=Point(50, 50))
+        self.obj.add_event(EventCollide(other))
+        self.obj.add_event(EventPing())
+        self.obj.add_event(EventCollide(self.obj))
+        self.obj.proceed_events()
+        self.assertEqual(self.obj.collided, [other, self.obj])
+        self.assertEqual(self.obj.pings, 1)
+
+    def test_instance_handler(self):
+        self.obj.on_stop = mock.MagicMock()
+        self.obj.add_event(EventStopped())
+        self.obj.proceed_events()
+        self.assertEqual(self.obj.on_stop.call_count, 1)
+
+    def test_handler_exception(self):
+        self.obj.on_collide_with = mock.MagicMock(side_effect=ValueError)
+        self.obj.add_event(EventCollide(self.obj))
+        self.obj.add_event(EventPing())
+        self.obj.proceed_events()
+        self.assertEqual(self.obj.pings, 1)
+
+    def test_overridden_handle(self):
+        self.obj.add_event(EventLoggedCollide(self.obj))
+        self.obj.proceed_events()
+        self.assertEqual(self.obj.collided, ['logged', self.obj])
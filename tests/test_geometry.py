@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import math
+import random
+import unittest
+
+from robogame_engine.geometry import Point, Vector, TrigTables, get_trig_tables
+from robogame_engine.objects import GameObject
+from robogame_engine.scene import Scene
+
+
+class TestTrigTables(unittest.TestCase):
+
+    def test_lookup_bounds(self):
+        rnd = random.Random(1)
+        for steps_per_degree in (1, 10, 60):
+            tables = TrigTables(steps_per_degree=steps_per_degree)
+            max_error = math.pi / 360 / steps_per_degree
+            for _ in range(1000):
+                direction = rnd.uniform(-720, 720)
+                module = rnd.uniform(0.1, 100)
+                rounded, cos, sin = tables.lookup(direction)
+                exact = Vector.from_direction(direction, module)
+                self.assertLessEqual(abs(cos * module - exact.x), module * max_error + 1e-12)
+                self.assertLessEqual(abs(sin * module - exact.y), module * max_error + 1e-12)
+                self.assertAlmostEqual(rounded, Vector(cos, sin)._get_direction(), places=9)
+
+    def test_exact_on_grid(self):
+        tables = TrigTables(steps_per_degree=10)
+        for direction in range(0, 360):
+            fast = Vector.from_direction(direction, 3, tables=tables)
+            exact = Vector.from_direction(direction, 3)
+            self.assertEqual((fast.x, fast.y), (exact.x, exact.y))
+            self.assertEqual(fast.direction, direction)
+
+    def test_fractional_exact(self):
+        tables = TrigTables(steps_per_degree=10)
+        for direction in (0.25, 45.5, -30, 400, 359.99):
+            fast = Vector.from_direction(direction, 3, tables=tables)
+            exact = Vector.from_direction(direction, 3)
+            self.assertEqual((fast.x, fast.y), (exact.x, exact.y))
+
+    def test_rotation_bounds(self):
+        tables = get_trig_tables(10)
+        vector = Vector.from_direction(13, 5)
+        vector.direction
+        rotations = 36000
+        for _ in range(rotations):
+            vector.rotate(7, tables=tables)
+        self.assertAlmostEqual(vector.direction, (13 + 7 * rotations) % 360, places=9)
+        self.assertLess(abs(vector.direction - vector._get_direction()), rotations * 1e-13)
+        self.assertLess(abs(vector._get_module() / 5 - 1), rotations * 4e-16)
+
+    def test_rotation_cache(self):
+        tables = TrigTables()
+        tables.max_rotations = 2
+        vector = Vector(1, 0)
+        for delta in (1, 2, 3, 1):
+            vector.rotate(delta, tables=tables)
+        self.assertLessEqual(len(tables._rotations), 2)
+        self.assertAlmostEqual(vector._get_direction(), 7)
+        self.assertIsNone(vector._direction)
+
+
+class FastMathScene(Scene):
+    check_collisions = False
+
+    def __init__(self, fast_math):
+        super(FastMathScene, self).__init__(
+            field=(400, 400), theme_mod_path='tests.default_theme', headless=True, random_seed=3)
+        if fast_math:
+            self.trig_tables = get_trig_tables(10)
+
+
+class TestFastMath(unittest.TestCase):
+
+    def play(self, fast_math):
+        scene = FastMathScene(fast_math=fast_math)
+        objects = [GameObject(coord=Point(50 + i * 30, 200), direction=i * 31) for i in range(10)]
+        for i, obj in enumerate(objects):
+            obj.turn_to(obj.direction + 100 + i * 17)
+        scene.run(steps=40)
+        return [(obj.state.__class__.__name__, obj.direction) for obj in objects]
+
+    def test_same_turns(self):
+        exact, fast = self.play(fast_math=False), self.play(fast_math=True)
+        for (exact_state, exact_direction), (fast_state, fast_direction) in zip(exact, fast):
+            self.assertEqual(exact_state, fast_state)
+            self.assertAlmostEqual(exact_direction, fast_direction, places=6)
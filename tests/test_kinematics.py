@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from robogame_engine.constants import KINEMATICS_NUMPY, ROTATE_TURNING
+from robogame_engine.geometry import Point, Vector, get_trig_tables
+from robogame_engine.kinematics import PointView, VectorView
+from robogame_engine.objects import GameObject
+from robogame_engine.scene import Scene
+from robogame_engine.states import StateStopped
+
+
+class Runner(GameObject):
+    snapshot_fields = ('stops', 'arrivals')
+
+    def __init__(self, **kwargs):
+        self.stops = 0
+        self.arrivals = 0
+        super(Runner, self).__init__(**kwargs)
+
+    def on_born(self):
+        self.move_at(self.scene.random_point())
+
+    def on_stop_at_target(self, target):
+        self.arrivals += 1
+        self.move_at(self.scene.random_point())
+
+    def on_stop(self):
+        self.stops += 1
+        self.move_at(self.scene.random_point())
+
+
+class Spinner(Runner):
+    rotate_mode = ROTATE_TURNING
+
+
+class Follower(Runner):
+
+    def on_born(self):
+        self.move_at(self.scene.leader)
+
+    def on_stop_at_target(self, target):
+        self.arrivals += 1
+        self.move_at(self.scene.leader)
+
+
+class Stepper(Runner):
+    """
+        Own game_step - stepped one by one
+    """
+    steps = 0
+
+    def game_step(self):
+        self.steps += 1
+        super(Stepper, self).game_step()
+
+
+class RunnersScene(Scene):
+    check_collisions = False
+
+    def __init__(self, classes=(Runner, Spinner, Follower, Stepper), **kwargs):
+        super(RunnersScene, self).__init__(
+            field=(400, 300), theme_mod_path='tests.default_theme', headless=True, random_seed=7, **kwargs)
+        self.leader = Runner(coord=Point(200, 150))
+        for i in range(30):
+            cls = classes[i % len(classes)]
+            cls(coord=Point(20 + i * 12, 20 + i * 8), direction=i * 37)
+
+    def random_point(self):
+        # за пределы поля - проверка выхода за границы тоже работает
+        return Point(self.random.uniform(-50, 450), self.random.uniform(-50, 350))
+
+
+class NumpyRunnersScene(RunnersScene):
+    kinematics = KINEMATICS_NUMPY
+
+
+def get_states(scene):
+    return [(obj.id, obj.__class__.__name__, obj.state.__class__.__name__, obj.x, obj.y, obj.direction,
+             obj.stops, obj.arrivals) for obj in scene.objects]
+
+
+class TestKinematics(unittest.TestCase):
+
+    def assert_same_states(self, left, right):
+        self.assertEqual(len(left), len(right))
+        for left_state, right_state in zip(left, right):
+            self.assertEqual(left_state[:3], right_state[:3])
+            for left_value, right_value in zip(left_state[3:], right_state[3:]):
+                self.assertAlmostEqual(left_value, right_value, places=6)
+
+    def test_same_game(self):
+        classes = (Runner, Spinner, Stepper)
+        objects_scene = RunnersScene(classes=classes)
+        objects_scene.run(steps=300)
+        numpy_scene = NumpyRunnersScene(classes=classes)
+        numpy_scene.run(steps=300)
+        self.assert_same_states(get_states(objects_scene), get_states(numpy_scene))
+        runners = list(numpy_scene.objects)
+        self.assertTrue(all(obj.arrivals for obj in runners))
+        self.assertTrue(any(obj.stops for obj in runners))
+        self.assertTrue(all(obj.steps == 300 for obj in runners if isinstance(obj, Stepper)))
+
+    def test_same_game_collisions(self):
+        classes = (Runner, Spinner, Stepper)
+        states = []
+        for scene_class in (RunnersScene, NumpyRunnersScene):
+            scene = type('Colliding' + scene_class.__name__, (scene_class, ), dict(check_collisions=True))
+            scene = scene(classes=classes)
+            scene.run(steps=300)
+            states.append(get_states(scene))
+        self.assert_same_states(*states)
+
+    def test_same_game_fast_math(self):
+        states = []
+        for scene_class in (RunnersScene, NumpyRunnersScene):
+            scene = scene_class(classes=(Spinner, ))
+            scene.trig_tables = get_trig_tables(10)
+            scene.run(steps=200)
+            states.append(get_states(scene))
+        self.assert_same_states(*states)
+
+    def test_follow(self):
+        # все объекты двигаются после команд всех - преследователь видит цель на начало шага
+        scene = NumpyRunnersScene(classes=(Follower, ))
+        scene.run(steps=300)
+        followers = [obj for obj in scene.objects if isinstance(obj, Follower)]
+        self.assertGreater(sum(obj.arrivals for obj in followers), len(followers))
+
+    def test_views(self):
+        scene = NumpyRunnersScene()
+        obj = scene.leader
+        self.assertIsInstance(obj.coord, PointView)
+        self.assertIsInstance(obj.vector, VectorView)
+        index = obj.coord._index
+        obj.coord.x = 123.5
+        self.assertEqual(scene._kinematics.x[index], 123.5)
+        self.assertEqual(obj.x, 123.5)
+        obj.vector = Vector.from_direction(90, module=3)
+        self.assertIsInstance(obj.vector, VectorView)
+        self.assertAlmostEqual(scene._kinematics.vy[index], 3)
+        self.assertEqual(obj.direction, 90)
+
+    def test_removed(self):
+        scene = NumpyRunnersScene()
+        scene.run(steps=10)
+        leader = scene.leader
+        coord = leader.coord
+        x, y = leader.x, leader.y
+        scene.remove_object(leader)
+        newcomer = Runner(coord=Point(10, 10), scene=scene)
+        self.assertEqual((coord.x, coord.y), (x, y))
+        self.assertIsNot(coord._arrays, scene._kinematics)
+        self.assertIs(newcomer.coord._arrays, scene._kinematics)
+        scene.run(steps=20)
+        self.assertEqual((coord.x, coord.y), (x, y))
+        # преследователи едут в последнюю точку лидера
+        for obj in scene.objects:
+            if isinstance(obj, Follower) and obj.arrivals == 0:
+                self.assertEqual(obj.state.target_point, coord)
+
+    def test_fork(self):
+        scene = NumpyRunnersScene()
+        scene.run(steps=20)
+        before = get_states(scene)
+        with scene.fork():
+            scene.run(steps=50)
+            Runner(coord=Point(100, 100))
+            scene.remove_object(scene.leader)
+            scene.run(steps=10)
+        self.assertEqual(get_states(scene), before)
+        scene.run(steps=30)
+        other = NumpyRunnersScene()
+        other.run(steps=50)
+        self.assertEqual(get_states(scene), get_states(other))
+
+    def test_radius_changed(self):
+        states = []
+        for scene_class in (RunnersScene, NumpyRunnersScene):
+            scene = scene_class(classes=(Runner, ))
+            scene.run(steps=20)
+            for obj in scene.objects:
+                obj.radius *= 3
+            scene.run(steps=100)
+            states.append(get_states(scene))
+        self.assert_same_states(*states)
+
+    def test_stop_event(self):
+        scene = NumpyRunnersScene()
+        obj = GameObject(coord=Point(100, 100))
+        obj.turn_to(obj.direction + 45)
+        scene.run(steps=20)
+        self.assertIsInstance(obj.state, StateStopped)
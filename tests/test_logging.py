@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import os
+import tempfile
+import unittest
+
+from robogame_engine.geometry import Point
+from robogame_engine.objects import GameObject
+from robogame_engine.scene import Scene
+from robogame_engine.utils import CanLogging, get_logger, set_log_level
+
+
+class Expensive(object):
+    formatted = 0
+
+    def __format__(self, format_spec):
+        Expensive.formatted += 1
+        return 'expensive'
+
+
+class Logged(CanLogging):
+    __slots__ = ('id', 'name')
+
+    def __init__(self):
+        self.id = 7
+        self.name = 'logged'
+
+
+class ListHandler(logging.Handler):
+
+    def __init__(self):
+        super(ListHandler, self).__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class TracedScene(Scene):
+    check_collisions = False
+
+    def __init__(self, trace_path):
+        super(TracedScene, self).__init__(
+            field=(400, 300), theme_mod_path='tests.default_theme', headless=True, random_seed=5)
+        self.trace_path = trace_path
+        for i in range(3):
+            GameObject(coord=Point(50 + i * 100, 100))
+
+    def get_game_result(self):
+        return self._step >= 4, {}
+
+
+class TestLogging(unittest.TestCase):
+
+    def setUp(self):
+        self.handler = ListHandler()
+        get_logger().addHandler(self.handler)
+        self.level = CanLogging._log_level
+
+    def tearDown(self):
+        get_logger().removeHandler(self.handler)
+        set_log_level(self.level)
+
+    def test_lazy(self):
+        obj = Logged()
+        set_log_level(logging.WARNING)
+        Expensive.formatted = 0
+        obj.debug('value {}', Expensive())
+        obj.info('value {value}', value=Expensive())
+        self.assertEqual(Expensive.formatted, 0)
+        self.assertEqual(self.handler.messages, [])
+        obj.warning('value {} of {name}', Expensive())
+        self.assertEqual(Expensive.formatted, 1)
+        self.assertEqual(self.handler.messages, ['Logged:7: value expensive of logged'])
+
+    def test_switch_level(self):
+        obj = Logged()
+        set_log_level('ERROR')
+        obj.warning('hidden')
+        set_log_level('DEBUG')
+        obj.debug('shown {name}', name='by kwargs')
+        self.assertEqual(get_logger().level, logging.DEBUG)
+        self.assertEqual(self.handler.messages, ['Logged:7: shown by kwargs'])
+
+    def test_headless_stats(self):
+        scene = TracedScene(trace_path=None)
+        set_log_level('INFO')
+        scene.go()
+        self.assertTrue(self.handler.messages[-1].endswith(': 4 steps, 0 frames'), self.handler.messages[-1])
+
+    def test_trace_sink(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'trace.jsonl')
+            scene = TracedScene(trace_path=path)
+            scene.go()
+            self.assertIsNone(scene.trace_sink)
+            self.assertFalse(CanLogging._tracing)
+            with open(path) as trace_file:
+                records = [json.loads(line) for line in trace_file]
+        steps = [record for record in records if record['message'] == 'step']
+        objects = [record for record in records if record['message'] == 'object']
+        self.assertEqual([record['step'] for record in steps], [1, 2, 3, 4])
+        self.assertEqual(len(objects), 3 * 4)
+        self.assertEqual(objects[0]['obj'], 'GameObject')
+        self.assertEqual((objects[0]['x'], objects[0]['y']), (50, 100))
+        self.assertEqual(objects[0]['state'], 'StateStopped')
+
+    def test_run_traces(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'trace.jsonl')
+            scene = TracedScene(trace_path=path)
+            scene.run(steps=3)
+            self.assertIsNone(scene.trace_sink)
+            with open(path) as trace_file:
+                steps = [record['step'] for record in map(json.loads, trace_file) if record['message'] == 'step']
+        self.assertEqual(steps, [1, 2, 3])
+
+    def test_scene_traces(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'trace.jsonl')
+            traced, other = TracedScene(trace_path=None), TracedScene(trace_path=None)
+            traced.start_tracing(path)
+            for _ in range(3):
+                traced.game_step()
+                other.game_step()
+                list(other.objects)[0].trace('custom')
+            sink = traced.stop_tracing()
+            self.assertEqual(sink.records, 3 * 4)
@@ -4,7 +4,8 @@ from unittest import mock
 
 from robogame_engine.scene import Scene
 from robogame_engine.objects import GameObject
-from robogame_engine.geometry import Point
+from robogame_engine.geometry import Point, Vector
+from robogame_engine.states import ObjectState, StateStopped
 
 
 class TestMoving(unittest.TestCase):
@@ -38,3 +39,44 @@ class TestMoving(unittest.TestCase):
         # 5 - 3 - 3 (выход за границы) + 2 (отталкивание) и стоп
         self.assertEqual(obj.x, 3)
 
+
+class TestAllocations(unittest.TestCase):
+
+    def setUp(self):
+        self.scene = Scene(field=(1000, 1000), theme_mod_path='tests.default_theme')
+
+    def _count_created(self, steps):
+        created = []
+        for cls in (Point, Vector, ObjectState):
+            init = cls.__init__
+
+            def counted(obj, *args, _init=init, **kwargs):
+                created.append(obj)
+                _init(obj, *args, **kwargs)
+
+            patcher = mock.patch.object(cls, '__init__', counted)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        for _ in range(steps):
+            self.scene.game_step()
+        return created
+
+    def test_steady_moving(self):
+        objects = [GameObject(coord=Point(x=100 + i * 50, y=100), direction=90) for i in range(10)]
+        for obj in objects:
+            obj.move_at(target=Point(x=obj.x, y=900), speed=2)
+        self.scene.game_step()
+        self.assertEqual(self._count_created(steps=50), [])
+        self.assertTrue(all(obj.y == 202 for obj in objects))
+
+    def test_states_reused(self):
+        obj = GameObject(coord=Point(x=100, y=100))
+        obj.move_at(target=Point(x=100, y=110), speed=2)
+        self.scene.game_step()
+        moving = obj.state
+        self.scene.run(steps=10)
+        self.assertIsInstance(obj.state, StateStopped)
+        obj.move_at(target=Point(x=100, y=120), speed=2)
+        self.scene.game_step()
+        self.assertIs(obj.state, moving)
+        self.assertEqual(obj.state.target_point.y, 120)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from robogame_engine.constants import STATE_PROTOCOL_BINARY
+from robogame_engine.geometry import Point
+from robogame_engine.objects import GameObject
+from robogame_engine.protocol import StateEncoder, StateDecoder, HEADER, FRAME_KEY
+from robogame_engine.scene import Scene
+
+
+class Marked(GameObject):
+    label = 'метка'
+    big = 1 << 40
+    counter = 0
+
+    def __init__(self, **kwargs):
+        self.extra = {'a': 1}
+        super(Marked, self).__init__(**kwargs)
+
+    def on_born(self):
+        self.schedule(3, self.relabel, repeat=True)
+
+    def relabel(self):
+        self.counter += 1
+        self.label = 'метка {}'.format(self.counter)
+        if self.counter % 2:
+            # словарь меняется на месте
+            self.extra['counter'] = self.counter
+
+
+class ProtocolScene(Scene):
+    check_collisions = False
+    state_protocol = STATE_PROTOCOL_BINARY
+
+    def __init__(self):
+        super(ProtocolScene, self).__init__(
+            field=(400, 300), theme_mod_path='tests.default_theme', headless=True, random_seed=11)
+        for i in range(10):
+            obj = GameObject(coord=Point(20 + i * 30, 150))
+            if i % 2:
+                obj.move_at(Point(380 - i * 30, 20))
+        Marked(coord=Point(200, 200))
+
+
+def as_dicts(statuses):
+    return dict((obj_id, vars(status)) for obj_id, status in statuses.items())
+
+
+class TestProtocol(unittest.TestCase):
+
+    def test_same_statuses(self):
+        scene = ProtocolScene()
+        decoder = StateDecoder()
+        for step in range(60):
+            scene.game_step()
+            if step == 10:
+                scene.remove_object(list(scene.objects)[0])
+            if step == 20:
+                Marked(coord=Point(100, 100))
+            decoded = decoder.decode(scene.get_objects_state())
+            self.assertEqual(as_dicts(decoded), as_dicts(scene.get_objects_status()))
+        marked = [status for status in decoded.values() if status.class_name == 'Marked']
+        self.assertEqual([status.big for status in marked], [1 << 40] * 2)
+        self.assertEqual(marked[0].label, 'метка {}'.format(marked[0].counter))
+        self.assertGreater(marked[0].counter, 10)
+        self.assertEqual(marked[0].extra, {'a': 1, 'counter': (marked[0].counter - 1) // 2 * 2 + 1})
+        stats = scene.state_encoder.metrics.stats()
+        self.assertEqual(stats['frames'], 60)
+        self.assertEqual(stats['keyframes'], 2)
+        self.assertLess(stats['bytes_per_frame'], stats['max_bytes'])
+        self.assertEqual(decoder.metrics.stats()['bytes'], stats['bytes'])
+
+    def test_deltas(self):
+        scene = ProtocolScene()
+        encoder = StateEncoder(keyframe_interval=0)
+        keyframe = encoder.encode(scene.objects)
+        unchanged = encoder.encode(scene.objects)
+        scene.game_step()
+        moved = encoder.encode(scene.objects)
+        self.assertEqual(HEADER.unpack_from(keyframe)[0], FRAME_KEY)
+        self.assertEqual(len(unchanged), HEADER.size)
+        self.assertLess(len(moved), len(keyframe) // 2)
+        self.assertEqual(encoder.metrics.keyframes, 1)
+
+    def test_lost_frame(self):
+        scene = ProtocolScene()
+        encoder = StateEncoder(keyframe_interval=4)
+        decoder = StateDecoder()
+        frames = []
+        for _ in range(7):
+            scene.game_step()
+            frames.append(encoder.encode(scene.objects))
+        self.assertIsNotNone(decoder.decode(frames[0]))
+        # второй кадр потерян - дельты пропускаются до ключевого
+        self.assertIsNone(decoder.decode(frames[2]))
+        decoded = decoder.decode(frames[3])
+        self.assertIsNotNone(decoded)
+        for frame in frames[4:]:
+            decoded = decoder.decode(frame)
+        self.assertEqual(as_dicts(decoded), as_dicts(scene.get_objects_status()))
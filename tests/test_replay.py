@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+import unittest
+
+from robogame_engine.constants import KINEMATICS_NUMPY
+from robogame_engine.geometry import Point
+from robogame_engine.replay import replay, ReplayMismatch
+from tests.battle import BattleScene, NumpyBattleScene, Tank, play
+
+
+class TestReplay(unittest.TestCase):
+
+    def test_same_seed_same_game(self):
+        first, _ = play(50)
+        second, _ = play(50)
+        self.assertEqual(first.stop_recording().getvalue(), second.stop_recording().getvalue())
+
+    def test_replay(self):
+        scene, _ = play(200)
+        Tank(coord=Point(20, 20))
+        log = scene.stop_recording().getvalue()
+        replayed = replay(log)
+        self.assertEqual(replayed.replay_step, 200)
+        self.assertEqual(sorted(obj.id for obj in replayed.objects), sorted(obj.id for obj in scene.objects))
+        self.assertTrue(any(obj.class_name == 'Bullet' for obj in replayed.objects))
+
+    def test_run_records(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            scene = BattleScene(field=(300, 300), theme_mod_path='tests.default_theme', random_seed=1)
+            scene.record_path = os.path.join(tmp_dir, 'game.log')
+            for _ in range(10):
+                Tank(coord=scene.random_field_point())
+            scene.run(steps=50)
+            self.assertIsNone(scene.recorder)
+            with open(scene.record_path, 'rb') as log_file:
+                log = log_file.read()
+        self.assertEqual(replay(log).replay_step, 50)
+
+    def test_replay_kinematics(self):
+        scene, _ = play(100, scene_class=NumpyBattleScene)
+        replayed = replay(scene.stop_recording().getvalue())
+        self.assertEqual(replayed.kinematics, KINEMATICS_NUMPY)
+        self.assertEqual(replayed.replay_step, 100)
+
+    def test_mismatch(self):
+        scene, tanks = play(20)
+        # пользовательский код двигает объект в обход команд
+        tanks[0].coord.x += 1
+        with self.assertRaises(ReplayMismatch):
+            replay(scene.stop_recording().getvalue())
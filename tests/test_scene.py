@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+import random
+import threading
+import unittest
+
+from robogame_engine.geometry import Point
+from robogame_engine.objects import GameObject
+from robogame_engine.scene import Scene
+
+
+class Counted(GameObject):
+    steps = 0
+
+    def game_step(self):
+        self.steps += 1
+        super(Counted, self).game_step()
+
+
+class Mine(Counted):
+
+    def on_born(self):
+        self.scene.remove_object(self)
+
+
+class TestObjectRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.scene = Scene(field=(100, 100), theme_mod_path='tests.default_theme')
+
+    def test_remove_during_step(self):
+        first = Counted(coord=Point(10, 10))
+        mine = Mine(coord=Point(50, 50))
+        last = Counted(coord=Point(90, 90))
+        self.scene.game_step()
+        self.assertEqual([obj.steps for obj in (first, mine, last)], [1, 1, 1])
+        self.assertEqual(list(self.scene.objects), [first, last])
+        self.assertNotIn(mine, self.scene.objects)
+
+    def test_remove_order(self):
+        objects = [GameObject(coord=Point(10 + i, 10)) for i in range(10)]
+        for obj in objects[::3]:
+            self.scene.remove_object(obj)
+        self.scene.game_step()
+        self.assertEqual(list(self.scene.objects), [obj for i, obj in enumerate(objects) if i % 3])
+        self.assertEqual(self.scene.objects.get(objects[1].id), objects[1])
+        self.assertIsNone(self.scene.objects.get(objects[0].id))
+
+    def test_index_with_holes(self):
+        objects = [GameObject(coord=Point(10 + i, 10)) for i in range(10)]
+        registry = self.scene.objects
+        registry.hold_removals()
+        registry.remove(objects[2])
+        registry.release_removals()
+        self.assertEqual([registry[i] for i in range(9)], objects[:2] + objects[3:])
+        added = GameObject(coord=Point(50, 50))
+        self.assertEqual(registry[-1], added)
+        registry.remove(objects[0])
+        self.assertEqual(registry[0], objects[1])
+        self.assertEqual(registry[1:3], [objects[3], objects[4]])
+
+    def test_objects_by_type(self):
+        counted = Counted(coord=Point(10, 10))
+        mine = Mine(coord=Point(20, 20))
+        other = GameObject(coord=Point(30, 30))
+        mines = self.scene.get_objects_by_type(cls=Mine, live=True)
+        self.assertEqual(self.scene.get_objects_by_type(cls=Counted), [counted, mine])
+        self.assertEqual(self.scene.get_objects_by_type(cls_name='Counted'), [counted])
+        self.assertEqual(self.scene.get_objects_by_type(cls=GameObject), [counted, mine, other])
+        self.assertEqual(list(mines), [mine])
+        self.scene.game_step()
+        self.assertEqual(list(mines), [])
+        self.assertEqual(self.scene.get_objects_by_type(cls=Counted), [counted])
+
+
+class TestSpatialQueries(unittest.TestCase):
+
+    def setUp(self):
+        self.scene = Scene(field=(300, 200), theme_mod_path='tests.default_theme')
+        rnd = random.Random(7)
+        for i in range(120):
+            obj_class = Counted if i % 3 else GameObject
+            obj_class(coord=Point(rnd.randint(-10, 310), rnd.randint(-10, 210)), radius=rnd.randint(2, 12))
+
+    def test_query_radius(self):
+        me = self.scene.objects[5]
+        expected = [obj for obj in self.scene.objects
+                    if obj is not me and isinstance(obj, Counted) and me.distance_to(obj) <= 50]
+        self.assertEqual(self.scene.query_radius(me, 50, cls=Counted), expected)
+        point = Point(150, 100)
+        expected = [obj for obj in self.scene.objects if obj.distance_to(point) <= 30]
+        self.assertEqual(self.scene.query_radius(point, 30), expected)
+
+    def test_nearest(self):
+        for point in (Point(0, 0), Point(150, 100), Point(400, -50), self.scene.objects[10]):
+            others = [obj for obj in self.scene.objects if obj is not point]
+            expected = sorted(others, key=lambda obj: obj.distance_to(point))[:5]
+            self.assertEqual(self.scene.nearest(point, k=5), expected)
+        self.assertEqual(self.scene.nearest(Point(0, 0), k=0), [])
+
+    def test_consistent_during_step(self):
+        obj = self.scene.objects[0]
+        neighbours = self.scene.nearest(obj, k=3)
+        for neighbour in neighbours:
+            neighbour.coord.x += 100
+        self.assertEqual(self.scene.nearest(obj, k=3), neighbours)
+        self.scene.game_step()
+        self.assertNotEqual(self.scene.nearest(obj, k=3), neighbours)
+
+    def test_created_after_query(self):
+        point = Point(150, 100)
+        self.scene.query_radius(point, 30)
+        created = GameObject(coord=Point(151, 100))
+        self.assertIn(created, self.scene.query_radius(point, 30))
+        self.assertEqual(self.scene.nearest(point), [created])
+
+    def test_removed_after_query(self):
+        point = Point(150, 100)
+        nearest = self.scene.nearest(point)[0]
+        self.scene.remove_object(nearest)
+        self.assertNotIn(nearest, self.scene.query_radius(point, 30))
+        self.assertNotIn(nearest, self.scene.nearest(point, k=3))
+
+    def test_created_during_step(self):
+        point = Point(150, 100)
+        found = []
+
+        def create():
+            # сетка шага уже построена
+            self.scene.query_radius(point, 30)
+            created = GameObject(coord=Point(151, 100))
+            found.append((created, self.scene.query_radius(point, 30), self.scene.nearest(point, k=2)))
+
+        self.scene.objects[0].on_born = create
+        self.scene.game_step()
+        created, in_radius, nearest = found[0]
+        self.assertIn(created, in_radius)
+        self.assertEqual(nearest[0], created)
+
+
+class Tank(GameObject):
+    auto_team = True
+
+
+class TestManyScenes(unittest.TestCase):
+
+    def test_independent_scenes(self):
+        small = Scene(field=(100, 100), theme_mod_path='tests.default_theme')
+        Tank(coord=Point(50, 50))
+        big = Scene(field=(1000, 1000), theme_mod_path='tests.default_theme')
+        tank = Tank(coord=Point(500, 500))
+        runaway = GameObject(coord=Point(500, 500), scene=small)
+        self.assertEqual([len(small.objects), len(big.objects)], [2, 1])
+        self.assertEqual([small.teams_count, big.teams_count], [1, 1])
+        self.assertEqual(tank.id, 1)
+        self.assertIs(runaway.scene, small)
+        small.game_step()
+        big.game_step()
+        # вытолкнуло за границу маленького поля, большое поле не влияет
+        self.assertLess(runaway.x, 100)
+        self.assertEqual(tank.x, 500)
+        self.assertEqual(small.theme.FIELD_WIDTH, 100)
+
+    def test_scenes_in_threads(self):
+        results = {}
+
+        def play(size):
+            scene = Scene(field=(size, size), theme_mod_path='tests.default_theme')
+            obj = GameObject(coord=Point(size // 2, 10))
+            obj.move_at(Point(size // 2, size * 2))
+            for _ in range(size):
+                scene.game_step()
+            results[size] = obj.y
+
+        threads = [threading.Thread(target=play, args=(size, )) for size in (100, 200, 300)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, {100: 89, 200: 189, 300: 289})
+
+
+class ProfiledScene(Scene):
+    profile = True
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_phases_by_class(self):
+        scene = ProfiledScene(field=(100, 100), theme_mod_path='tests.default_theme')
+        Counted(coord=Point(10, 10))
+        Tank(coord=Point(50, 50))
+        for _ in range(5):
+            scene.game_step()
+        profiler = scene.profiler
+        self.assertEqual(profiler.steps, 5)
+        self.assertEqual(list(profiler.class_timings), ['Counted', 'Tank'])
+        self.assertEqual(len(profiler.class_timings['Tank']['game_step']), 5)
+        percentiles = profiler.percentiles('overlap_map')
+        self.assertEqual(list(percentiles), ['p50', 'p90', 'p99', 'max'])
+        self.assertLessEqual(percentiles['p50'], percentiles['max'])
+        self.assertIn('Counted.game_step', profiler.report())
+
+    def test_disabled(self):
+        scene = Scene(field=(100, 100), theme_mod_path='tests.default_theme')
+        self.assertIsNone(scene.profiler)
+
+
+class RunScene(Scene):
+
+    def prepare(self, limit):
+        self.limit = limit
+        self.checks = 0
+        self.mover = Counted(coord=Point(10, 10))
+
+    def get_game_result(self):
+        self.checks += 1
+        return self._step >= self.limit, dict(steps=self._step)
+
+
+class TestRun(unittest.TestCase):
+
+    def setUp(self):
+        self.scene = RunScene(field=(100, 100), theme_mod_path='tests.default_theme', headless=True, limit=50)
+
+    def test_steps(self):
+        steps = []
+        self.scene.run(steps=20, callback=lambda scene: steps.append(scene._step), callback_every=5, result_every=0)
+        self.assertEqual(self.scene.mover.steps, 20)
+        self.assertEqual(steps, [5, 10, 15, 20])
+        self.assertEqual(self.scene.checks, 0)
+        # повторный запуск продолжает игру без prepare
+        self.scene.run(steps=5, result_every=0)
+        self.assertEqual(self.scene.mover.steps, 25)
+
+    def test_until_and_result(self):
+        self.scene.run(until=lambda scene: scene.mover.steps == 7)
+        self.assertEqual(self.scene._step, 7)
+        results = self.scene.run(result_every=10)
+        self.assertEqual(results, dict(steps=57))
+        self.assertEqual(self.scene.checks, 7 + 6)
+
+
+class Walker(GameObject):
+
+    def on_born(self):
+        self.move_at(Point(self.scene.random.randint(0, 300), self.scene.random.randint(0, 300)))
+
+    def on_stop_at_target(self, target):
+        self.on_born()
+
+
+class Rock(GameObject):
+    radius = 20
+    collisions = 0
+    processed = 0
+
+    def proceed_events(self):
+        self.processed += 1
+        super(Rock, self).proceed_events()
+
+    def on_collide_with(self, obj_status):
+        self.collisions += 1
+
+
+class ActiveScene(Scene):
+    track_activity = True
+
+
+class TestActivity(unittest.TestCase):
+
+    def play(self, scene_class):
+        scene = scene_class(field=(300, 300), theme_mod_path='tests.default_theme', random_seed=3)
+        for i in range(5):
+            Walker(coord=Point(30 + i * 50, 30))
+        rocks = [Rock(coord=Point(40 + i * 50, 150 + i % 2 * 60)) for i in range(6)]
+        scene.run(steps=300, result_every=0)
+        states = [(obj.id, obj.x, obj.y, obj.vector.x, obj.vector.y) for obj in scene.objects]
+        return states, [rock.collisions for rock in rocks], sum(rock.processed for rock in rocks)
+
+    def test_same_game(self):
+        states, collisions, processed = self.play(Scene)
+        active_states, active_collisions, active_processed = self.play(ActiveScene)
+        self.assertEqual(states, active_states)
+        self.assertEqual(collisions, active_collisions)
+        self.assertGreater(sum(collisions), 0)
+        self.assertEqual(processed, 6 * 300)
+        self.assertLess(active_processed, processed / 2)
+
+    def test_wake_by_event(self):
+        scene = ActiveScene(field=(300, 300), theme_mod_path='tests.default_theme')
+        rock = Rock(coord=Point(100, 100))
+        scene.run(steps=3, result_every=0)
+        self.assertTrue(rock._sleeping)
+        rock.move_at(Point(200, 100))
+        self.assertFalse(rock._sleeping)
+        scene.run(steps=40, result_every=0)
+        self.assertEqual((rock.x, rock.y), (200, 100))
+        self.assertTrue(rock._sleeping)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from robogame_engine.scheduler import FixedTimestep
+
+
+class FakeClock(object):
+    """
+        Time which goes only by sleep
+    """
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestFixedTimestep(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def make_scheduler(self, max_catch_up):
+        return FixedTimestep(step_time=0.01, max_catch_up=max_catch_up, clock=self.clock, sleep=self.clock.sleep)
+
+    def test_rate(self):
+        scheduler = self.make_scheduler(max_catch_up=5)
+        self.clock.sleep(0.035)
+        due = scheduler.due_steps()
+        self.assertEqual(due, 3)
+        for _ in range(due):
+            scheduler.step_done()
+        self.assertFalse(scheduler.is_behind)
+        self.assertEqual(scheduler.stats()['dropped_steps'], 0)
+
+    def test_catch_up_is_capped(self):
+        scheduler = self.make_scheduler(max_catch_up=2)
+        self.clock.sleep(0.055)
+        self.assertEqual(scheduler.due_steps(), 2)
+        self.assertEqual(scheduler.dropped_steps, 3)
+        scheduler.step_done()
+        scheduler.step_done()
+        self.assertFalse(scheduler.is_behind)
+
+    def test_reset_after_pause(self):
+        scheduler = self.make_scheduler(max_catch_up=5)
+        self.clock.sleep(0.03)
+        scheduler.reset()
+        self.assertEqual(scheduler.due_steps(), 0)
+
+    def test_wait(self):
+        scheduler = self.make_scheduler(max_catch_up=5)
+        self.clock.sleep(0.004)
+        self.assertEqual(scheduler.due_steps(), 0)
+        scheduler.wait()
+        self.assertAlmostEqual(self.clock.now, 100.01)
+        self.assertEqual(scheduler.due_steps(), 1)
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from robogame_engine.exceptions import RobogameException
+from tests.battle import Bullet, play
+
+
+def get_states(scene):
+    return [(obj.id, obj.x, obj.y, obj.vector.x, obj.vector.y, obj.state.__class__.__name__)
+            for obj in scene.objects]
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def test_restore(self):
+        scene, tanks = play(20)
+        scene.stop_recording()
+        snapshot = scene.snapshot()
+        before = get_states(scene)
+        for _ in range(50):
+            scene.game_step()
+        after = get_states(scene)
+        self.assertNotEqual(before, after)
+
+        scene.restore(snapshot)
+        self.assertEqual(get_states(scene), before)
+        # те же случайные числа, события и команды - та же игра
+        for _ in range(50):
+            scene.game_step()
+        self.assertEqual(get_states(scene), after)
+
+    def test_fork(self):
+        scene, tanks = play(20)
+        before = get_states(scene)
+        bullets = len(scene.get_objects_by_type(cls=Bullet))
+        with scene.fork():
+            for _ in range(30):
+                scene.game_step()
+            Bullet(owner=tanks[0])
+            scene.remove_object(tanks[1])
+        self.assertEqual(get_states(scene), before)
+        self.assertIn(tanks[1], scene.objects)
+        self.assertEqual(len(scene.get_objects_by_type(cls=Bullet)), bullets)
+        self.assertEqual(scene.recorder.step, 20)
+
+    def test_snapshot_fields(self):
+        scene, tanks = play(1)
+        bullet = Bullet(owner=tanks[0])
+        with scene.fork():
+            for _ in range(5):
+                scene.game_step()
+            self.assertEqual(bullet.lifetime, 5)
+        self.assertEqual(bullet.lifetime, 10)
+
+    def test_other_scene(self):
+        scene, _ = play(1)
+        other, _ = play(1)
+        with self.assertRaises(RobogameException):
+            other.restore(scene.snapshot())
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import pickle
+import unittest
+
+from robogame_engine import constants
+from robogame_engine.context import set_current_scene
+from robogame_engine.exceptions import RobogameException
+from robogame_engine.scene import Scene
+from robogame_engine.theme import compile_theme, theme
+
+
+class TestThemeSnapshot(unittest.TestCase):
+
+    def test_compiled(self):
+        snapshot = compile_theme('tests.default_theme', MAX_SPEED=7)
+        self.assertEqual(snapshot.MAX_SPEED, 7)
+        self.assertEqual(snapshot.HEARTBEAT_INTERVAL, constants.HEARTBEAT_INTERVAL)
+        self.assertEqual(snapshot.mod_path, 'tests.default_theme')
+        self.assertFalse(hasattr(snapshot, '__dict__'))
+        with self.assertRaises(AttributeError):
+            snapshot.UNKNOWN_CONSTANT
+        with self.assertRaises(RobogameException):
+            compile_theme('tests.no_such_theme')
+
+    def test_immutable(self):
+        snapshot = compile_theme('tests.default_theme')
+        with self.assertRaises(AttributeError):
+            snapshot.MAX_SPEED = 100
+        changed = snapshot.replace(MAX_SPEED=100, NEW_CONSTANT=1)
+        self.assertEqual((changed.MAX_SPEED, changed.NEW_CONSTANT), (100, 1))
+        self.assertEqual(snapshot.MAX_SPEED, constants.MAX_SPEED)
+        self.assertEqual(pickle.loads(pickle.dumps(changed)).as_dict(), changed.as_dict())
+
+    def test_scenes(self):
+        small = Scene(field=(100, 50), theme_mod_path='tests.default_theme')
+        self.assertEqual(theme.FIELD_WIDTH, 100)
+        big = Scene(field=(1000, 500), theme_mod_path='tests.default_theme')
+        self.assertEqual((theme.FIELD_WIDTH, theme.FIELD_HEIGHT), (1000, 500))
+        small.activate()
+        self.assertEqual((theme.FIELD_WIDTH, theme.FIELD_HEIGHT), (100, 50))
+        self.assertIs(type(small.theme), type(big.theme))
+        set_current_scene(None)
+        # без сцены - константы движка, поле задают сцена или модуль темы
+        self.assertEqual(theme.MAX_SPEED, constants.MAX_SPEED)
+        self.assertFalse(hasattr(theme, 'FIELD_WIDTH'))
+        with self.assertRaises(AttributeError):
+            theme.MAX_SPEED = 10
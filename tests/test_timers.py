@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import random
+import unittest
+
+from robogame_engine.geometry import Point
+from robogame_engine.objects import GameObject
+from robogame_engine.scene import Scene
+from robogame_engine.timers import TimerWheel
+
+
+class TestTimerWheel(unittest.TestCase):
+
+    def test_due_steps(self):
+        # маленькие колеса - чтобы проверить спуск таймеров и переполнение
+        wheel = TimerWheel(slot_bits=2, levels=3)
+        rnd = random.Random(1)
+        fired = []
+        expected = []
+        for _ in range(300):
+            delay = rnd.randint(1, 150)
+            wheel.schedule(delay, lambda delay=delay, started=wheel.tick: fired.append((wheel.tick, started + delay)))
+            expected.append(wheel.tick + delay)
+            for _ in range(rnd.randint(0, 2)):
+                wheel.advance()
+        for _ in range(200):
+            wheel.advance()
+        self.assertEqual(sorted(tick for tick, _ in fired), sorted(expected))
+        self.assertTrue(all(tick == due for tick, due in fired))
+
+    def test_repeat_and_cancel(self):
+        wheel = TimerWheel(slot_bits=2, levels=2)
+        fired = []
+        timer = wheel.schedule(3, lambda: fired.append(wheel.tick), interval=7)
+        for _ in range(30):
+            wheel.advance()
+        self.assertEqual(fired, [3, 10, 17, 24])
+        timer.cancel()
+        for _ in range(30):
+            wheel.advance()
+        self.assertEqual(fired, [3, 10, 17, 24])
+
+
+class Sleeper(GameObject):
+
+    def __init__(self, **kwargs):
+        super(Sleeper, self).__init__(**kwargs)
+        self.calls = []
+        self.heartbeats = []
+
+    def on_heartbeat(self):
+        self.heartbeats.append(self.scene._step)
+
+
+class TestObjectTimers(unittest.TestCase):
+
+    def setUp(self):
+        self.scene = Scene(field=(100, 100), theme_mod_path='tests.default_theme')
+
+    def test_schedule(self):
+        obj = Sleeper(coord=Point(10, 10))
+        obj.schedule(3, lambda: obj.calls.append(('once', self.scene._step)))
+        periodic = obj.schedule(4, lambda: obj.calls.append(('every', self.scene._step)), repeat=True)
+        self.scene.run(steps=10, result_every=0)
+        # событие таймера обрабатывается на следующем шаге
+        self.assertEqual(obj.calls, [('once', 4), ('every', 5), ('every', 9)])
+        self.assertEqual(obj.heartbeats, [6])
+        periodic.cancel()
+        self.scene.run(steps=10, result_every=0)
+        self.assertEqual(obj.calls, [('once', 4), ('every', 5), ('every', 9)])
+        self.assertEqual(obj.heartbeats, [6, 11, 16])
+
+    def test_removed_object(self):
+        obj = Sleeper(coord=Point(10, 10))
+        timer = obj.schedule(3, lambda: obj.calls.append(self.scene._step))
+        self.scene.remove_object(obj)
+        self.scene.run(steps=10, result_every=0)
+        self.assertTrue(timer.cancelled)
+        self.assertEqual(obj.calls, [])
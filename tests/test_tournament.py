@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import io
+import time
+import unittest
+from contextlib import redirect_stdout
+
+from robogame_engine.scene import Scene
+from robogame_engine.tournament import Tournament, play_match
+
+
+class MatchScene(Scene):
+
+    def prepare(self, teams, seed):
+        self.teams_names = teams
+        self.seed = seed
+
+    def get_game_result(self):
+        if 'Sleepy' in self.teams_names:
+            time.sleep(10)
+        if self._step < 10:
+            return False, {}
+        return True, dict((team, dict(score=len(team) + self.seed)) for team in self.teams_names)
+
+
+def make_scene(teams, seed):
+    return MatchScene(field=(100, 100), theme_mod_path='tests.default_theme', headless=True, teams=teams, seed=seed)
+
+
+class TestTournament(unittest.TestCase):
+
+    def test_standings(self):
+        tournament = Tournament(scene_factory=make_scene, pairings=[('Ant', 'Beetle'), ('Ant', 'Cat')],
+                                seeds=[1, 2], workers=2, matches_per_worker=1)
+        results = list(tournament.run())
+        self.assertEqual(sorted(result.number for result in results), [1, 2, 3, 4])
+        self.assertTrue(all(result.is_ok for result in results))
+        self.assertEqual(tournament.standings.teams['Ant'], dict(matches=4, score=4 * 3 + 1 + 2 + 1 + 2))
+        self.assertEqual(tournament.standings.teams['Cat'], dict(matches=2, score=3 * 2 + 1 + 2))
+
+    def test_timeout(self):
+        tournament = Tournament(scene_factory=make_scene, pairings=[('Ant', 'Sleepy'), ('Ant', 'Cat')],
+                                workers=1, timeout=1, seeds=[0])
+        results = dict((result.number, result) for result in tournament.run())
+        self.assertIn('timeout', results[1].error)
+        self.assertTrue(results[2].is_ok)
+        self.assertEqual(tournament.standings.failed, 1)
+
+    def test_quiet_match(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            result = play_match(make_scene, teams=('Ant', 'Beetle'), seed=1)
+        self.assertEqual(result, dict(Ant=dict(score=4), Beetle=dict(score=7)))
+        self.assertEqual(output.getvalue(), '')